@@ -0,0 +1,109 @@
+"""Benchmark of the BM25 research index.
+
+Simulates a long run: ``--queries`` searches per loop over ``--loops`` loops, each
+returning a multi-paragraph summary in English or Chinese. After every loop the index
+is synced (only the new summaries are indexed) and queried with the research topic and
+every query run so far, as ``reflection`` does with ``use_retrieval`` on. Reports the
+per-loop update and query times, the cost of rebuilding from scratch instead, and how
+much of the research text the retrieved paragraphs amount to.
+
+Usage:
+    uv run python benchmarks/bench_bm25.py [--queries 30] [--loops 10] [--top-k 3]
+"""
+
+import argparse
+import random
+import time
+
+from agent.bm25 import ResearchIndex
+from agent.utils import estimate_tokens
+
+_TOPIC = "伯克希尔·哈撒韦 2025 年 13F 持仓变化 Berkshire Hathaway portfolio"
+_ENGLISH = (
+    "Berkshire Hathaway Apple Chubb Occidental Petroleum stake portfolio quarter filing "
+    "13F shares position cash reserve Buffett insurance energy bank valuation buyback "
+    "dividend Japan trading houses Bank of America Coca-Cola American Express 2025 "
+    "market news economy rates inflation outlook analysts"
+).split()
+_CHINESE = (
+    "伯克希尔 哈撒韦 苹果 股票 减持 增持 持仓 季度 现金 储备 巴菲特 保险 能源 银行 估值 "
+    "回购 股息 日本 商社 美国银行 可口可乐 西方石油 市场 经济 利率 通胀 分析师"
+).split()
+
+# Real summaries are mostly long-tail words (names, figures, jargon) with Zipf-like
+# frequencies; without them every term would occur in half of the chunks
+_TAIL = 5000
+
+
+def tail_words(rng: random.Random, k: int, chinese: bool) -> list:
+    ranks = [min(int(rng.paretovariate(1.0)), _TAIL) for _ in range(k)]
+    return [f"词{rank}" if chinese else f"term{rank}" for rank in ranks]
+
+
+def make_summary(rng: random.Random, i: int) -> str:
+    """A summary of 3-6 paragraphs, each a few cited sentences, in one language."""
+    chinese = rng.random() < 0.5
+    paragraphs = []
+    for j in range(rng.randint(3, 6)):
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            if chinese:
+                words = rng.choices(_CHINESE, k=rng.randint(4, 8)) + tail_words(rng, 6, True)
+                rng.shuffle(words)
+                sentences.append("".join(words) + f"[s{i}](https://r/{i})。")
+            else:
+                words = rng.choices(_ENGLISH, k=rng.randint(6, 12)) + tail_words(rng, 8, False)
+                rng.shuffle(words)
+                sentences.append(" ".join(words) + f" {i}-{j} [s{i}](https://r/{i}).")
+        paragraphs.append(("" if chinese else " ").join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def make_query(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return "".join(rng.choices(_CHINESE, k=2) + tail_words(rng, 1, True))
+    return " ".join(rng.choices(_ENGLISH, k=2) + tail_words(rng, 2, False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--loops", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = ResearchIndex()
+    summaries, queries = [], []
+    print(
+        f"{'loop':>4} {'summaries':>10} {'chunks':>7} {'update ms':>10} "
+        f"{'rebuild ms':>11} {'query ms':>9} {'retrieved':>10} {'tokens':>12}"
+    )
+    for loop in range(1, args.loops + 1):
+        for _ in range(args.queries):
+            queries.append(make_query(rng))
+            summaries.append(make_summary(rng, len(summaries)))
+
+        started = time.perf_counter()
+        index.sync(summaries)
+        update = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ResearchIndex().sync(summaries)
+        rebuild = time.perf_counter() - started
+
+        started = time.perf_counter()
+        chunks = index.retrieve([_TOPIC, *queries], args.top_k)
+        query = time.perf_counter() - started
+
+        all_tokens = sum(estimate_tokens(summary) for summary in summaries)
+        kept_tokens = sum(estimate_tokens(chunk) for chunk in chunks)
+        print(
+            f"{loop:>4} {len(summaries):>10} {len(index.chunks):>7} {update * 1000:>10.1f} "
+            f"{rebuild * 1000:>11.1f} {query * 1000:>9.1f} {len(chunks):>10} "
+            f"{f'{kept_tokens}/{all_tokens}':>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Micro-benchmark for citation marker insertion.
+
+Compares ``agent.utils.insert_citation_markers`` with the previous slice-per-citation
+implementation on long multilingual texts with hundreds of grounding supports.
+
+Usage:
+    uv run python benchmarks/bench_citations.py [--repeat 5]
+"""
+
+import argparse
+import random
+import timeit
+
+from agent.utils import insert_citation_markers
+
+_ENGLISH = (
+    "Berkshire Hathaway trimmed its Apple stake again in the second quarter while "
+    "adding to its positions in Chubb and Occidental Petroleum. "
+)
+_CHINESE = "伯克希尔·哈撒韦第二季度继续减持苹果股票，同时增持了丘博保险和西方石油。现金储备创下历史新高。"
+
+
+def legacy_insert_citation_markers(text, citations_list):
+    """The previous implementation: one full string rebuild per citation."""
+    sorted_citations = sorted(
+        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    )
+    modified_text = text
+    for citation_info in sorted_citations:
+        end_idx = citation_info["end_index"]
+        marker_to_insert = ""
+        for segment in citation_info["segments"]:
+            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
+        modified_text = (
+            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+        )
+    return modified_text
+
+
+def make_case(target_chars, supports, chinese_ratio, seed=0):
+    """Build a text and grounding citations whose offsets are UTF-8 byte offsets."""
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < target_chars:
+        sentence = _CHINESE if rng.random() < chinese_ratio else _ENGLISH
+        sentences.append(sentence)
+        length += len(sentence)
+    text = "".join(sentences)
+
+    # Supports end on sentence boundaries, like Gemini's grounding segments
+    boundaries = []
+    offset = 0
+    for sentence in sentences:
+        offset += len(sentence.encode("utf-8"))
+        boundaries.append(offset)
+    ends = sorted(rng.sample(boundaries, min(supports, len(boundaries))))
+    citations = []
+    start = 0
+    for idx, end in enumerate(ends):
+        citations.append(
+            {
+                "start_index": start,
+                "end_index": end,
+                "segments": [
+                    {
+                        "label": f"source{idx}",
+                        "short_url": f"https://vertexaisearch.cloud.google.com/id/{idx:x}",
+                        "value": f"https://example.com/{idx}",
+                    }
+                ],
+            }
+        )
+        start = end
+    return text, citations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("ascii 20k chars / 100 supports", 20_000, 100, 0.0),
+        ("mixed 100k chars / 300 supports", 100_000, 300, 0.5),
+        ("mixed 500k chars / 800 supports", 500_000, 800, 0.5),
+        ("chinese 500k chars / 800 supports", 500_000, 800, 1.0),
+    ]
+    print(f"{'case':<36} {'legacy ms':>10} {'new ms':>10} {'speedup':>8}")
+    for name, chars, supports, chinese_ratio in cases:
+        text, citations = make_case(chars, supports, chinese_ratio)
+        legacy = min(
+            timeit.repeat(
+                lambda: legacy_insert_citation_markers(text, citations),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        new = min(
+            timeit.repeat(
+                lambda: insert_citation_markers(text, citations),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        if chinese_ratio == 0.0:
+            assert insert_citation_markers(text, citations) == legacy_insert_citation_markers(
+                text, citations
+            ), "outputs differ on ASCII text"
+        print(f"{name:<36} {legacy * 1000:>10.2f} {new * 1000:>10.2f} {legacy / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark of the report context packer.
+
+Builds the summaries of a large run (``--queries`` searches per loop over ``--loops``
+loops), where a share of the summaries repeat facts earlier searches already found, and
+packs them into the report token budget. Reports the packer's time and its report:
+duplicates and less relevant summaries dropped, tokens kept and the compression.
+
+Usage:
+    uv run python benchmarks/bench_context_packing.py [--queries 30] [--loops 10]
+        [--budget 100000] [--overlap 0.3]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from agent.context_packing import pack_summaries
+
+_TOPIC = "Berkshire Hathaway 13F portfolio changes in 2025"
+_VOCABULARY = (
+    "Berkshire Hathaway Apple Chubb Occidental Petroleum stake portfolio quarter filing "
+    "13F shares position cash reserve Buffett insurance energy bank valuation buyback "
+    "dividend Japan trading houses Bank of America Coca-Cola American Express 2025"
+).split()
+_OFF_TOPIC = "market news report economy rates inflation outlook analysts".split()
+
+
+def make_summaries(queries: int, loops: int, overlap: float, seed: int = 0):
+    """Return ``queries * loops`` summaries; ``overlap`` of them restate an earlier one."""
+    rng = random.Random(seed)
+    summaries = []
+    for i in range(queries * loops):
+        if summaries and rng.random() < overlap:
+            # restate an earlier result, citing a different source
+            sentences = rng.choice(summaries).split(". ")
+            summaries.append(
+                ". ".join(s.split(" [")[0] + f" [s{i}](https://r/{i})" for s in sentences)
+            )
+            continue
+        vocabulary = _VOCABULARY if rng.random() < 0.5 else _OFF_TOPIC
+        sentences = []
+        for j in range(rng.randint(8, 20)):
+            words = rng.choices(vocabulary, k=rng.randint(12, 30))
+            sentences.append(" ".join(words) + f" {i}-{j} [s{i}](https://r/{i})")
+        summaries.append(". ".join(sentences))
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--loops", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=100_000)
+    parser.add_argument("--overlap", type=float, default=0.3)
+    args = parser.parse_args()
+
+    summaries = make_summaries(args.queries, args.loops, args.overlap)
+    started = time.perf_counter()
+    _, report = pack_summaries(summaries, _TOPIC, args.budget)
+    elapsed = time.perf_counter() - started
+    print(json.dumps(report, indent=2))
+    print(f"packed {len(summaries)} summaries in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
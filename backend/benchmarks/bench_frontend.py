@@ -0,0 +1,134 @@
+"""Load benchmark for the frontend router.
+
+Builds a Vite-like ``dist`` (``index.html`` plus hashed JS/CSS under ``assets/``) in a
+temporary directory and compares requests/sec of the in-memory, precompressed router
+from ``create_frontend_router`` against the previous handler, which checked the
+filesystem and streamed a ``FileResponse`` on every request. Requests are driven
+in-process through ASGI, so the numbers measure the handlers rather than the network.
+
+The request mix is what a browser sends: ``index.html`` (revalidated with
+``If-None-Match`` on repeat visits when the server gives an ETag), an SPA route that
+falls back to ``index.html``, and the hashed assets, all with
+``Accept-Encoding: gzip, br``.
+
+Usage:
+    uv run python benchmarks/bench_frontend.py [--requests 5000] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import random
+import string
+import tempfile
+import time
+
+import fastapi
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.staticfiles import StaticFiles
+
+from agent.app import create_frontend_router
+
+
+def legacy_frontend_router(build_path: pathlib.Path):
+    """The handler before the in-memory cache, kept for comparison."""
+    react = FastAPI(openapi_url="")
+    react.mount("/assets", StaticFiles(directory=build_path / "assets"), name="static_assets")
+
+    @react.get("/{path:path}")
+    async def handle_catch_all(request: Request, path: str):
+        fp = build_path / path
+        if not fp.exists() or not fp.is_file():
+            fp = build_path / "index.html"
+        return fastapi.responses.FileResponse(fp)
+
+    return react
+
+
+def write_dist(directory: pathlib.Path, js_kib: int) -> list:
+    """Write a fake Vite build and return the asset paths index.html references."""
+    rng = random.Random(0)
+    words = ["const", "function", "return", "props", "useState", "className", "=>", "{", "}"]
+
+    def source(kib):
+        parts, size = [], 0
+        while size < kib * 1024:
+            word = rng.choice(words) + "".join(rng.choices(string.ascii_lowercase, k=3))
+            parts.append(word)
+            size += len(word) + 1
+        return " ".join(parts)
+
+    assets = directory / "assets"
+    assets.mkdir(parents=True)
+    files = {
+        "assets/index-3f9a1c2b.js": source(js_kib),
+        "assets/index-7d0e4b11.css": source(40),
+    }
+    for name, text in files.items():
+        (directory / name).write_text(text)
+    (directory / "index.html").write_text(
+        "<!doctype html><html><head>"
+        '<script type="module" src="/app/assets/index-3f9a1c2b.js"></script>'
+        '<link rel="stylesheet" href="/app/assets/index-7d0e4b11.css"></head>'
+        '<body><div id="root"></div></body></html>'
+    )
+    return list(files)
+
+
+async def load(app, paths, requests, concurrency, revalidate):
+    """Issue ``requests`` GETs over ``paths``; return requests/sec and wire bytes/request."""
+    transport = httpx.ASGITransport(app=app)
+    etags = {}
+    received = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(paths[i % len(paths)])
+
+        async def worker():
+            nonlocal received
+            while not queue.empty():
+                path = queue.get_nowait()
+                headers = {"accept-encoding": "gzip, br"}
+                if revalidate and path in etags:
+                    headers["if-none-match"] = etags[path]
+                response = await client.get(path, headers=headers)
+                received += response.num_bytes_downloaded
+                if "etag" in response.headers:
+                    etags[path] = response.headers["etag"]
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return requests / elapsed, received / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--js-kib", type=int, default=500, help="size of the main JS bundle")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_path = pathlib.Path(tmp) / "dist"
+        assets = write_dist(build_path, args.js_kib)
+        paths = ["/", "/index.html", "/threads/42"] + [f"/{asset}" for asset in assets]
+        routers = {
+            "legacy (FileResponse)": legacy_frontend_router(build_path),
+            "in-memory cache": create_frontend_router(os.path.abspath(build_path)),
+        }
+        print(f"{'router':<24} {'mode':<12} {'req/s':>10} {'bytes/req':>12}")
+        for name, router in routers.items():
+            for revalidate in (False, True):
+                rps, size = await load(
+                    router, paths, args.requests, args.concurrency, revalidate
+                )
+                mode = "revalidate" if revalidate else "cold"
+                print(f"{name:<24} {mode:<12} {rps:>10.0f} {size:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
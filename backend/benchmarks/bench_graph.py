@@ -0,0 +1,252 @@
+"""Offline end-to-end benchmark for the research graph.
+
+Runs the compiled ``graph`` against the deterministic stand-ins in ``fakes.py`` (grounded
+search with fake grounding metadata, structured-output and streaming chat models), so it
+needs no network access or API keys. Reports:
+
+- wall time per node, taken from the ``debug`` stream (task start to task result),
+- graph-runtime overhead: the wall time of a zero-latency run, and the wall time of a
+  latency-injected run minus the injected latency on its critical path,
+- peak traced memory of a single run,
+- throughput of N concurrent runs.
+
+Usage:
+    uv run python benchmarks/bench_graph.py [--concurrency 8] [--search-latency 0.8]
+        [--llm-latency 0.5] [--jitter 0.1] [--loops 2] [--json results.json]
+        [--report-mode sections] [--report-sections 6]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import pathlib
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from fakes import FakeChatModelFactory, FakeGenaiClient, FakeSettings, Latency
+from langchain_core.messages import HumanMessage
+
+from agent.configuration import Configuration
+from agent.graph import graph
+from agent.hedging import get_hedger
+from agent.models import override_clients
+
+
+def run_config(args, hedge=False):
+    return {
+        "configurable": {
+            "number_of_initial_queries": args.queries,
+            "max_research_loops": args.max_loops,
+            # every run must reach the fake backends, unthrottled
+            "enable_search_cache": False,
+            "enable_knowledge_store": False,
+            "search_requests_per_second": 1e6,
+            "search_tokens_per_minute": 1e12,
+            "search_max_in_flight": 10_000,
+            "enable_search_hedging": hedge,
+            "search_hedge_percentile": args.hedge_percentile,
+            "report_mode": args.report_mode,
+            "report_max_sections": args.report_sections,
+        },
+        "recursion_limit": 200,
+    }
+
+
+async def run_once(topic, config):
+    """Run the graph once; return its wall time and per-node task durations."""
+    started = {}
+    node_times = defaultdict(list)
+    t0 = time.perf_counter()
+    async for event in graph.astream(
+        {"messages": [HumanMessage(content=topic)]}, config, stream_mode="debug"
+    ):
+        now = time.perf_counter()
+        payload = event["payload"]
+        if event["type"] == "task":
+            started[payload["id"]] = now
+        elif event["type"] == "task_result":
+            node_times[payload["name"]].append(now - started.pop(payload["id"]))
+    return time.perf_counter() - t0, node_times
+
+
+async def run_batch(settings, config, concurrency, label):
+    """Run ``concurrency`` runs at once on fresh fakes; return wall time and results."""
+    with override_clients(FakeChatModelFactory(settings), FakeGenaiClient(settings)):
+        t0 = time.perf_counter()
+        results = await asyncio.gather(
+            *(run_once(f"{label} topic {i}", config) for i in range(concurrency))
+        )
+    return time.perf_counter() - t0, results
+
+
+def critical_path(settings, args):
+    """Injected latency (means) on the longest path through one run."""
+    waves = min(settings.loops_until_sufficient, args.max_loops)
+    llm = settings.llm_latency.mean
+    build = llm + settings.report_chunks * settings.chunk_latency.mean
+    if args.report_mode == "sections":
+        # the outline call, then the longest section decodes its share of the chunks
+        longest = -(-settings.report_chunks // args.report_sections)
+        build = 2 * llm + longest * settings.chunk_latency.mean
+    return llm + waves * (settings.search_latency.mean + llm) + build
+
+
+def summarize_nodes(results):
+    merged = defaultdict(list)
+    for _, node_times in results:
+        for name, durations in node_times.items():
+            merged[name].extend(durations)
+    return {
+        name: {
+            "calls": len(durations),
+            "mean_ms": statistics.fmean(durations) * 1000,
+            "p50_ms": statistics.median(durations) * 1000,
+            "max_ms": max(durations) * 1000,
+        }
+        for name, durations in merged.items()
+    }
+
+
+async def benchmark(args):
+    timed = FakeSettings(
+        search_latency=Latency(
+            args.search_latency,
+            args.jitter * args.search_latency,
+            args.tail_probability,
+            args.tail_multiplier,
+        ),
+        llm_latency=Latency(args.llm_latency, args.jitter * args.llm_latency),
+        chunk_latency=Latency(args.chunk_latency),
+        follow_ups_per_loop=args.follow_ups,
+        loops_until_sufficient=args.loops,
+        report_chunks=args.report_chunks,
+        seed=args.seed,
+    )
+    instant = FakeSettings(
+        follow_ups_per_loop=args.follow_ups,
+        loops_until_sufficient=args.loops,
+        report_chunks=args.report_chunks,
+        seed=args.seed,
+    )
+    config = run_config(args)
+
+    # warm-up: first-call imports and schema construction stay out of the numbers
+    await run_batch(instant, config, 1, "warm-up")
+
+    overhead_runs = []
+    for i in range(args.repeat):
+        _, results = await run_batch(instant, config, 1, f"overhead {i}")
+        overhead_runs.append(results[0][0])
+
+    tracemalloc.start()
+    await run_batch(instant, config, 1, "memory")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # zero-latency passes never hedge: their latencies would skew the hedge percentile
+    timed_config = run_config(args, hedge=args.hedge)
+    single_wall, _ = await run_batch(timed, timed_config, 1, "single")
+    # a primed latency window, as on a server that has been up for a while
+    await run_batch(timed, timed_config, args.concurrency, "prime")
+    batch_wall, batch = await run_batch(timed, timed_config, args.concurrency, "batch")
+
+    hedger = None
+    if args.hedge:
+        configurable = Configuration.from_runnable_config(timed_config)
+        hedger = get_hedger(configurable.search_model, configurable)
+    expected = critical_path(timed, args)
+    run_walls = [wall for wall, _ in batch]
+    return {
+        "settings": vars(args),
+        "nodes": summarize_nodes(batch),
+        "overhead": {
+            "zero_latency_run_ms": statistics.median(overhead_runs) * 1000,
+            "injected_critical_path_ms": expected * 1000,
+            "single_run_ms": single_wall * 1000,
+            "single_run_overhead_ms": (single_wall - expected) * 1000,
+        },
+        "memory": {"peak_traced_mb": peak / 2**20},
+        "throughput": {
+            "concurrency": args.concurrency,
+            "batch_wall_s": batch_wall,
+            "runs_per_s": args.concurrency / batch_wall,
+            "run_p50_ms": statistics.median(run_walls) * 1000,
+            "run_max_ms": max(run_walls) * 1000,
+        },
+        "hedging": hedger.stats() if hedger else None,
+    }
+
+
+def report(result):
+    print(f"{'node':<16}{'calls':>7}{'mean ms':>11}{'p50 ms':>11}{'max ms':>11}")
+    for name, stats in result["nodes"].items():
+        print(
+            f"{name:<16}{stats['calls']:>7}{stats['mean_ms']:>11.1f}"
+            f"{stats['p50_ms']:>11.1f}{stats['max_ms']:>11.1f}"
+        )
+    overhead = result["overhead"]
+    print()
+    print(f"zero-latency run        {overhead['zero_latency_run_ms']:>10.1f} ms")
+    print(f"injected critical path  {overhead['injected_critical_path_ms']:>10.1f} ms")
+    print(f"single run              {overhead['single_run_ms']:>10.1f} ms")
+    print(f"  overhead              {overhead['single_run_overhead_ms']:>10.1f} ms")
+    print(f"peak traced memory      {result['memory']['peak_traced_mb']:>10.1f} MB")
+    throughput = result["throughput"]
+    print(
+        f"throughput              {throughput['runs_per_s']:>10.2f} runs/s "
+        f"({throughput['concurrency']} concurrent, p50 {throughput['run_p50_ms']:.0f} ms, "
+        f"max {throughput['run_max_ms']:.0f} ms)"
+    )
+    if result["hedging"]:
+        hedging = result["hedging"]
+        print(
+            f"hedging                 {hedging['hedged']}/{hedging['calls']} calls hedged, "
+            f"{hedging['hedges_won']} won, {hedging['hedges_skipped']} skipped by the cap"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5, help="zero-latency runs to time")
+    parser.add_argument("--queries", type=int, default=3, help="initial search queries")
+    parser.add_argument("--loops", type=int, default=2, help="reflections until sufficient")
+    parser.add_argument("--max-loops", type=int, default=3)
+    parser.add_argument("--follow-ups", type=int, default=3)
+    parser.add_argument("--search-latency", type=float, default=0.8, help="seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds")
+    parser.add_argument("--chunk-latency", type=float, default=0.002, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stddev / mean")
+    parser.add_argument("--tail-probability", type=float, default=0.0, help="slow searches")
+    parser.add_argument("--tail-multiplier", type=float, default=10.0)
+    parser.add_argument("--hedge", action="store_true", help="enable search hedging")
+    parser.add_argument("--hedge-percentile", type=float, default=95.0)
+    parser.add_argument("--report-chunks", type=int, default=200)
+    parser.add_argument("--report-mode", choices=["single", "sections"], default="single")
+    parser.add_argument("--report-sections", type=int, default=6, help="sections mode only")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    json_path = pathlib.Path(args.json).resolve() if args.json else None
+    # web_build writes its report under ./output; the nodes' progress prints are muted
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, "w") as devnull:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                result = asyncio.run(benchmark(args))
+        finally:
+            os.chdir(cwd)
+    report(result)
+    if json_path:
+        json_path.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Offline check and benchmark of Anthropic prompt caching in the research graph.
+
+Runs the graph against the fakes in ``fakes.py``, whose Claude models reject misplaced
+``cache_control`` breakpoints and report cache reads/writes the way Anthropic does.
+Prints every reflection/report call with its input, cache read and cache write tokens,
+then the input cost with caching against the same calls billed without it.
+
+Usage:
+    uv run python benchmarks/bench_prompt_cache.py [--loops 3] [--queries 5]
+        [--sentences 40] [--model claude-sonnet-4-20250514] [--report-mode sections]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import tempfile
+
+from fakes import FakeChatModelFactory, FakeGenaiClient, FakeSettings
+from langchain_core.messages import HumanMessage
+
+from agent.graph import graph
+from agent.metrics import model_cost
+from agent.models import override_clients
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, default=3, help="reflection loops per run")
+    parser.add_argument("--queries", type=int, default=5, help="initial queries")
+    parser.add_argument(
+        "--sentences", type=int, default=40, help="sentences per search summary"
+    )
+    parser.add_argument("--model", default="claude-sonnet-4-20250514")
+    parser.add_argument("--report-mode", choices=["single", "sections"], default="single")
+    args = parser.parse_args()
+
+    settings = FakeSettings(
+        sentences_per_search=args.sentences,
+        loops_until_sufficient=args.loops,
+        report_chunks=5,
+    )
+    config = {
+        "configurable": {
+            "number_of_initial_queries": args.queries,
+            "max_research_loops": args.loops,
+            "reasoning_model": args.model,
+            "answer_model": args.model,
+            "enable_search_cache": False,
+            "enable_knowledge_store": False,
+            "report_mode": args.report_mode,
+        },
+        "recursion_limit": 200,
+    }
+    factory = FakeChatModelFactory(settings)
+    with tempfile.TemporaryDirectory() as workdir, override_clients(
+        factory, FakeGenaiClient(settings)
+    ):
+        cwd = os.getcwd()
+        os.chdir(workdir)  # web_build writes its report under ./output
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                await graph.ainvoke(
+                    {"messages": [HumanMessage(content="prompt caching benchmark")]}, config
+                )
+        finally:
+            os.chdir(cwd)
+
+    calls = factory.models[args.model].cache_log
+    print(f"{'call':>4} {'input':>8} {'read':>8} {'write':>8}")
+    for i, call in enumerate(calls, 1):
+        print(f"{i:>4} {call['input_tokens']:>8} {call['cache_read']:>8} {call['cache_creation']:>8}")
+
+    totals = {key: sum(call[key] for call in calls) for key in calls[0]}
+    cached = model_cost(
+        args.model, totals["input_tokens"], 0, totals["cache_read"], totals["cache_creation"]
+    )
+    uncached = model_cost(args.model, totals["input_tokens"], 0)
+    print(
+        f"\ninput tokens {totals['input_tokens']}, cache reads {totals['cache_read']} "
+        f"({totals['cache_read'] / totals['input_tokens']:.0%}), "
+        f"cache writes {totals['cache_creation']}"
+    )
+    print(
+        f"input cost ${cached:.4f} with caching vs ${uncached:.4f} without "
+        f"({1 - cached / uncached:.0%} saved)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
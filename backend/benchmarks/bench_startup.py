@@ -0,0 +1,102 @@
+"""Cold-start benchmark for the agent.
+
+Measures, in fresh interpreters, how long it takes to import ``agent.graph`` and how
+long the first request spends before its first network call (building the model
+clients and the search client). Pass ``--compare REV`` to run the same measurement
+against another git revision, e.g. the commit before lazy initialization.
+
+Usage:
+    uv run python benchmarks/bench_startup.py [--runs 7] [--compare REV]
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+# Runs inside a fresh interpreter. Older revisions build every client at import time
+# and have no agent.models, in which case the first request has nothing left to build.
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import agent.graph
+t1 = time.perf_counter()
+try:
+    from agent.configuration import Configuration
+    from agent.models import warm_up_models
+except ImportError:
+    pass
+else:
+    warm_up_models(Configuration.from_runnable_config())
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first_request": t2 - t1, "total": t2 - t0}))
+"""
+
+
+def measure(src_dir, runs):
+    """Run the probe ``runs`` times against the agent package in ``src_dir``."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(src_dir)
+    # placeholder credentials; no request leaves the process
+    for key in ("GEMINI_API_KEY", "ANTHROPIC_API_KEY", "OPENAI_API_KEY"):
+        env.setdefault(key, "benchmark")
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE],
+            env=env,
+            cwd=tempfile.gettempdir(),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("import", "first_request", "total")
+    }
+
+
+def report(label, result):
+    print(
+        f"{label:<24} import {result['import'] * 1000:>8.1f} ms   "
+        f"first request {result['first_request'] * 1000:>8.1f} ms   "
+        f"total {result['total'] * 1000:>8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--compare", metavar="REV", help="git revision to compare with")
+    args = parser.parse_args()
+
+    print(f"median of {args.runs} fresh interpreters")
+    report("working tree", measure(BACKEND_DIR / "src", args.runs))
+    if args.compare:
+        with tempfile.TemporaryDirectory() as worktree:
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", worktree, args.compare],
+                cwd=BACKEND_DIR,
+                check=True,
+                capture_output=True,
+            )
+            try:
+                report(args.compare, measure(pathlib.Path(worktree) / "backend" / "src", args.runs))
+            finally:
+                subprocess.run(
+                    ["git", "worktree", "remove", "--force", worktree],
+                    cwd=BACKEND_DIR,
+                    check=True,
+                    capture_output=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Deterministic offline stand-ins for the chat models and the grounded search client.
+
+Install them with ``agent.models.override_clients``::
+
+    settings = FakeSettings(search_latency=Latency(0.8), llm_latency=Latency(0.5))
+    with override_clients(FakeChatModelFactory(settings), FakeGenaiClient(settings)):
+        await graph.ainvoke(...)
+
+Every answer is derived from a hash of the prompt, so runs are reproducible, and every
+call sleeps for an injected latency so the graph sees realistic timing without any
+network access. Claude models also mimic Anthropic prompt caching: ``cache_control``
+breakpoints are validated like the API does, the cached prefix starts with the tools a
+call sends (so a structured-output call never shares a prefix with a tool-less one) and
+cache reads/writes are reported in ``usage_metadata``.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+from google.genai import types
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from agent.tools_and_schemas import Reflection, ReportOutline
+from agent.utils import estimate_tokens
+
+_SENTENCES = [
+    "Berkshire Hathaway trimmed its Apple stake again in the second quarter.",
+    "伯克希尔·哈撒韦第二季度继续减持苹果股票。",
+    "The company added to its positions in Chubb and Occidental Petroleum.",
+    "公司的现金储备创下历史新高，超过三千亿美元。",
+    "Analysts read the moves as caution about equity valuations.",
+    "巴菲特在股东大会上表示，将把重点放在长期持有的核心资产上。",
+]
+
+
+@dataclass
+class Latency:
+    """A latency to inject, in seconds, with optional Gaussian jitter and a slow tail.
+
+    With ``tail_probability`` set, that share of calls takes ``tail_multiplier`` times
+    longer, which is what hedged requests are meant to absorb.
+    """
+
+    mean: float = 0.0
+    jitter: float = 0.0
+    tail_probability: float = 0.0
+    tail_multiplier: float = 10.0
+
+    def sample(self, rng: random.Random) -> float:
+        latency = max(0.0, rng.gauss(self.mean, self.jitter)) if self.jitter else self.mean
+        if self.tail_probability and rng.random() < self.tail_probability:
+            latency *= self.tail_multiplier
+        return latency
+
+
+@dataclass
+class FakeSettings:
+    """Shape and timing of the fake backends."""
+
+    search_latency: Latency = field(default_factory=Latency)
+    llm_latency: Latency = field(default_factory=Latency)
+    chunk_latency: Latency = field(default_factory=Latency)
+    sources_per_search: int = 6
+    sentences_per_search: int = 12
+    follow_ups_per_loop: int = 3
+    loops_until_sufficient: int = 2
+    report_chunks: int = 100
+    seed: int = 0
+
+
+# Anthropic prompt caching rules the fake enforces
+MAX_CACHE_BREAKPOINTS = 4
+CACHE_LOOKBACK_BLOCKS = 20
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def prompt_text(prompt) -> str:
+    """Flatten a prompt (string, message list or content blocks) into plain text."""
+    if isinstance(prompt, str):
+        return prompt
+    parts = []
+    for message in prompt:
+        content = message.content if hasattr(message, "content") else message
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, dict):
+            parts.append(content.get("text", ""))
+        else:
+            parts.extend(
+                block if isinstance(block, str) else block.get("text", "") for block in content
+            )
+    return "\n".join(parts)
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+
+def fake_grounded_response(prompt: str, settings: FakeSettings) -> types.GenerateContentResponse:
+    """Build a grounded search answer with sources and byte-offset supports."""
+    seed = _digest(prompt)
+    rng = random.Random(seed)
+    chunks = [
+        types.GroundingChunk(
+            web=types.GroundingChunkWeb(
+                uri=f"https://vertexaisearch.cloud.google.com/grounding-api-redirect/{seed[:8]}{i}",
+                title=f"source{int(seed[:4], 16) % 50 + i}.com",
+            )
+        )
+        for i in range(settings.sources_per_search)
+    ]
+    text_parts, supports, offset = [], [], 0
+    for _ in range(settings.sentences_per_search):
+        sentence = rng.choice(_SENTENCES) + " "
+        size = len(sentence.encode("utf-8"))
+        supports.append(
+            types.GroundingSupport(
+                segment=types.Segment(start_index=offset, end_index=offset + size - 1),
+                grounding_chunk_indices=rng.sample(range(len(chunks)), k=min(2, len(chunks))),
+            )
+        )
+        text_parts.append(sentence)
+        offset += size
+    text = "".join(text_parts)
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                grounding_metadata=types.GroundingMetadata(
+                    grounding_chunks=chunks, grounding_supports=supports
+                ),
+            )
+        ],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=estimate_tokens(prompt),
+            candidates_token_count=estimate_tokens(text),
+            total_token_count=estimate_tokens(prompt) + estimate_tokens(text),
+        ),
+    )
+
+
+class _FakeSearchModels:
+    def __init__(self, settings: FakeSettings):
+        self.settings = settings
+        self.calls = 0
+        self._rng = random.Random(settings.seed)
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.settings.search_latency.sample(self._rng))
+        return fake_grounded_response(prompt_text(contents), self.settings)
+
+
+class FakeGenaiClient:
+    """Stand-in for ``google.genai.Client`` exposing ``aio.models.generate_content``."""
+
+    def __init__(self, settings: FakeSettings):
+        self.models = _FakeSearchModels(settings)
+        self.aio = SimpleNamespace(models=self.models)
+
+
+class _FakeStructuredModel:
+    def __init__(self, chat_model, schema, include_raw):
+        self.chat_model = chat_model
+        self.schema = schema
+        self.include_raw = include_raw
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        text = prompt_text(prompt)
+        # with_structured_output sends the schema as a tool definition
+        cache = self.chat_model.cache_usage(prompt, tools=[self.schema.__name__])
+        parsed = self.chat_model.structured_answer(self.schema, text)
+        await asyncio.sleep(self.chat_model.settings.llm_latency.sample(self.chat_model.rng))
+        if not self.include_raw:
+            return parsed
+        raw = self.chat_model.message(text, parsed.model_dump_json(), cache=cache)
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+
+class PromptCacheError(ValueError):
+    """A request the Anthropic API would reject for its cache_control breakpoints."""
+
+
+class FakeChatModel:
+    """Stand-in for a LangChain chat model covering the calls the graph makes."""
+
+    def __init__(self, model: str, settings: FakeSettings):
+        self.model = model
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.calls = 0
+        self.cache_log = []  # per call: {"input_tokens", "cache_read", "cache_creation"}
+        self._cached_prefixes = set()
+        self._reflections = defaultdict(int)
+
+    def cache_usage(self, prompt, tools=()) -> dict:
+        """Check a prompt's cache breakpoints and simulate Anthropic prompt caching.
+
+        The prefix is the ``tools`` the call sends, then the prompt blocks, like the API's
+        tools -> system -> messages order. Each breakpoint caches the prefix ending at its
+        block. A call reads the
+        longest prefix already cached that ends at a breakpoint or within the
+        CACHE_LOOKBACK_BLOCKS blocks before one, and writes every longer breakpoint prefix
+        of at least MIN_CACHEABLE_TOKENS tokens.
+
+        Raises:
+            PromptCacheError: On more than MAX_CACHE_BREAKPOINTS breakpoints, a breakpoint
+                on something other than a text block, or any breakpoint sent to a model
+                that is not a Claude model.
+        """
+        blocks = []
+        if not isinstance(prompt, str):
+            for message in prompt:
+                content = message.content if hasattr(message, "content") else message
+                blocks.extend([content] if isinstance(content, (str, dict)) else content)
+        breakpoints = [
+            i
+            for i, block in enumerate(blocks)
+            if isinstance(block, dict) and "cache_control" in block
+        ]
+        if breakpoints and not self.model.startswith("claude"):
+            raise PromptCacheError(f"{self.model} was sent cache_control breakpoints")
+        if len(breakpoints) > MAX_CACHE_BREAKPOINTS:
+            raise PromptCacheError(
+                f"{len(breakpoints)} cache breakpoints, at most {MAX_CACHE_BREAKPOINTS} allowed"
+            )
+        for i in breakpoints:
+            block = blocks[i]
+            if block.get("type") != "text" or block["cache_control"] != {"type": "ephemeral"}:
+                raise PromptCacheError(f"invalid cache breakpoint on block {i}: {block}")
+
+        # (hash, tokens) of the prompt prefix ending at each block
+        prefixes, running, tokens = [], hashlib.sha1(), 0
+        running.update(repr(sorted(tools)).encode("utf-8") + b"\x1d")
+        for block in blocks:
+            text = block if isinstance(block, str) else block.get("text", "")
+            running.update(text.encode("utf-8") + b"\x1e")
+            tokens += estimate_tokens(text)
+            prefixes.append((running.hexdigest(), tokens))
+
+        read = 0
+        for i in breakpoints:
+            for j in range(i, max(-1, i - CACHE_LOOKBACK_BLOCKS - 1), -1):
+                if prefixes[j][0] in self._cached_prefixes:
+                    read = max(read, prefixes[j][1])
+                    break
+        written = 0
+        for i in breakpoints:
+            digest, size = prefixes[i]
+            if size >= MIN_CACHEABLE_TOKENS and size > read and digest not in self._cached_prefixes:
+                self._cached_prefixes.add(digest)
+                written = size
+        return {"cache_read": read, "cache_creation": max(written - read, 0)}
+
+    def message(self, prompt: str, content: str, cls=AIMessage, cache=None):
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(content)
+        cache = cache or {"cache_read": 0, "cache_creation": 0}
+        self.cache_log.append({"input_tokens": input_tokens, **cache})
+        return cls(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "input_token_details": cache,
+            },
+        )
+
+    def structured_answer(self, schema, prompt: str):
+        self.calls += 1
+        if schema.__name__ == "SearchQueryList":
+            topic = re.search(r"Context: (.*)", prompt, re.S).group(1).strip()
+            count = int(re.search(r"more than (\d+) queries", prompt).group(1))
+            return schema(
+                query=[f"{topic} {_digest(topic, i)[:12]}" for i in range(count)],
+                rationale="offline benchmark",
+            )
+        if schema.__name__ == "Reflection":
+            topic = re.search(r'summaries above about "(.*?)"', prompt, re.S).group(1)
+            self._reflections[topic] += 1
+            loop = self._reflections[topic]
+            sufficient = loop >= self.settings.loops_until_sufficient
+            return schema(
+                is_sufficient=sufficient,
+                knowledge_gap="" if sufficient else "offline benchmark gap",
+                follow_up_queries=[]
+                if sufficient
+                else [
+                    f"{topic} {_digest(topic, loop, i)[:12]}"
+                    for i in range(self.settings.follow_ups_per_loop)
+                ],
+            )
+        if schema.__name__ == "ReportOutline":
+            topic = re.search(r'report on "(.*?)" from the summaries above', prompt, re.S).group(1)
+            count = int(re.search(r"at most (\d+) sections", prompt).group(1))
+            return schema(
+                title=f"Report: {topic}",
+                sections=[
+                    {"heading": f"Part {i + 1}", "focus": f"{topic} {_digest(topic, i)[:12]}"}
+                    for i in range(count)
+                ],
+            )
+        raise ValueError(f"FakeChatModel has no answer for schema {schema.__name__}")
+
+    def with_structured_output(self, schema, **kwargs):
+        return _FakeStructuredModel(self, schema, kwargs.get("include_raw", False))
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        text = prompt_text(prompt)
+        cache = self.cache_usage(prompt)
+        await asyncio.sleep(self.settings.llm_latency.sample(self.rng))
+        # reflection and the report outline ask for a JSON answer in the prompt
+        if 'summaries above about "' in text:
+            content = self.structured_answer(Reflection, text).model_dump_json()
+        elif re.search(r'report on ".*?" from the summaries above', text, re.S):
+            content = self.structured_answer(ReportOutline, text).model_dump_json()
+        else:
+            self.calls += 1
+            content = f"Digest of {estimate_tokens(text)} prompt tokens."
+        return self.message(text, content, cache=cache)
+
+    async def astream(self, prompt, config=None, **kwargs):
+        self.calls += 1
+        text = prompt_text(prompt)
+        cache = self.cache_usage(prompt)
+        await asyncio.sleep(self.settings.llm_latency.sample(self.rng))
+        # a map-reduce section decodes its share of the report as a bare fragment
+        section = re.search(r"Write section (\d+) of (\d+)", text)
+        if section:
+            number, total = int(section.group(1)), int(section.group(2))
+            chunks = range(number - 1, self.settings.report_chunks, total)
+            opening, closing = f"<section><h2>Part {number}</h2>", "</section>"
+        else:
+            chunks = range(self.settings.report_chunks)
+            opening = "<!DOCTYPE html><html><head><title>Report</title></head><body>"
+            closing = "</body></html>"
+        yield AIMessageChunk(content=opening)
+        for i in chunks:
+            await asyncio.sleep(self.settings.chunk_latency.sample(self.rng))
+            yield AIMessageChunk(content=f"<p>Section {i}: {_SENTENCES[i % len(_SENTENCES)]}</p>\n")
+        yield self.message(text, closing, cls=AIMessageChunk, cache=cache)
+
+
+class FakeChatModelFactory:
+    """``override_clients`` factory returning one FakeChatModel per model name."""
+
+    def __init__(self, settings: FakeSettings):
+        self.settings = settings
+        self.models = {}
+
+    def __call__(self, model: str, **params):
+        if model not in self.models:
+            self.models[model] = FakeChatModel(model, self.settings)
+        return self.models[model]
@@ -0,0 +1,117 @@
+"""Concurrent load test against a running LangGraph server.
+
+Start the server in cassette replay mode so every model and search call is served from
+a recording (no API spend), then drive it with many concurrent runs:
+
+    AGENT_CASSETTE_MODE=record uv run langgraph dev        # once, with real keys
+    AGENT_CASSETTE_MODE=replay uv run langgraph dev        # then replay
+    uv run python benchmarks/load_test.py --topics topics.txt --concurrency 64 --runs 256
+
+Topics must match recorded runs (same question, same effort settings) to replay.
+
+Usage:
+    uv run python benchmarks/load_test.py [--url http://localhost:2024] [--topics FILE]
+        [--concurrency 16] [--runs 64] [--queries 3] [--loops 2] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import statistics
+import time
+
+from langgraph_sdk import get_client
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_one(client, topic, args):
+    started = time.perf_counter()
+    await client.runs.wait(
+        None,
+        "agent",
+        input={
+            "messages": [{"type": "human", "content": topic}],
+            "initial_search_query_count": args.queries,
+            "max_research_loops": args.loops,
+        },
+    )
+    return time.perf_counter() - started
+
+
+async def load_test(args, topics):
+    client = get_client(url=args.url)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], []
+
+    async def worker(i):
+        async with semaphore:
+            try:
+                latencies.append(await run_one(client, topics[i % len(topics)], args))
+            except Exception as e:
+                errors.append(repr(e))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.runs)))
+    wall = time.perf_counter() - started
+    result = {
+        "settings": vars(args),
+        "wall_s": wall,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "runs_per_s": len(latencies) / wall,
+    }
+    if latencies:
+        result.update(
+            {
+                "p50_s": statistics.median(latencies),
+                "p95_s": percentile(latencies, 0.95),
+                "p99_s": percentile(latencies, 0.99),
+                "max_s": max(latencies),
+            }
+        )
+    return result, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:2024")
+    parser.add_argument("--topics", help="file with one research question per line")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=3, help="initial_search_query_count")
+    parser.add_argument("--loops", type=int, default=2, help="max_research_loops")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    if args.topics:
+        topics = [
+            line.strip()
+            for line in pathlib.Path(args.topics).read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+    else:
+        topics = ["What did Berkshire Hathaway change in its portfolio this quarter?"]
+
+    result, errors = asyncio.run(load_test(args, topics))
+    print(
+        f"{result['completed']}/{args.runs} runs in {result['wall_s']:.1f} s "
+        f"({result['runs_per_s']:.2f} runs/s, concurrency {args.concurrency})"
+    )
+    if result["completed"]:
+        print(
+            f"latency p50 {result['p50_s']:.2f} s  p95 {result['p95_s']:.2f} s  "
+            f"p99 {result['p99_s']:.2f} s  max {result['max_s']:.2f} s"
+        )
+    for error in errors[:5]:
+        print(f"error: {error}")
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
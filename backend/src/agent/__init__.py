@@ -1,3 +1,10 @@
-from agent.graph import graph
+def __getattr__(name):
+    # Import the graph on first access so `import agent.utils` and friends stay cheap
+    if name == "graph":
+        from agent.graph import graph
+
+        return graph
+    raise AttributeError(f"module 'agent' has no attribute {name!r}")
+
 
 __all__ = ["graph"]
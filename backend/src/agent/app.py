@@ -1,16 +1,94 @@
 # mypy: disable - error - code = "no-untyped-def,misc"
+import logging
 import pathlib
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response
-from fastapi.staticfiles import StaticFiles
 import fastapi.exceptions
 
+from agent.circuit_breaker import circuit_breaker_stats
+from agent.configuration import Configuration
+from agent.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    StaticFileCache,
+    choose_encoding,
+    etag_for,
+    etag_matches,
+)
+from agent.metrics import render_metrics
+from agent.report_store import get_report_store
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Optionally build every configured model client before serving requests."""
+    configurable = Configuration.from_runnable_config()
+    if configurable.warm_up_models:
+        from agent.models import warm_up_models
+
+        warmed = warm_up_models(configurable)
+        logger.info("Warmed up %d model clients", len(warmed))
+    yield
+
+
 # Define the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Serve per-node latency, token, cost, cache, retry and fallback metrics."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/circuit-breakers")
+async def circuit_breakers():
+    """Report each provider circuit breaker's state and recent error rate."""
+    return circuit_breaker_stats()
+
+
+@app.get("/reports")
+async def list_reports(limit: int = 100, offset: int = 0):
+    """List stored HTML reports, newest first."""
+    store = get_report_store(Configuration.from_runnable_config().output_dir)
+    return store.list(limit=min(limit, 1000), offset=offset)
+
+
+@app.api_route("/reports/{name}", methods=["GET", "HEAD"])
+async def get_report(request: Request, name: str):
+    """Serve a stored report, precompressed when the client accepts it.
+
+    Report names contain their content hash, so responses are cached as immutable and
+    revalidation with If-None-Match answers 304 without touching the file.
+    """
+    store = get_report_store(Configuration.from_runnable_config().output_dir)
+    record = store.get(name)
+    if record is None:
+        raise fastapi.HTTPException(status_code=404, detail="Report not found")
+    encoding = choose_encoding(request.headers.get("accept-encoding"), record["encodings"])
+    headers = {
+        "ETag": etag_for(record["sha256"], encoding),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return fastapi.responses.FileResponse(
+        store.path(name, encoding),
+        media_type="text/html; charset=utf-8",
+        headers=headers,
+    )
 
 
 def create_frontend_router(build_dir="../frontend/dist"):
     """Creates a router to serve the React frontend.
 
+    The build is read into memory once, with gzip/brotli variants, and served with
+    ETags; Vite's hashed ``assets/`` files are marked immutable.
+
     Args:
         build_dir: Path to the React build directory relative to this file.
 
@@ -18,11 +96,12 @@ def create_frontend_router(build_dir="../frontend/dist"):
         A Starlette application serving the frontend.
     """
     build_path = pathlib.Path(__file__).parent.parent.parent / build_dir
-    static_files_path = build_path / "assets"  # Vite uses 'assets' subdir
 
     if not build_path.is_dir() or not (build_path / "index.html").is_file():
-        print(
-            f"WARN: Frontend build directory not found or incomplete at {build_path}. Serving frontend will likely fail."
+        logger.warning(
+            "Frontend build directory not found or incomplete at %s. Serving frontend will "
+            "likely fail.",
+            build_path,
         )
         # Return a dummy router if build isn't ready
         from starlette.routing import Route
@@ -36,19 +115,25 @@ def create_frontend_router(build_dir="../frontend/dist"):
 
         return Route("/{path:path}", endpoint=dummy_frontend)
 
-    build_dir = pathlib.Path(build_dir)
+    # Load the whole build once; requests are then answered from memory, precompressed
+    cache = StaticFileCache(str(build_path), immutable_prefixes=("assets/",))
+    index = cache.get("index.html")
+    logger.info(
+        "Cached %d frontend files (%.0f KiB with variants)", len(cache.files), cache.size / 1024
+    )
 
     react = FastAPI(openapi_url="")
-    react.mount(
-        "/assets", StaticFiles(directory=static_files_path), name="static_assets"
-    )
 
-    @react.get("/{path:path}")
+    @react.api_route("/{path:path}", methods=["GET", "HEAD"])
     async def handle_catch_all(request: Request, path: str):
-        fp = build_path / path
-        if not fp.exists() or not fp.is_file():
-            fp = build_path / "index.html"
-        return fastapi.responses.FileResponse(fp)
+        cached = cache.get(path)
+        if cached is not None:
+            return cached.response(request)
+        # a missing asset or file must fail, not load index.html as script or style;
+        # other unknown paths are client-side routes of the single-page app
+        if path.startswith("assets/") or "." in path.rsplit("/", 1)[-1]:
+            raise fastapi.HTTPException(status_code=404, detail="Not found")
+        return index.response(request)
 
     return react
 
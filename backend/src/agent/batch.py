@@ -0,0 +1,342 @@
+"""Batch research over a JSONL file of topics.
+
+Each input line is a JSON object with a ``topic`` and optionally an ``id`` (default: a
+hash of the topic), ``max_research_loops``, ``initial_search_query_count`` and a
+``configurable`` dict of per-topic Configuration overrides. A bare JSON string is read
+as a topic.
+
+Usage:
+    agent-batch topics.jsonl --output-dir batch_output [--concurrency 8]
+
+For every topic the output directory gets ``<id>/`` with the HTML report and
+``metrics.json`` (status, timings, token/cost totals per model and node), and a line in
+``results.jsonl``. Runs execute concurrently in one process so they share the search
+cache, the per-provider rate limiter and the circuit breakers; a process pool would
+give every worker its own rate limiter and overrun the provider quotas.
+
+Re-running the same command resumes an interrupted batch: topics already in
+``results.jsonl`` with status ``ok`` are skipped, and topics that were cut off or failed
+continue from their last checkpoint (see ``agent.checkpointer``), so finished searches
+are not repeated. Checkpoints belong to a topic's output directory and settings: the
+same topics run into another directory, or with other overrides, start afresh.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, Set
+
+from langchain_core.messages import HumanMessage
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "results.jsonl"
+SUMMARY_FILE = "summary.json"
+
+
+def topic_id(record: Dict[str, Any]) -> str:
+    """Return a record's id, or a stable hash of its topic."""
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha1(record["topic"].encode("utf-8")).hexdigest()[:12]
+
+
+def run_thread_id(record: Dict[str, Any], configurable: Dict[str, Any]) -> str:
+    """Return the checkpoint thread of a topic run.
+
+    The checkpoint database is shared by every batch, so the thread is scoped to the
+    run's settings (output directory and Configuration overrides included) as well as
+    the topic: re-running a topic into a new directory or with other settings starts a
+    fresh run instead of reusing the old one's finished state.
+    """
+    settings = {
+        "configurable": configurable,
+        **{
+            key: record.get(key)
+            for key in ("topic", "max_research_loops", "initial_search_query_count")
+        },
+    }
+    digest = hashlib.sha1(
+        json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:12]
+    return f"batch:{record['id']}:{digest}"
+
+
+def read_topics(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield topic records from a JSONL file one line at a time.
+
+    Raises:
+        ValueError: On a line that is neither a topic string nor an object with a topic.
+    """
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"topic": record}
+            if not isinstance(record, dict) or not record.get("topic"):
+                raise ValueError(
+                    f"{path}:{number}: expected a topic string or an object with 'topic'"
+                )
+            record["id"] = topic_id(record)
+            yield record
+
+
+def completed_ids(output_dir: str) -> Set[str]:
+    """Return the ids recorded as finished in ``results.jsonl``.
+
+    A line cut short by an interrupt is ignored, so that topic runs again.
+    """
+    done = set()
+    path = os.path.join(output_dir, RESULTS_FILE)
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _metrics_record(
+    record: Dict[str, Any], state: Dict[str, Any], started: float
+) -> Dict[str, Any]:
+    run_metrics = state.get("run_metrics") or {}
+    models = run_metrics.get("models") or {}
+    return {
+        "id": record["id"],
+        "topic": record["topic"],
+        "status": "ok",
+        "seconds": time.time() - started,
+        "html_filename": state.get("html_filename"),
+        "html_bytes": state.get("html_bytes"),
+        "research_loops": state.get("research_loop_count"),
+        "search_queries": len(state.get("search_query") or []),
+        "sources": len(state.get("sources_gathered") or []),
+        "tokens": sum(
+            usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+            for usage in models.values()
+        ),
+        "cost_usd": sum(usage.get("cost_usd", 0.0) for usage in models.values()),
+        "budget_status": state.get("budget_status"),
+        "run_metrics": run_metrics,
+    }
+
+
+class BatchRunner:
+    """Runs topic records through the graph with bounded concurrency.
+
+    ``concurrency`` workers pull records from a bounded queue fed from the input file,
+    so memory stays flat however many topics the batch holds.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        concurrency: int = 8,
+        configurable: Optional[Dict[str, Any]] = None,
+        checkpoint: bool = True,
+        graph=None,
+    ):
+        """Set up a batch writing to ``output_dir``.
+
+        Args:
+            output_dir: Where each topic's result and the batch summary are written.
+            concurrency: The number of topics researched at once.
+            configurable: Configuration overrides for every topic.
+            checkpoint: Whether runs are checkpointed so an interrupted topic resumes.
+            graph: The graph to run; defaults to the durable (or plain) agent graph.
+        """
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.configurable = configurable or {}
+        self.checkpoint = checkpoint
+        self.graph = graph
+        self.counts = {"ok": 0, "error": 0, "skipped": 0}
+        self.durations = []
+        self._results = None
+
+    def _graph(self):
+        if self.graph is None:
+            if self.checkpoint:
+                from agent.checkpointer import get_durable_graph
+
+                self.graph = get_durable_graph()
+            else:
+                from agent.graph import graph
+
+                self.graph = graph
+        return self.graph
+
+    def _config(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        configurable = {
+            **self.configurable,
+            **(record.get("configurable") or {}),
+            "output_dir": os.path.abspath(os.path.join(self.output_dir, record["id"])),
+        }
+        if self.checkpoint:
+            configurable["thread_id"] = run_thread_id(record, configurable)
+        return {"configurable": configurable, "recursion_limit": 200}
+
+    async def run_topic(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Run (or resume) one topic and return its metrics record; errors are recorded."""
+        started = time.time()
+        graph = self._graph()
+        config = self._config(record)
+        state_input = {
+            "messages": [HumanMessage(content=record["topic"])],
+            **{
+                key: record[key]
+                for key in ("max_research_loops", "initial_search_query_count")
+                if record.get(key) is not None
+            },
+        }
+        try:
+            state = None
+            if self.checkpoint:
+                snapshot = await graph.aget_state(config)
+                if snapshot.values and not snapshot.next:
+                    # finished before its result line was written
+                    state = snapshot.values
+                elif snapshot.values:
+                    # interrupted or failed earlier: continue from the last checkpoint
+                    state_input = None
+            if state is None:
+                state = await graph.ainvoke(state_input, config, durability="sync")
+            result = _metrics_record(record, state, started)
+        except Exception as e:
+            result = {
+                "id": record["id"],
+                "topic": record["topic"],
+                "status": "error",
+                "seconds": time.time() - started,
+                "error": f"{type(e).__name__}: {e}",
+            }
+        topic_dir = config["configurable"]["output_dir"]
+        os.makedirs(topic_dir, exist_ok=True)
+        with open(os.path.join(topic_dir, "metrics.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+        return result
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        # one line per topic, flushed at once so an interrupt loses at most the runs in flight
+        line = {key: value for key, value in result.items() if key != "run_metrics"}
+        self._results.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        self._results.flush()
+        os.fsync(self._results.fileno())
+        self.counts[result["status"]] += 1
+        self.durations.append(result["seconds"])
+
+    async def run(self, records: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run every record not finished by an earlier attempt and return a batch summary."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = completed_ids(self.output_dir)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.time()
+
+        async def produce():
+            seen = set()
+            for record in records:
+                if record["id"] in done or record["id"] in seen:
+                    self.counts["skipped"] += 1
+                    continue
+                seen.add(record["id"])
+                await queue.put(record)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def work():
+            while (record := await queue.get()) is not None:
+                result = await self.run_topic(record)
+                self._record(result)
+                finished = self.counts["ok"] + self.counts["error"]
+                rate = finished / max(time.time() - started, 1e-9) * 60
+                logger.info(
+                    "[%d] %s %s %.1fs (%d failed, %.1f topics/min)%s",
+                    finished,
+                    result["status"],
+                    record["id"],
+                    result["seconds"],
+                    self.counts["error"],
+                    rate,
+                    f": {result['error']}" if result["status"] == "error" else "",
+                )
+
+        results_path = os.path.join(self.output_dir, RESULTS_FILE)
+        with open(results_path, "a", encoding="utf-8") as self._results:
+            await asyncio.gather(produce(), *(work() for _ in range(self.concurrency)))
+
+        elapsed = time.time() - started
+        finished = self.counts["ok"] + self.counts["error"]
+        summary = {
+            **self.counts,
+            "seconds": elapsed,
+            "topics_per_minute": finished / elapsed * 60 if elapsed else 0.0,
+            "p50_seconds": _percentile(self.durations, 50),
+            "p95_seconds": _percentile(self.durations, 95),
+        }
+        with open(os.path.join(self.output_dir, SUMMARY_FILE), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def main(argv=None) -> None:
+    """Command line entry point for ``agent-batch``."""
+    parser = argparse.ArgumentParser(description="Research every topic in a JSONL file")
+    parser.add_argument("input", help="JSONL file of topics")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--concurrency", type=int, default=8, help="topics researched at once")
+    parser.add_argument(
+        "--config",
+        type=json.loads,
+        default={},
+        help="JSON object of Configuration overrides for every topic",
+    )
+    parser.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help="do not checkpoint runs; an interrupted topic starts over",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="also log the graph's per-node progress"
+    )
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(
+        args.output_dir,
+        concurrency=args.concurrency,
+        configurable=args.config,
+        checkpoint=not args.no_checkpoint,
+    )
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # the nodes' progress messages interleave unreadably across concurrent runs, so only
+    # their warnings are shown unless asked for
+    logging.getLogger("agent").setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+    summary = asyncio.run(runner.run(read_topics(args.input)))
+    logger.info("%s", json.dumps(summary, indent=2))
+    if summary["error"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
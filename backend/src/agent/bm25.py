@@ -0,0 +1,191 @@
+"""Incremental BM25 index over research paragraphs."""
+
+import collections
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from agent.utils import estimate_tokens
+
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+_CITATION_RE = re.compile(r"\]\([^)]*\)")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\n(?=\s*[-*#\d])")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into BM25 terms.
+
+    Latin-script words are lower-cased whole. CJK runs, which have no spaces between
+    words, become overlapping character bigrams (a single character stays a unigram),
+    so a Chinese query matches without a word segmenter. Citation URLs are ignored.
+    """
+    text = unicodedata.normalize("NFKC", _CITATION_RE.sub("]", text)).lower()
+    terms = []
+    for run in _TOKEN_RE.findall(text):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+def split_chunks(text: str, max_tokens: int = 200) -> List[str]:
+    """Split a summary into paragraphs, cutting paragraphs over ``max_tokens`` at sentences."""
+    chunks = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            chunks.append(paragraph)
+            continue
+        current, size = [], 0
+        for sentence in _SENTENCE_RE.split(paragraph):
+            tokens = estimate_tokens(sentence)
+            if current and size + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            current.append(sentence)
+            size += tokens
+        if current:
+            chunks.append(" ".join(current))
+    return chunks
+
+
+class BM25Index:
+    """Incremental in-memory BM25 (Okapi) index.
+
+    Adding a document only touches its own postings and the corpus totals; IDF and the
+    average length are read at query time, so nothing is ever rebuilt.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """Create an empty index with the usual BM25 term-saturation and length weights."""
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = collections.defaultdict(dict)
+        self.lengths: List[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self.lengths)
+
+    def add(self, text: str) -> int:
+        """Index a document and return its id (ids count up from 0)."""
+        doc_id = len(self.lengths)
+        terms = tokenize(text)
+        for term, count in collections.Counter(terms).items():
+            self.postings[term][doc_id] = count
+        self.lengths.append(len(terms))
+        self._total_length += len(terms)
+        return doc_id
+
+    def length_norms(self) -> List[float]:
+        """Return each document's BM25 length normalization against the current corpus."""
+        average_length = self._total_length / len(self.lengths) if self.lengths else 1.0
+        scale = self.b / (average_length or 1.0)
+        return [self.k1 * (1 - self.b + scale * length) for length in self.lengths]
+
+    def term_scores(self, term: str, norms: List[float]) -> List[Tuple[int, float]]:
+        """Return the (doc id, score) contributions of one term to every document holding it."""
+        postings = self.postings.get(term)
+        if not postings:
+            return []
+        n = len(self.lengths)
+        weight = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5)) * (self.k1 + 1)
+        return [(doc_id, weight * tf / (tf + norms[doc_id])) for doc_id, tf in postings.items()]
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        norms: Optional[List[float]] = None,
+        term_cache: Optional[Dict[str, List[Tuple[int, float]]]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to ``k`` (doc id, score) pairs for a query, best first.
+
+        When running many queries, pass ``norms`` from ``length_norms`` and a shared
+        ``term_cache`` dict so terms the queries have in common are scored once.
+        """
+        if not self.lengths:
+            return []
+        norms = norms or self.length_norms()
+        term_cache = {} if term_cache is None else term_cache
+        scores: Dict[int, float] = collections.defaultdict(float)
+        for term in set(tokenize(query)):
+            if term not in term_cache:
+                term_cache[term] = self.term_scores(term, norms)
+            for doc_id, score in term_cache[term]:
+                scores[doc_id] += score
+        best = heapq.nlargest(k, scores, key=scores.__getitem__)
+        return [(doc_id, scores[doc_id]) for doc_id in best]
+
+
+class ResearchIndex:
+    """BM25 index over paragraph-level chunks of a run's web research summaries.
+
+    ``web_research_result`` only ever grows, so ``sync`` indexes just the summaries
+    added since the last call.
+    """
+
+    def __init__(self, max_chunk_tokens: int = 200):
+        """Create an empty index whose chunks hold up to ``max_chunk_tokens`` tokens."""
+        self.max_chunk_tokens = max_chunk_tokens
+        self.index = BM25Index()
+        self.chunks: List[Tuple[int, str]] = []  # (summary position, text) per doc id
+        self.summary_count = 0
+
+    def sync(self, summaries: List[str]) -> int:
+        """Index the summaries not seen yet; return the number of new chunks."""
+        if len(summaries) < self.summary_count:
+            raise ValueError("summaries shrank; research results are append-only")
+        added = 0
+        for position in range(self.summary_count, len(summaries)):
+            for chunk in split_chunks(summaries[position], self.max_chunk_tokens):
+                self.index.add(chunk)
+                self.chunks.append((position, chunk))
+                added += 1
+        self.summary_count = len(summaries)
+        return added
+
+    def retrieve(self, questions: Iterable[str], k: int) -> List[str]:
+        """Return the top ``k`` chunks for each question, without repeats, in research order."""
+        hits = set()
+        norms, term_cache = self.index.length_norms(), {}
+        for question in set(questions):
+            found = self.index.search(question, k, norms, term_cache)
+            hits.update(doc_id for doc_id, _ in found)
+        return [self.chunks[doc_id][1] for doc_id in sorted(hits)]
+
+
+_indexes: "collections.OrderedDict[tuple, ResearchIndex]" = collections.OrderedDict()
+_indexes_lock = threading.Lock()
+MAX_CACHED_INDEXES = 64
+
+
+def get_research_index(run_key: tuple, summaries: List[str]) -> ResearchIndex:
+    """Return the run's index, synced with ``summaries``.
+
+    Indexes are kept per run in a small LRU, so each loop only indexes its new
+    summaries; a run resumed in another process rebuilds its index once.
+    """
+    with _indexes_lock:
+        index: Optional[ResearchIndex] = _indexes.get(run_key)
+        if index is None or index.summary_count > len(summaries):
+            index = ResearchIndex()
+        _indexes[run_key] = index
+        _indexes.move_to_end(run_key)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+        index.sync(summaries)
+    return index
@@ -0,0 +1,168 @@
+"""Deadline, token and cost budgets for a research run."""
+
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from agent.metrics import model_cost
+from agent.utils import estimate_tokens
+
+# Report output assumed when reserving budget for web_build; a typical HTML report
+REPORT_OUTPUT_TOKENS_ESTIMATE = 8000
+
+# A report cut short beats no report: budget caps never go below this many output tokens
+MIN_REPORT_OUTPUT_TOKENS = 1024
+
+
+def run_spend(run_metrics: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Sum the tokens and estimated cost of every model call in ``run_metrics``."""
+    tokens, cost = 0, 0.0
+    for usage in ((run_metrics or {}).get("models") or {}).values():
+        tokens += usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        cost += usage.get("cost_usd", 0.0)
+    return {"tokens": tokens, "cost_usd": cost}
+
+
+def _spend_since(
+    run_metrics: Optional[Dict[str, Any]], spend_baseline: Optional[Dict[str, float]]
+) -> Dict[str, float]:
+    # run_metrics keeps accumulating over a thread's turns; only this run counts
+    spend = run_spend(run_metrics)
+    for key, value in (spend_baseline or {}).items():
+        spend[key] -= value
+    return spend
+
+
+def report_input_tokens(configurable, summaries: List[str]) -> int:
+    """Estimate the input tokens of the report: every report call reads the summaries.
+
+    The sections report mode makes an outline call plus up to ``report_max_sections``
+    section calls; their repeated prefix is mostly a cache read, but still counts
+    towards the token budget.
+    """
+    calls = 1 + configurable.report_max_sections if configurable.report_mode == "sections" else 1
+    return calls * sum(estimate_tokens(summary) for summary in summaries)
+
+
+def report_max_tokens(
+    configurable,
+    max_tokens: int,
+    run_metrics: Optional[Dict[str, Any]],
+    spend_baseline: Optional[Dict[str, float]],
+    prompt_tokens: int,
+    calls: int = 1,
+) -> int:
+    """Cap the output tokens of each of ``calls`` parallel report calls by the budgets left.
+
+    Whatever the token and cost budgets have left, once the ``calls`` prompts of
+    ``prompt_tokens`` each are paid for, is split evenly between the calls. The cap is
+    rounded down to a multiple of MIN_REPORT_OUTPUT_TOKENS (which keeps the pool of
+    model clients small) and never drops below it, so a report is always written.
+
+    Args:
+        configurable: The run's Configuration.
+        max_tokens: The configured output limit of one call.
+        run_metrics: The run's metrics so far, including the current node's.
+        spend_baseline: The spend of the thread's earlier runs.
+        prompt_tokens: The estimated prompt size of one call.
+        calls: The number of report calls sharing the remaining budget.
+    """
+    spend = _spend_since(run_metrics, spend_baseline)
+    limit = max_tokens
+    if configurable.research_token_budget:
+        remaining = configurable.research_token_budget - spend["tokens"] - prompt_tokens * calls
+        limit = min(limit, int(remaining // calls))
+    output_price = model_cost(configurable.answer_model, 0, 1_000_000) / 1_000_000
+    if configurable.research_cost_budget_usd and output_price:
+        remaining_usd = (
+            configurable.research_cost_budget_usd
+            - spend["cost_usd"]
+            - model_cost(configurable.answer_model, prompt_tokens * calls, 0)
+        )
+        limit = min(limit, int(remaining_usd / output_price / calls))
+    if limit >= max_tokens:
+        return max_tokens
+    rounded = limit // MIN_REPORT_OUTPUT_TOKENS * MIN_REPORT_OUTPUT_TOKENS
+    return max(rounded, MIN_REPORT_OUTPUT_TOKENS)
+
+
+def check_budget(
+    configurable,
+    run_started_at: Optional[float],
+    run_metrics: Optional[Dict[str, Any]],
+    spend_baseline: Optional[Dict[str, float]],
+    research_loop_count: int,
+    summaries: List[str],
+    now: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Check a run's deadline and token/cost budgets before another research loop.
+
+    Each budget first holds back what the report will need: ``report_time_reserve_seconds``
+    of the deadline, and the report_input_tokens plus REPORT_OUTPUT_TOKENS_ESTIMATE of
+    output tokens (priced at the answer model) of the token and cost budgets; the report
+    calls are then capped by report_max_tokens to what is left. The next loop is assumed
+    to cost what the loops so far cost on average. ``spend_baseline`` is the spend of
+    the thread's earlier runs, recorded when this run started.
+
+    Returns:
+        A dict with the elapsed time and spend so far, ``fraction_remaining`` (the
+        smallest share of any budget left after the reserve, 1.0 without budgets) and
+        ``stop_reason`` ("deadline", "tokens", "cost") when the next loop would not fit.
+    """
+    now = time.time() if now is None else now
+    elapsed = now - run_started_at if run_started_at else 0.0
+    spend = _spend_since(run_metrics, spend_baseline)
+    loops = max(research_loop_count, 1)
+
+    report_input = report_input_tokens(configurable, summaries)
+    budgets = []
+    if configurable.research_deadline_seconds:
+        budgets.append(
+            (
+                "deadline",
+                configurable.research_deadline_seconds,
+                elapsed,
+                configurable.report_time_reserve_seconds,
+            )
+        )
+    if configurable.research_token_budget:
+        budgets.append(
+            (
+                "tokens",
+                configurable.research_token_budget,
+                spend["tokens"],
+                report_input + REPORT_OUTPUT_TOKENS_ESTIMATE,
+            )
+        )
+    if configurable.research_cost_budget_usd:
+        budgets.append(
+            (
+                "cost",
+                configurable.research_cost_budget_usd,
+                spend["cost_usd"],
+                model_cost(configurable.answer_model, report_input, REPORT_OUTPUT_TOKENS_ESTIMATE),
+            )
+        )
+
+    fraction_remaining, stop_reason = 1.0, None
+    for name, total, spent, reserve in budgets:
+        remaining = total - spent - reserve
+        if stop_reason is None and remaining < spent / loops:
+            stop_reason = name
+        fraction_remaining = min(fraction_remaining, max(remaining, 0.0) / total)
+
+    return {
+        "elapsed_seconds": elapsed,
+        "tokens": spend["tokens"],
+        "cost_usd": spend["cost_usd"],
+        "fraction_remaining": fraction_remaining,
+        "stop_reason": stop_reason,
+    }
+
+
+def trim_follow_ups(queries: List[str], fraction_remaining: float) -> List[str]:
+    """Keep the leading share of follow-up queries that matches the budget left (at least one)."""
+    if not queries or fraction_remaining >= 1.0:
+        return queries
+    return queries[: max(1, math.ceil(len(queries) * fraction_remaining))]
+
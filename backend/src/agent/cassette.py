@@ -0,0 +1,351 @@
+"""Record/replay cassette for model and search calls."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from agent.configuration import load_environment
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _normalize_prompt(prompt: Any) -> Any:
+    """Return a JSON-serializable form of a prompt with today's date masked.
+
+    Prompts embed the current date, so a recording made yesterday would never match
+    without the mask.
+    """
+    from agent.prompts import get_current_date
+
+    current_date = get_current_date()
+    if isinstance(prompt, str):
+        return prompt.replace(current_date, "<current_date>")
+    messages = []
+    for message in prompt:
+        content = message.content if hasattr(message, "content") else message
+        messages.append(
+            json.loads(
+                json.dumps(content, default=str, ensure_ascii=False).replace(
+                    current_date, "<current_date>"
+                )
+            )
+        )
+    return messages
+
+
+class Cassette:
+    """Record/replay store for the agent's outbound model and search calls.
+
+    In ``record`` mode every call goes to the real client and the request, response and
+    latency are saved; in ``replay`` mode responses are served from the store, after the
+    recorded latency multiplied by ``latency_scale``, without touching the network.
+    Requests are keyed by a hash of the call kind, model, generation settings and the
+    prompt (with the current date masked). Payloads are zlib-compressed JSON in SQLite.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        """Open (or create) the store at ``path``.
+
+        Raises:
+            ValueError: If ``mode`` is not one of CASSETTE_MODES.
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Cassette mode must be one of {CASSETTE_MODES}, got '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cassette (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                model TEXT NOT NULL,
+                latency REAL NOT NULL,
+                recorded_at REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+
+    @property
+    def replaying(self) -> bool:
+        """Whether responses are served from the store."""
+        return self.mode == "replay"
+
+    @staticmethod
+    def make_key(kind: str, model: str, params: Dict[str, Any], prompt: Any) -> str:
+        """Build the store key for a call."""
+        raw = json.dumps(
+            [kind, model, params, _normalize_prompt(prompt)],
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def save(self, key: str, kind: str, model: str, latency: float, record: Any) -> None:
+        """Store (or overwrite) the recorded response for a key."""
+        payload = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cassette "
+                "(key, kind, model, latency, recorded_at, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, model, latency, time.time(), payload),
+            )
+            self.recorded += 1
+
+    def load(self, key: str, kind: str, model: str) -> Tuple[float, Any]:
+        """Return the recorded latency and response for a key.
+
+        Raises:
+            CassetteMissError: If the call was never recorded.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latency, payload FROM cassette WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded {kind} call to {model} for key {key[:12]}")
+            self.replayed += 1
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    async def wait(self, latency: float) -> None:
+        """Sleep for a recorded latency, scaled."""
+        if latency > 0 and self.latency_scale > 0:
+            await asyncio.sleep(latency * self.latency_scale)
+
+    def wrap_chat_model(
+        self, chat_model: Any, model: str, params: Dict[str, Any]
+    ) -> "CassetteChatModel":
+        """Wrap a LangChain chat model (None when replaying) built for ``model``."""
+        return CassetteChatModel(self, chat_model, model, params)
+
+    def wrap_genai_client(self, client: Any) -> "CassetteGenaiClient":
+        """Wrap a google-genai client (None when replaying)."""
+        return CassetteGenaiClient(self, client)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the mode, call counters and the number of stored entries."""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM cassette").fetchone()
+        return {
+            "mode": self.mode,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "size": size,
+        }
+
+
+def _dump_message(message) -> Dict[str, Any]:
+    from langchain_core.messages import message_to_dict
+
+    return message_to_dict(message)
+
+
+def _load_message(record: Dict[str, Any]):
+    from langchain_core.messages import messages_from_dict
+
+    return messages_from_dict([record])[0]
+
+
+class _CassetteStructuredModel:
+    def __init__(self, owner: "CassetteChatModel", schema, kwargs: Dict[str, Any]):
+        self.owner = owner
+        self.schema = schema
+        self.kwargs = kwargs
+        self.include_raw = kwargs.get("include_raw", False)
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        owner = self.owner
+        cassette = owner.cassette
+        params = {**owner.params, "schema": self.schema.__name__, **self.kwargs}
+        key = cassette.make_key("structured", owner.model, params, prompt)
+        if cassette.replaying:
+            latency, record = cassette.load(key, "structured", owner.model)
+            await cassette.wait(latency)
+            parsed = (
+                self.schema.model_validate(record["parsed"]) if record["parsed"] is not None else None
+            )
+            if not self.include_raw:
+                return parsed
+            return {"raw": _load_message(record["raw"]), "parsed": parsed, "parsing_error": None}
+
+        started = time.perf_counter()
+        result = await owner.chat_model.with_structured_output(self.schema, **self.kwargs).ainvoke(
+            prompt, config, **kwargs
+        )
+        latency = time.perf_counter() - started
+        if self.include_raw:
+            parsed = result["parsed"]
+            record = {
+                "parsed": parsed.model_dump(mode="json") if parsed is not None else None,
+                "raw": _dump_message(result["raw"]),
+            }
+        else:
+            record = {"parsed": result.model_dump(mode="json")}
+        cassette.save(key, "structured", owner.model, latency, record)
+        return result
+
+
+class CassetteChatModel:
+    """Chat model wrapper that records or replays its calls.
+
+    Covers ``ainvoke``, ``astream`` and ``with_structured_output(...).ainvoke``.
+
+    In replay mode ``chat_model`` is None: no provider client (or API key) is needed.
+    """
+
+    def __init__(self, cassette: Cassette, chat_model: Any, model: str, params: Dict[str, Any]):
+        """Wrap ``chat_model``; ``model`` and ``params`` are part of every store key."""
+        self.cassette = cassette
+        self.chat_model = chat_model
+        self.model = model
+        self.params = params
+
+    def with_structured_output(self, schema, **kwargs) -> _CassetteStructuredModel:
+        """Return a structured-output model whose results are recorded too."""
+        return _CassetteStructuredModel(self, schema, kwargs)
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        """Invoke the model, or replay the recorded message."""
+        cassette = self.cassette
+        key = cassette.make_key("invoke", self.model, self.params, prompt)
+        if cassette.replaying:
+            latency, record = cassette.load(key, "invoke", self.model)
+            await cassette.wait(latency)
+            return _load_message(record)
+
+        started = time.perf_counter()
+        message = await self.chat_model.ainvoke(prompt, config, **kwargs)
+        cassette.save(
+            key, "invoke", self.model, time.perf_counter() - started, _dump_message(message)
+        )
+        return message
+
+    async def astream(self, prompt, config=None, **kwargs) -> AsyncIterator[Any]:
+        """Stream from the model, or replay the recorded chunks on their timeline."""
+        cassette = self.cassette
+        key = cassette.make_key("stream", self.model, self.params, prompt)
+        if cassette.replaying:
+            latency, record = cassette.load(key, "stream", self.model)
+            # chunks are replayed on their recorded timeline (offsets from the request)
+            elapsed = 0.0
+            for offset, chunk in record:
+                await cassette.wait(offset - elapsed)
+                elapsed = offset
+                yield _load_message(chunk)
+            return
+
+        started = time.perf_counter()
+        chunks: List[Tuple[float, Dict[str, Any]]] = []
+        async for chunk in self.chat_model.astream(prompt, config, **kwargs):
+            chunks.append((time.perf_counter() - started, _dump_message(chunk)))
+            yield chunk
+        cassette.save(key, "stream", self.model, time.perf_counter() - started, chunks)
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate anything else to the wrapped chat model."""
+        if self.chat_model is None:
+            raise AttributeError(f"'{name}' is not available on a replaying chat model")
+        return getattr(self.chat_model, name)
+
+
+class _CassetteGenaiModels:
+    def __init__(self, cassette: Cassette, client: Any):
+        self.cassette = cassette
+        self.client = client
+
+    async def generate_content(self, *, model: str, contents, config=None):
+        from google.genai import types
+
+        cassette = self.cassette
+        key = cassette.make_key("search", model, config or {}, contents)
+        if cassette.replaying:
+            latency, record = cassette.load(key, "search", model)
+            await cassette.wait(latency)
+            return types.GenerateContentResponse.model_validate(record)
+
+        started = time.perf_counter()
+        response = await self.client.aio.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        cassette.save(
+            key,
+            "search",
+            model,
+            time.perf_counter() - started,
+            response.model_dump(mode="json", exclude_none=True),
+        )
+        return response
+
+
+class CassetteGenaiClient:
+    """google-genai client wrapper that records or replays its calls.
+
+    Covers ``aio.models.generate_content``, grounding chunks and supports included.
+    """
+
+    def __init__(self, cassette: Cassette, client: Any):
+        """Wrap ``client``, which is None when replaying."""
+        self.client = client
+        self.models = _CassetteGenaiModels(cassette, client)
+
+    @property
+    def aio(self) -> "CassetteGenaiClient":
+        """Return the client itself; only the async API is wrapped."""
+        return self
+
+
+_cassette: Optional[Cassette] = None
+_cassette_loaded = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Return the process-wide cassette configured by the environment, or None.
+
+    Environment:
+        AGENT_CASSETTE_MODE: ``record`` or ``replay``; unset disables the cassette.
+        AGENT_CASSETTE_PATH: SQLite store, default ``.cache/cassette.sqlite``.
+        AGENT_CASSETTE_LATENCY_SCALE: Multiplier for replayed latency, default 1.0
+            (0 replays instantly).
+    """
+    global _cassette, _cassette_loaded
+    with _cassette_lock:
+        if not _cassette_loaded:
+            load_environment()
+            mode = os.getenv("AGENT_CASSETTE_MODE", "").strip().lower()
+            if mode:
+                _cassette = Cassette(
+                    os.getenv("AGENT_CASSETTE_PATH", ".cache/cassette.sqlite"),
+                    mode,
+                    float(os.getenv("AGENT_CASSETTE_LATENCY_SCALE", "1.0")),
+                )
+                logger.info("Cassette %s mode: %s", mode, _cassette.path)
+            _cassette_loaded = True
+    return _cassette
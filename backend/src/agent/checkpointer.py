@@ -0,0 +1,721 @@
+"""SQLite checkpointer that stores long texts out of line, and a resume CLI."""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import uuid
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.types import Send
+
+from agent.configuration import load_environment
+
+logger = logging.getLogger(__name__)
+
+# Strings at least this long are stored once in checkpoint_texts and referenced by hash
+OUT_OF_LINE_MIN_CHARS = 1024
+_TEXT_REF = "__checkpoint_text__"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_texts (
+    hash TEXT PRIMARY KEY,
+    text BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoint_text_refs (
+    thread_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (thread_id, hash)
+);
+CREATE INDEX IF NOT EXISTS checkpoint_text_refs_hash ON checkpoint_text_refs (hash);
+"""
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """Local SQLite checkpointer for the research graph.
+
+    Like LangGraph's in-memory saver, a checkpoint only stores the channels whose
+    version changed, and every finished task's writes are stored as soon as it
+    completes, so a resumed run never repeats a web_research call that already
+    returned, even one from a super-step that was interrupted half way.
+
+    Long strings (search summaries, the research digest) are stored out of line: once
+    per distinct text in ``checkpoint_texts``, zlib-compressed and keyed by hash, with
+    checkpoints and writes holding only the hash. A checkpoint after loop N therefore
+    adds the hashes of the new summaries instead of rewriting all of them. Texts are
+    shared between threads; ``checkpoint_text_refs`` records which threads use each
+    one, and ``delete_thread`` and ``prune`` remove the texts no thread uses any more.
+    """
+
+    def __init__(self, path: str, min_out_of_line_chars: int = OUT_OF_LINE_MIN_CHARS):
+        """Open (or create) the SQLite file at ``path``.
+
+        Args:
+            path: The SQLite file.
+            min_out_of_line_chars: The length from which strings are stored out of line.
+        """
+        super().__init__()
+        self.path = path
+        self.min_out_of_line_chars = min_out_of_line_chars
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Local reads and writes take well under a millisecond, so the connection is used
+        # directly from the event loop; the lock serializes access from worker threads.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._backfill_refs()
+
+    # Out-of-line texts
+
+    def _externalize(self, value: Any, texts: Dict[str, str]) -> Any:
+        """Replace long strings with references into ``texts``.
+
+        Recurses into dicts, tuples, lists and ``Send`` packets (the pending writes of a
+        fan-out). List subclasses such as ``SourceList`` are stored as plain lists, which
+        is what the serializer would turn them into anyway.
+        """
+        if isinstance(value, str):
+            if len(value) < self.min_out_of_line_chars:
+                return value
+            key = hashlib.sha256(value.encode("utf-8")).hexdigest()
+            texts[key] = value
+            return {_TEXT_REF: key}
+        if isinstance(value, list):
+            return [self._externalize(item, texts) for item in value]
+        if type(value) is tuple:
+            return tuple(self._externalize(item, texts) for item in value)
+        if type(value) is dict:
+            return {key: self._externalize(item, texts) for key, item in value.items()}
+        if isinstance(value, Send):
+            return Send(value.node, self._externalize(value.arg, texts))
+        return value
+
+    def _internalize(self, value: Any, cache: Dict[str, str]) -> Any:
+        if type(value) in (list, tuple):
+            return type(value)(self._internalize(item, cache) for item in value)
+        if type(value) is dict:
+            if len(value) == 1 and _TEXT_REF in value:
+                return self._load_text(value[_TEXT_REF], cache)
+            return {key: self._internalize(item, cache) for key, item in value.items()}
+        if isinstance(value, Send):
+            return Send(value.node, self._internalize(value.arg, cache))
+        return value
+
+    def _load_text(self, key: str, cache: Dict[str, str]) -> str:
+        if key not in cache:
+            row = self._conn.execute(
+                "SELECT text FROM checkpoint_texts WHERE hash = ?", (key,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Checkpoint text {key} is missing from {self.path}")
+            cache[key] = zlib.decompress(row[0]).decode("utf-8")
+        return cache[key]
+
+    def _dumps(self, value: Any, texts: Dict[str, str]) -> Tuple[str, bytes]:
+        return self.serde.dumps_typed(self._externalize(value, texts))
+
+    def _loads(self, typed: Tuple[str, bytes], cache: Dict[str, str]) -> Any:
+        return self._internalize(self.serde.loads_typed(typed), cache)
+
+    def _save_texts(self, thread_id: str, texts: Dict[str, str]) -> None:
+        if texts:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO checkpoint_texts (hash, text) VALUES (?, ?)",
+                [(key, zlib.compress(text.encode("utf-8"))) for key, text in texts.items()],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO checkpoint_text_refs (thread_id, hash) VALUES (?, ?)",
+                [(thread_id, key) for key in texts],
+            )
+
+    def _collect_refs(self, value: Any, refs: set) -> None:
+        """Add the hashes of the out-of-line texts referenced by a stored value to ``refs``."""
+        if type(value) in (list, tuple):
+            for item in value:
+                self._collect_refs(item, refs)
+        elif type(value) is dict:
+            if len(value) == 1 and _TEXT_REF in value:
+                refs.add(value[_TEXT_REF])
+            else:
+                for item in value.values():
+                    self._collect_refs(item, refs)
+        elif isinstance(value, Send):
+            self._collect_refs(value.arg, refs)
+
+    def _backfill_refs(self) -> None:
+        """Record the text references of a file written before they were tracked."""
+        query = self._conn.execute
+        if query("SELECT 1 FROM checkpoint_text_refs LIMIT 1").fetchone() is not None:
+            return
+        if query("SELECT 1 FROM checkpoint_texts LIMIT 1").fetchone() is None:
+            return
+        refs = set()
+        rows = query(
+            "SELECT thread_id, type, blob FROM checkpoint_blobs WHERE type != 'empty' "
+            "UNION ALL SELECT thread_id, type, blob FROM checkpoint_writes"
+        )
+        for thread_id, kind, blob in rows:
+            thread_refs: set = set()
+            self._collect_refs(self.serde.loads_typed((kind, blob)), thread_refs)
+            refs.update((thread_id, ref) for ref in thread_refs)
+        self._conn.executemany(
+            "INSERT INTO checkpoint_text_refs (thread_id, hash) VALUES (?, ?)", sorted(refs)
+        )
+
+    def _sweep_texts(self) -> None:
+        """Delete the out-of-line texts that no thread references any more."""
+        self._conn.execute(
+            "DELETE FROM checkpoint_texts WHERE hash NOT IN "
+            "(SELECT hash FROM checkpoint_text_refs)"
+        )
+
+    # Reads
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id = row[:4]
+        cache: Dict[str, str] = {}
+        checkpoint = self.serde.loads_typed((row[4], row[5]))
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = self._conn.execute(
+                "SELECT type, blob FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if blob is not None and blob[0] != "empty":
+                channel_values[channel] = self._loads(blob, cache)
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, blob FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+        def config_for(cid: str) -> RunnableConfig:
+            return {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": cid,
+                }
+            }
+
+        return CheckpointTuple(
+            config=config_for(checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((row[6], row[7])),
+            parent_config=config_for(parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self._loads((kind, blob), cache))
+                for task_id, channel, kind, blob in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint of a thread, or its latest one."""
+        configurable = config["configurable"]
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "checkpoint_type, checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: List[Any] = [configurable["thread_id"], configurable.get("checkpoint_ns", "")]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            return self._tuple(row) if row is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first, optionally filtered by metadata values."""
+        clauses, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "checkpoint_type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                return
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if any(metadata.get(key) != value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                item = self._tuple(row)
+            yield item
+
+    # Writes
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint and the values of the channels that changed in it."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        texts: Dict[str, str] = {}
+        blobs = [
+            (
+                thread_id,
+                checkpoint_ns,
+                channel,
+                str(version),
+                *(self._dumps(values[channel], texts) if channel in values else ("empty", None)),
+            )
+            for channel, version in new_versions.items()
+        ]
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(stored)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._save_texts(thread_id, texts)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        configurable.get("checkpoint_id"),
+                        checkpoint_type,
+                        checkpoint_blob,
+                        metadata_type,
+                        metadata_blob,
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the writes of a finished task against the checkpoint it ran from."""
+        configurable = config["configurable"]
+        key = (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+            task_id,
+        )
+        texts: Dict[str, str] = {}
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append((*key, idx, channel, *self._dumps(value, texts), task_path))
+        # regular writes are kept if already stored; special ones (errors, interrupts) replace
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._save_texts(key[0], texts)
+                for row in rows:
+                    verb = "INSERT OR IGNORE" if row[4] >= 0 else "INSERT OR REPLACE"
+                    self._conn.execute(
+                        f"{verb} INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint and write of a thread, and the texts only it used."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._delete_thread(thread_id)
+                self._sweep_texts()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _delete_thread(self, thread_id: str) -> None:
+        tables = ("checkpoints", "checkpoint_blobs", "checkpoint_writes", "checkpoint_text_refs")
+        for table in tables:
+            self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """Prune the checkpoints of threads, then the texts no thread uses any more.
+
+        Args:
+            thread_ids: The threads to prune.
+            strategy: ``"keep_latest"`` keeps each namespace's latest checkpoint, with
+                its channel values and pending writes; ``"delete"`` deletes the threads.
+        """
+        if strategy not in ("keep_latest", "delete"):
+            raise ValueError(f"Unknown prune strategy: {strategy}")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for thread_id in thread_ids:
+                    if strategy == "delete":
+                        self._delete_thread(thread_id)
+                    else:
+                        self._keep_latest(thread_id)
+                self._sweep_texts()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _keep_latest(self, thread_id: str) -> None:
+        """Drop all but the latest checkpoint of each namespace of a thread."""
+        query = self._conn.execute
+        latest = query(
+            "SELECT checkpoint_ns, MAX(checkpoint_id) FROM checkpoints "
+            "WHERE thread_id = ? GROUP BY checkpoint_ns",
+            (thread_id,),
+        ).fetchall()
+        refs: set = set()
+        for checkpoint_ns, checkpoint_id in latest:
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            row = query(
+                "SELECT checkpoint_type, checkpoint FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                key,
+            ).fetchone()
+            versions = self.serde.loads_typed(row)["channel_versions"]
+            query(
+                "DELETE FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                key,
+            )
+            query(
+                "DELETE FROM checkpoint_writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                key,
+            )
+            blobs = query(
+                "SELECT channel, version, type, blob FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ?",
+                key[:2],
+            ).fetchall()
+            for channel, version, kind, blob in blobs:
+                if versions.get(channel) is not None and str(versions[channel]) == version:
+                    if kind != "empty":
+                        self._collect_refs(self.serde.loads_typed((kind, blob)), refs)
+                    continue
+                query(
+                    "DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND channel = ? AND version = ?",
+                    (*key[:2], channel, version),
+                )
+            for kind, blob in query(
+                "SELECT type, blob FROM checkpoint_writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                key,
+            ).fetchall():
+                self._collect_refs(self.serde.loads_typed((kind, blob)), refs)
+        query("DELETE FROM checkpoint_text_refs WHERE thread_id = ?", (thread_id,))
+        self._conn.executemany(
+            "INSERT INTO checkpoint_text_refs (thread_id, hash) VALUES (?, ?)",
+            [(thread_id, ref) for ref in refs],
+        )
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Return a channel version after ``current``, as LangGraph's in-memory saver does."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def stats(self) -> Dict[str, int]:
+        """Return row counts and the stored size of checkpoints and out-of-line texts."""
+        with self._lock:
+            query = self._conn.execute
+            return {
+                "checkpoints": query("SELECT COUNT(*) FROM checkpoints").fetchone()[0],
+                "channel_bytes": query(
+                    "SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM checkpoint_blobs"
+                ).fetchone()[0],
+                "write_bytes": query(
+                    "SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM checkpoint_writes"
+                ).fetchone()[0],
+                "texts": query("SELECT COUNT(*) FROM checkpoint_texts").fetchone()[0],
+                "text_bytes": query(
+                    "SELECT COALESCE(SUM(LENGTH(text)), 0) FROM checkpoint_texts"
+                ).fetchone()[0],
+            }
+
+    # Async API: the same local calls, made from the event loop
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async get_tuple."""
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async list."""
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async put."""
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async put_writes."""
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async delete_thread."""
+        self.delete_thread(thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        """Async prune."""
+        self.prune(thread_ids, strategy=strategy)
+
+
+_checkpointers: Dict[str, SQLiteCheckpointer] = {}
+_checkpointers_lock = threading.Lock()
+_durable_graph = None
+
+
+def get_checkpointer(path: Optional[str] = None) -> SQLiteCheckpointer:
+    """Return the process-wide checkpointer for a SQLite file.
+
+    Environment:
+        AGENT_CHECKPOINT_PATH: Default file, ``.cache/checkpoints.sqlite``.
+    """
+    if path is None:
+        load_environment()
+        path = os.getenv("AGENT_CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+    path = os.path.abspath(path)
+    with _checkpointers_lock:
+        checkpointer = _checkpointers.get(path)
+        if checkpointer is None:
+            checkpointer = _checkpointers[path] = SQLiteCheckpointer(path)
+    return checkpointer
+
+
+def get_durable_graph():
+    """Return the research graph compiled with the default SQLite checkpointer.
+
+    The ``graph`` served by LangGraph stays without a checkpointer, since the server
+    persists threads itself; this one is for local and batch runs.
+    """
+    global _durable_graph
+    if _durable_graph is None:
+        from agent.graph import build_graph
+
+        _durable_graph = build_graph(get_checkpointer())
+    return _durable_graph
+
+
+# Checkpoint metadata key holding the run's Configuration overrides as JSON
+CONFIGURABLE_METADATA_KEY = "research_configurable"
+
+
+def _thread_config(thread_id: str, configurable: Optional[Dict[str, Any]] = None) -> RunnableConfig:
+    configurable = configurable or {}
+    return {
+        "configurable": {**configurable, "thread_id": thread_id},
+        # saved with every checkpoint, so a resume runs with the same settings; LangGraph
+        # only copies scalar metadata into checkpoints, hence the JSON string
+        "metadata": {CONFIGURABLE_METADATA_KEY: json.dumps(configurable, sort_keys=True)},
+        "recursion_limit": 200,
+    }
+
+
+async def run_research(
+    topic: str, thread_id: Optional[str] = None, configurable: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Run a research topic on the durable graph, checkpointing after every step.
+
+    ``configurable`` (JSON-serializable Configuration overrides) is saved with the
+    checkpoints, so ``resume_research`` continues with the same settings.
+
+    Returns:
+        The final state, with the ``thread_id`` to pass to ``resume_research`` if the
+        run is interrupted.
+    """
+    from langchain_core.messages import HumanMessage
+
+    thread_id = thread_id or str(uuid.uuid4())
+    logger.info("Research thread %s", thread_id)
+    state = await get_durable_graph().ainvoke(
+        {"messages": [HumanMessage(content=topic)]},
+        _thread_config(thread_id, configurable),
+        durability="sync",
+    )
+    return {**state, "thread_id": thread_id}
+
+
+async def resume_research(
+    thread_id: str, configurable: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Resume an interrupted run from its last checkpoint.
+
+    Tasks whose writes were stored (every web_research call that returned) are not run
+    again; the graph continues with the ones that did not finish. The run's original
+    Configuration overrides are re-applied from the checkpoint; ``configurable``
+    overrides them key by key.
+
+    Raises:
+        ValueError: If the thread has no checkpoint, or already finished.
+    """
+    graph = get_durable_graph()
+    snapshot = await graph.aget_state(_thread_config(thread_id))
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint for research thread {thread_id}")
+    if not snapshot.next:
+        raise ValueError(f"Research thread {thread_id} already finished")
+    saved = (snapshot.metadata or {}).get(CONFIGURABLE_METADATA_KEY)
+    config = _thread_config(
+        thread_id, {**(json.loads(saved) if saved else {}), **(configurable or {})}
+    )
+    logger.info("Resuming thread %s at %s", thread_id, ", ".join(snapshot.next))
+    state = await graph.ainvoke(None, config, durability="sync")
+    return {**state, "thread_id": thread_id}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: ``run`` a topic durably or ``resume`` a thread."""
+    parser = argparse.ArgumentParser(description="Durable research runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="research a topic with checkpointing")
+    run.add_argument("topic")
+    run.add_argument("--thread-id", help="defaults to a new UUID")
+    resume = commands.add_parser("resume", help="resume an interrupted thread")
+    resume.add_argument("thread_id")
+    args = parser.parse_args(argv)
+    # the thread id is needed to resume a run that dies, so show it up front
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "run":
+        state = asyncio.run(run_research(args.topic, args.thread_id))
+    else:
+        state = asyncio.run(resume_research(args.thread_id))
+    logger.info("Thread %s: %s", state["thread_id"], state.get("html_filename"))
+
+
+if __name__ == "__main__":
+    main()
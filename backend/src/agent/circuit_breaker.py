@@ -0,0 +1,247 @@
+"""Circuit breakers that skip a failing search or fallback provider."""
+
+import collections
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from agent.metrics import record_circuit_rejected, record_circuit_transition
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitStore:
+    """SQLite file that shares breaker states between worker processes.
+
+    Only state changes go through the file, as compare-and-set updates, so two workers
+    cannot both claim the half-open probe. Error rates are still tracked per process.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) the SQLite file at ``path``."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS circuit_breakers "
+            "(name TEXT PRIMARY KEY, state TEXT NOT NULL, changed_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def load(self, name: str) -> tuple:
+        """Return the shared (state, changed_at) of a breaker, creating it closed."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO circuit_breakers VALUES (?, ?, 0)", (name, CLOSED)
+            )
+            return self._conn.execute(
+                "SELECT state, changed_at FROM circuit_breakers WHERE name = ?", (name,)
+            ).fetchone()
+
+    def compare_and_set(self, name: str, expected: tuple, new: tuple) -> bool:
+        """Move a breaker from ``expected`` to ``new`` unless another worker got there first."""
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "UPDATE circuit_breakers SET state = ?, changed_at = ? "
+                    "WHERE name = ? AND state = ? AND changed_at = ?",
+                    (*new, name, *expected),
+                ).rowcount
+                == 1
+            )
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker for one provider.
+
+    Closed: calls go through and their outcomes are kept for ``window_seconds``. Once
+    at least ``min_calls`` are in the window and ``failure_rate`` of them failed, the
+    circuit opens. Open: ``allow`` refuses every call for ``open_seconds``. Half-open:
+    the next caller is let through as a single probe; its success closes the circuit,
+    its failure opens it again. A probe whose outcome says nothing about the provider's
+    health (a rate limit) is handed back with ``release_probe``; one that never reports
+    back is replaced after ``open_seconds``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window_seconds: float = 60.0,
+        open_seconds: float = 30.0,
+        store: Optional[CircuitStore] = None,
+    ):
+        """Create a closed breaker, or load its state from ``store`` when one is given."""
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.store = store
+        self.rejected = 0
+        self._outcomes = collections.deque()  # (time, ok)
+        self._state = CLOSED
+        self._changed_at = 0.0
+        self._lock = threading.Lock()
+        if store is not None:
+            self._state, self._changed_at = store.load(name)
+
+    @property
+    def state(self) -> str:
+        """Return the current state: closed, half_open or open."""
+        with self._lock:
+            self._sync()
+            return self._state
+
+    def _sync(self) -> None:
+        if self.store is None:
+            return
+        state, changed_at = self.store.load(self.name)
+        # only a successful compare-and-set moves our copy, so any difference is newer
+        if (state, changed_at) != (self._state, self._changed_at):
+            if state == CLOSED:
+                # another worker closed it; its successful probe supersedes our failures
+                self._outcomes.clear()
+            self._state, self._changed_at = state, changed_at
+            record_circuit_transition(self.name, state, changed=False)
+
+    def _transition(self, state: str, now: float) -> bool:
+        if self.store is not None and not self.store.compare_and_set(
+            self.name, (self._state, self._changed_at), (state, now)
+        ):
+            self._sync()
+            return False
+        self._state, self._changed_at = state, now
+        if state == CLOSED:
+            self._outcomes.clear()
+        record_circuit_transition(self.name, state)
+        return True
+
+    def allow(self) -> bool:
+        """Return whether a call may go to the provider now (claims the probe when half-open)."""
+        with self._lock:
+            self._sync()
+            now = time.time()
+            if self._state == CLOSED:
+                return True
+            if now - self._changed_at >= self.open_seconds and self._transition(HALF_OPEN, now):
+                return True
+            self.rejected += 1
+            record_circuit_rejected(self.name)
+            return False
+
+    def release_probe(self) -> None:
+        """Hand back a claimed half-open probe without an outcome, so the next caller probes.
+
+        Only the caller whose ``allow`` claimed the probe should release it.
+        """
+        with self._lock:
+            if self._state != HALF_OPEN:
+                return
+            released = time.time() - self.open_seconds
+            if self.store is not None and not self.store.compare_and_set(
+                self.name, (self._state, self._changed_at), (HALF_OPEN, released)
+            ):
+                self._sync()
+                return
+            self._changed_at = released
+
+    def record_success(self) -> None:
+        """Record a successful call; a successful probe closes the circuit."""
+        with self._lock:
+            now = time.time()
+            self._outcomes.append((now, True))
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED, now)
+            self._prune(now)
+
+    def record_failure(self) -> None:
+        """Record a failed call; it may open the circuit."""
+        with self._lock:
+            now = time.time()
+            self._outcomes.append((now, False))
+            self._prune(now)
+            if self._state == HALF_OPEN:
+                self._transition(OPEN, now)
+            elif self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for _, ok in self._outcomes if not ok)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._transition(OPEN, now)
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the state, how long it has held, and the window's error rate."""
+        with self._lock:
+            self._sync()
+            now = time.time()
+            self._prune(now)
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self._state,
+                "seconds_in_state": now - self._changed_at if self._changed_at else None,
+                "window_calls": calls,
+                "window_failure_rate": failures / calls if calls else 0.0,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[tuple, CircuitBreaker] = {}
+_stores: Dict[str, CircuitStore] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, configurable) -> Optional[CircuitBreaker]:
+    """Return the process-wide breaker for a provider/model and its settings, or None if off."""
+    if not configurable.enable_circuit_breaker:
+        return None
+    state_path = configurable.circuit_state_path
+    key = (
+        name,
+        configurable.circuit_failure_rate,
+        configurable.circuit_min_calls,
+        configurable.circuit_window_seconds,
+        configurable.circuit_open_seconds,
+        os.path.abspath(state_path) if state_path else None,
+    )
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            path, store = key[-1], None
+            if path:
+                store = _stores.get(path)
+                if store is None:
+                    store = _stores[path] = CircuitStore(path)
+            breaker = CircuitBreaker(*key[:-1], store=store)
+            _breakers[key] = breaker
+    return breaker
+
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the stats of every breaker created in this process, by name.
+
+    When runs used different breaker settings for the same provider, each of its
+    breakers is listed with its settings after the name.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.items())
+    names = collections.Counter(key[0] for key, _ in breakers)
+    stats = {}
+    for key, breaker in breakers:
+        label = breaker.name
+        if names[label] > 1:
+            label += " (failure_rate={}, min_calls={}, window={}s, open={}s, store={})".format(
+                *key[1:]
+            )
+        stats[label] = breaker.stats()
+    return stats
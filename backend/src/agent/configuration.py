@@ -5,27 +5,63 @@ from typing import Any, Optional
 from langchain_core.runnables import RunnableConfig
 
 
+_environment_loaded = False
+
+
+def load_environment() -> None:
+    """Load the backend's .env file into the process environment, once.
+
+    Deferred until configuration is first read so importing the agent stays cheap and
+    works in offline tooling without any credentials.
+    """
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _environment_loaded = True
+
+
 class Configuration(BaseModel):
     """The configuration for the agent."""
 
     query_generator_model: str = Field(
-        default="gemini-2.0-flash",
+        default="claude-sonnet-4-20250514",
         metadata={
             "description": "The name of the language model to use for the agent's query generation."
         },
     )
 
     reflection_model: str = Field(
-        default="gemini-2.5-flash-preview-04-17",
+        default="claude-sonnet-4-20250514",
         metadata={
-            "description": "The name of the language model to use for the agent's reflection."
+            "description": "The name of the language model to use for the agent's reflection helpers, such as the rolling research digest."
         },
     )
 
     answer_model: str = Field(
-        default="gemini-2.5-pro-preview-05-06",
+        default="claude-sonnet-4-20250514",
+        metadata={
+            "description": "The name of the language model to use for the agent's answer (the HTML report)."
+        },
+    )
+
+    answer_max_tokens: int = Field(
+        default=64000,
+        metadata={"description": "The maximum number of tokens the answer model may generate."},
+    )
+
+    search_model: str = Field(
+        default="gemini-2.0-flash",
+        metadata={
+            "description": "The name of the Gemini model to use for grounded Google Search."
+        },
+    )
+
+    fallback_model: str = Field(
+        default="gpt-4o-mini",
         metadata={
-            "description": "The name of the language model to use for the agent's answer."
+            "description": "The name of the language model to use when grounded search keeps failing."
         },
     )
 
@@ -40,9 +76,268 @@ class Configuration(BaseModel):
     )
     
     reasoning_model: str = Field(
-        default="gemini-2.5-pro-preview-05-06",
+        default="claude-sonnet-4-20250514",
+        metadata={
+            "description": "The name of the language model to use for the agent's reasoning (the reflection step). A run can override it through the reasoning_model state key."
+        },
+    )
+
+    output_dir: str = Field(
+        default="output",
+        metadata={"description": "The directory web_build writes the HTML report to."},
+    )
+
+    report_context_token_budget: int = Field(
+        default=100_000,
+        metadata={
+            "description": "The maximum number of summary tokens web_build puts in the report prompt. Above it, overlapping summaries are dropped and the most relevant ones kept."
+        },
+    )
+
+    report_duplicate_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Share of a summary's sentences already covered by kept summaries at which context packing drops it as a duplicate."
+        },
+    )
+
+    report_mode: str = Field(
+        default="single",
+        metadata={
+            "description": "How the HTML report is generated: 'single' streams the whole document from one call; 'sections' plans an outline, writes the sections in parallel and assembles them locally."
+        },
+    )
+
+    report_max_sections: int = Field(
+        default=6,
+        metadata={"description": "The maximum number of sections in the 'sections' report mode."},
+    )
+
+    report_section_max_tokens: int = Field(
+        default=8000,
+        metadata={
+            "description": "The maximum number of tokens the answer model may generate per report section."
+        },
+    )
+
+    warm_up_models: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether the server builds every configured model client at startup."
+        },
+    )
+
+    use_research_digest: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether reflection reads a rolling digest of the research instead of every summary gathered so far."
+        },
+    )
+
+    research_digest_max_tokens: int = Field(
+        default=4000,
+        metadata={"description": "The target size of the rolling research digest."},
+    )
+
+    use_retrieval: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether reflection and the report read the BM25 top-ranked paragraphs of the research for each query run instead of every summary."
+        },
+    )
+
+    retrieval_top_k: int = Field(
+        default=3,
+        metadata={
+            "description": "The number of paragraphs retrieved per query (and for the research topic) when use_retrieval is on."
+        },
+    )
+
+    query_dedup_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Shingle similarity at or above which a new search query is dropped as a near-duplicate of one already run. Set above 1 to disable."
+        },
+    )
+
+    search_requests_per_second: float = Field(
+        default=5.0,
+        metadata={
+            "description": "The per-provider request rate that web research calls are admitted at."
+        },
+    )
+
+    search_tokens_per_minute: int = Field(
+        default=1_000_000,
+        metadata={
+            "description": "The per-provider token quota per minute for web research calls."
+        },
+    )
+
+    search_max_in_flight: int = Field(
+        default=16,
+        metadata={
+            "description": "The maximum number of concurrent web research calls per provider."
+        },
+    )
+
+    enable_search_hedging: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether a slow grounded search call is hedged with a duplicate request; the first answer wins."
+        },
+    )
+
+    search_hedge_percentile: float = Field(
+        default=95.0,
+        metadata={
+            "description": "The percentile of recent search latency after which a call is hedged."
+        },
+    )
+
+    search_hedge_max_ratio: float = Field(
+        default=0.1,
+        metadata={
+            "description": "The maximum share of recent search calls that may be hedged, capping the extra load; a quiet stretch only banks a small burst of hedges."
+        },
+    )
+
+    search_hedge_min_samples: int = Field(
+        default=20,
+        metadata={
+            "description": "The number of search latencies to observe before hedging starts."
+        },
+    )
+
+    enable_circuit_breaker: bool = Field(
+        default=True,
+        metadata={
+            "description": "Whether search and fallback calls go through a shared circuit breaker that skips a failing provider."
+        },
+    )
+
+    circuit_failure_rate: float = Field(
+        default=0.5,
+        metadata={
+            "description": "The share of failed calls in the window at which a provider's circuit opens."
+        },
+    )
+
+    circuit_min_calls: int = Field(
+        default=10,
+        metadata={
+            "description": "The minimum number of calls in the window before the failure rate is judged."
+        },
+    )
+
+    circuit_window_seconds: float = Field(
+        default=60.0,
+        metadata={"description": "How far back call outcomes count towards the failure rate."},
+    )
+
+    circuit_open_seconds: float = Field(
+        default=30.0,
+        metadata={
+            "description": "How long an open circuit refuses calls before a half-open probe is let through."
+        },
+    )
+
+    circuit_open_fallback: bool = Field(
+        default=True,
+        metadata={
+            "description": "Whether web_research goes straight to the fallback model while the search circuit is open; otherwise it fails fast."
+        },
+    )
+
+    circuit_state_path: Optional[str] = Field(
+        default=None,
+        metadata={
+            "description": "SQLite file that shares circuit states between worker processes; in-process only when unset."
+        },
+    )
+
+    enable_search_cache: bool = Field(
+        default=True,
+        metadata={
+            "description": "Whether to cache grounded search responses across runs."
+        },
+    )
+
+    search_cache_path: str = Field(
+        default=".cache/search_cache.sqlite",
+        metadata={"description": "The SQLite file that backs the search cache."},
+    )
+
+    search_cache_ttl_seconds: int = Field(
+        default=24 * 60 * 60,
+        metadata={"description": "How long a cached search response stays valid."},
+    )
+
+    search_cache_max_entries: int = Field(
+        default=10_000,
+        metadata={
+            "description": "The maximum number of cached search responses before LRU eviction."
+        },
+    )
+
+    enable_knowledge_store: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether to save web research results across runs and reuse them for similar queries instead of searching. Off by default: a reused result is as old as the run that stored it, and a similar query is not always the same question."
+        },
+    )
+
+    knowledge_store_path: str = Field(
+        default=".cache/knowledge.sqlite",
+        metadata={"description": "The SQLite file that backs the knowledge store."},
+    )
+
+    knowledge_max_age_seconds: int = Field(
+        default=24 * 60 * 60,
+        metadata={
+            "description": "How old a stored research result may be and still be reused. Defaults to the search cache TTL, so reuse is never staler than a cached search."
+        },
+    )
+
+    knowledge_match_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Shingle similarity to a stored query at or above which its result is reused. Set above 1 to only save results."
+        },
+    )
+
+    knowledge_store_max_entries: int = Field(
+        default=100_000,
+        metadata={
+            "description": "The maximum number of stored research results before the oldest are dropped."
+        },
+    )
+
+    research_deadline_seconds: Optional[float] = Field(
+        default=None,
+        metadata={
+            "description": "Wall-clock budget for a run, in seconds from its start. Research stops early enough to write the report before it runs out."
+        },
+    )
+
+    research_token_budget: Optional[int] = Field(
+        default=None,
+        metadata={
+            "description": "The maximum number of model and search tokens (input plus output) a run may spend, the report included."
+        },
+    )
+
+    research_cost_budget_usd: Optional[float] = Field(
+        default=None,
+        metadata={
+            "description": "The maximum estimated model spend of a run in USD, the report included."
+        },
+    )
+
+    report_time_reserve_seconds: float = Field(
+        default=60.0,
         metadata={
-            "description": "The name of the language model to use for the agent's reasoning."
+            "description": "Time held back from research_deadline_seconds for writing the report."
         },
     )
 
@@ -51,6 +346,7 @@ class Configuration(BaseModel):
         cls, config: Optional[RunnableConfig] = None
     ) -> "Configuration":
         """Create a Configuration instance from a RunnableConfig."""
+        load_environment()
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
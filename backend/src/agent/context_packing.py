@@ -0,0 +1,103 @@
+"""Packing of research summaries into the report's token budget."""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+from agent.dedup import query_shingles
+from agent.utils import estimate_tokens, normalize_query
+
+# CJK text has no space after sentence-final punctuation
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])|\n+")
+_CITATION_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+
+
+def _sentence_keys(summary: str) -> List[str]:
+    """Return the normalized sentences of a summary, without its citation links.
+
+    Without the links, the same fact cited from two searches compares equal.
+    """
+    keys = []
+    for sentence in _SENTENCE_RE.split(_CITATION_RE.sub("", summary)):
+        key = normalize_query(sentence)
+        if key:
+            keys.append(key)
+    return keys
+
+
+def relevance(summary: str, topic_shingles) -> float:
+    """Share of the research topic's shingles that occur in a summary."""
+    if not topic_shingles:
+        return 0.0
+    return len(topic_shingles & query_shingles(summary)) / len(topic_shingles)
+
+
+def pack_summaries(
+    summaries: List[str],
+    research_topic: str,
+    token_budget: int,
+    duplicate_threshold: float = 0.8,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """Fit the research summaries into ``token_budget`` tokens for the report prompt.
+
+    Summaries that already fit are returned unchanged, which keeps the prompt prefix the
+    last reflection loop cached. Otherwise:
+
+    1. Overlapping summaries are dropped: one whose sentences (citations ignored) were
+       at least ``duplicate_threshold`` covered by summaries kept before it adds nothing.
+    2. The rest are ranked by how much of the research topic they cover (the same
+       shingles the query deduplication uses) and taken greedily, most relevant first,
+       while they fit; earlier summaries win ties, since the first loop's broad queries
+       frame the report.
+    3. The kept summaries are returned in their original order.
+
+    Returns:
+        A tuple of (packed summaries, report). The report holds the summary counts
+        (input, kept, duplicates and over-budget dropped), the tokens in, kept and
+        dropped, and ``compression`` (input tokens / kept tokens, or 0.0 when no
+        summary fit; the report is stored in graph state and JSON run metrics, which
+        cannot hold infinity).
+    """
+    tokens = [estimate_tokens(summary) for summary in summaries]
+    input_tokens = sum(tokens)
+    report = {
+        "input_summaries": len(summaries),
+        "kept_summaries": len(summaries),
+        "duplicates_dropped": 0,
+        "over_budget_dropped": 0,
+        "input_tokens": input_tokens,
+        "kept_tokens": input_tokens,
+        "dropped_tokens": 0,
+        "compression": 1.0,
+        "token_budget": token_budget,
+    }
+    if input_tokens <= token_budget:
+        return summaries, report
+
+    seen, candidates = set(), []
+    for index, summary in enumerate(summaries):
+        keys = _sentence_keys(summary)
+        repeated = sum(1 for key in keys if key in seen)
+        if keys and repeated / len(keys) >= duplicate_threshold:
+            report["duplicates_dropped"] += 1
+            continue
+        seen.update(keys)
+        candidates.append(index)
+
+    topic_shingles = query_shingles(research_topic)
+    ranked = sorted(candidates, key=lambda i: (-relevance(summaries[i], topic_shingles), i))
+    kept, used = [], 0
+    for index in ranked:
+        if used + tokens[index] <= token_budget:
+            kept.append(index)
+            used += tokens[index]
+        else:
+            report["over_budget_dropped"] += 1
+    kept.sort()
+
+    report.update(
+        kept_summaries=len(kept),
+        kept_tokens=used,
+        dropped_tokens=input_tokens - used,
+        compression=input_tokens / used if used else 0.0,
+    )
+    return [summaries[i] for i in kept], report
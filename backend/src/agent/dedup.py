@@ -0,0 +1,64 @@
+"""Near-duplicate detection for search queries."""
+
+from typing import FrozenSet, Iterable, List, Tuple
+
+from agent.utils import normalize_query
+
+
+def _is_cjk(token: str) -> bool:
+    return any("\u3040" <= c <= "\u9fff" or "\uac00" <= c <= "\ud7af" for c in token)
+
+
+def query_shingles(query: str, size: int = 3) -> FrozenSet[str]:
+    """Return the character shingles of a normalized query.
+
+    Shingles are taken per token, so word order does not matter. CJK tokens, which have
+    no spaces between words, are shingled into character bigrams instead of ``size``-grams.
+    Tokens shorter than the shingle size are kept whole.
+    """
+    shingles = set()
+    # long texts (summaries) repeat most of their words; shingle each distinct word once
+    for token in set(normalize_query(query).split()):
+        n = 2 if _is_cjk(token) else size
+        if len(token) <= n:
+            shingles.add(token)
+        else:
+            shingles.update(token[i : i + n] for i in range(len(token) - n + 1))
+    return frozenset(shingles)
+
+
+def jaccard_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Return the Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def deduplicate_queries(
+    candidates: Iterable[str], history: Iterable[str], threshold: float
+) -> Tuple[List[str], List[str]]:
+    """Drop candidate queries that are near-duplicates of earlier queries.
+
+    A candidate is dropped when its shingle similarity to any query in ``history``, or to
+    a candidate kept earlier in the same batch, reaches ``threshold``. Queries per run
+    number in the hundreds at most, so an exact pairwise Jaccard comparison is cheaper
+    than maintaining MinHash signatures.
+
+    Args:
+        candidates: Queries about to be dispatched, in priority order.
+        history: Queries already run (or dispatched) in this research run.
+        threshold: Similarity in [0, 1] at or above which a query counts as a duplicate.
+
+    Returns:
+        A tuple of (kept queries, dropped queries).
+    """
+    seen = [query_shingles(query) for query in history]
+    kept, dropped = [], []
+    for query in candidates:
+        shingles = query_shingles(query)
+        if any(jaccard_similarity(shingles, other) >= threshold for other in seen):
+            dropped.append(query)
+            continue
+        seen.append(shingles)
+        kept.append(query)
+    return kept, dropped
@@ -1,59 +1,129 @@
+import asyncio
+import logging
 import os
+import random
 import time
-from typing import Optional
 
-from dotenv import load_dotenv
-from google.genai import Client
-from langchain_anthropic import ChatAnthropic
+from langchain_core.exceptions import OutputParserException
 from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
-from langgraph.graph import START, END, StateGraph
-from langgraph.types import Send
+from langgraph.config import get_stream_writer
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Overwrite, Send
+from pydantic import ValidationError
 
+from agent.bm25 import get_research_index
+from agent.budget import check_budget, report_max_tokens, run_spend, trim_follow_ups
+from agent.circuit_breaker import CLOSED, HALF_OPEN, get_circuit_breaker
 from agent.configuration import Configuration
+from agent.context_packing import pack_summaries
+from agent.dedup import deduplicate_queries
+from agent.hedging import get_hedger
+from agent.knowledge_store import get_knowledge_store
+from agent.metrics import (
+    current_node_totals,
+    instrument_node,
+    merge_run_metrics,
+    record_budget_stop,
+    record_fallback,
+    record_hedge,
+    record_knowledge_store,
+    record_model_usage,
+    record_retry,
+    record_search_cache,
+    usage_from_response,
+)
+from agent.models import (
+    FALLBACK_MODEL_PARAMS,
+    OUTLINE_MODEL_PARAMS,
+    QUERY_MODEL_PARAMS,
+    REFLECTION_MODEL_PARAMS,
+    answer_model_params,
+    get_chat_model,
+    get_genai_client,
+    infer_provider,
+    resolve_model_override,
+)
+from agent.prompt_caching import build_research_prompt, prompt_text
 from agent.prompts import (
-    answer_instructions,
+    digest_instructions,
     get_current_date,
+    html_prompt,
     query_writer_instructions,
     reflection_instructions,
+    report_outline_instructions,
+    section_prompt,
     web_searcher_instructions,
-    html_prompt,
 )
+from agent.report_store import get_report_store
+from agent.report_template import render_report
+from agent.scheduler import (
+    SEARCH_OUTPUT_TOKENS_ESTIMATE,
+    get_scheduler,
+    is_rate_limit_error,
+)
+from agent.search_cache import get_search_cache
 from agent.state import (
     OverallState,
     QueryGenerationState,
     ReflectionState,
+    SectionState,
     WebSearchState,
 )
-from agent.tools_and_schemas import Reflection, SearchQueryList
+from agent.tools_and_schemas import Reflection, ReportOutline, SearchQueryList
 from agent.utils import (
+    estimate_tokens,
     get_citations,
+    get_message_text,
     get_research_topic,
     insert_citation_markers,
     resolve_urls,
 )
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+_JSON_PARSER = JsonOutputParser()
 
-if os.getenv("GEMINI_API_KEY") is None:
-    raise ValueError("GEMINI_API_KEY is not set")
 
-# Used for Google Search API
-genai_client = Client(api_key=os.getenv("GEMINI_API_KEY"))
-global_llm  = ChatAnthropic(
-            model="claude-sonnet-4-20250514",
-            temperature=0.3,
-            max_tokens=64000,
-            api_key=os.getenv("ANTHROPIC_API_KEY"),
+async def _ainvoke_structured(model: str, params: dict, schema, prompt):
+    """Invoke a model with structured output and record its token usage."""
+    llm = get_chat_model(model, **params)
+    result = await llm.with_structured_output(schema, include_raw=True).ainvoke(prompt)
+    record_model_usage(model, result["raw"])
+    if result["parsing_error"] is not None:
+        raise result["parsing_error"]
+    return result["parsed"]
+
+
+async def _ainvoke_json(model: str, params: dict, schema, prompt):
+    """Invoke a model on a prompt that asks for a JSON answer and parse it into ``schema``.
+
+    Unlike ``_ainvoke_structured`` no tool is bound. Anthropic's cached prefix covers the
+    tools, then the system prompt, then the messages, so a call over the research
+    summaries that sends the schema as a tool can never share its cached prefix with the
+    report calls, which stream without tools. A reply that does not parse is retried
+    with tool calling.
+    """
+    llm = get_chat_model(model, **params)
+    response = await llm.ainvoke(prompt)
+    record_model_usage(model, response)
+    try:
+        return schema.model_validate(_JSON_PARSER.parse(get_message_text(response)))
+    except (OutputParserException, ValidationError) as error:
+        logger.warning(
+            "%s reply was not valid JSON, retrying with tool calling: %s", schema.__name__, error
         )
+        return await _ainvoke_structured(model, params, schema, prompt)
+
 
 # Nodes
-def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
+@instrument_node
+async def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
     """LangGraph node that generates a search queries based on the User's question.
 
-    Uses Gemini 2.0 Flash to create an optimized search query for web research based on
-    the User's question.
+    Uses the configured query generator model to create optimized search queries for web
+    research based on the User's question.
 
     Args:
         state: Current graph state containing the User's question
@@ -63,13 +133,13 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
         Dictionary with state update, including search_query key containing the generated query
     """
     configurable = Configuration.from_runnable_config(config)
+    # every run enters here; the deadline budget counts from this point
+    run_started_at = time.time()
 
     # check for custom initial search query count
     if state.get("initial_search_query_count") is None:
         state["initial_search_query_count"] = configurable.number_of_initial_queries
 
-    structured_llm = global_llm.with_structured_output(SearchQueryList)
-
     # Format the prompt
     current_date = get_current_date()
     formatted_prompt = query_writer_instructions.format(
@@ -78,26 +148,167 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
         number_queries=state["initial_search_query_count"],
     )
     # Generate the search queries
-    result = structured_llm.invoke(formatted_prompt)
-    return {"query_list": result.query}
+    result = await _ainvoke_structured(
+        configurable.query_generator_model, QUERY_MODEL_PARAMS, SearchQueryList, formatted_prompt
+    )
+
+    # Drop near-duplicate queries, including ones already run earlier in this thread
+    query_list, dropped = deduplicate_queries(
+        result.query, state.get("search_query") or [], configurable.query_dedup_threshold
+    )
+    if dropped:
+        logger.info("Skipped %d near-duplicate queries: %s", len(dropped), dropped)
+    return {
+        "query_list": query_list,
+        "pending_searches": [
+            {"search_query": query, "id": idx} for idx, query in enumerate(query_list)
+        ],
+        "deduplicated_query_count": len(dropped),
+        "run_started_at": run_started_at,
+        "run_spend_baseline": run_spend(state.get("run_metrics")),
+    }
+
+
+@instrument_node
+async def knowledge_lookup(state: OverallState, config: RunnableConfig) -> OverallState:
+    """LangGraph node that answers pending searches from earlier runs' research.
+
+    Each query about to be searched is looked up in the cross-run knowledge store. A
+    fresh result for a close enough query is reused as this query's research result,
+    with its sources; only the queries without one are left for web research.
+
+    Args:
+        state: Current graph state containing the pending searches
+        config: Configuration for the runnable, including the knowledge store settings
 
+    Returns:
+        Dictionary with state update: the reused results and the searches still pending
+    """
+    configurable = Configuration.from_runnable_config(config)
+    store = get_knowledge_store(configurable)
+    if store is None:
+        return {}
 
-def continue_to_web_research(state: QueryGenerationState):
-    """LangGraph node that sends the search queries to the web research node.
+    pending, search_query, results, sources = [], [], [], []
+    for search in state["pending_searches"]:
+        match = store.lookup(search["search_query"], configurable.knowledge_match_threshold)
+        record_knowledge_store(hit=match is not None)
+        if match is None:
+            pending.append(search)
+            continue
+        logger.info(
+            "Reusing research from %s for: %s (matched '%s', similarity %.2f)",
+            match["prompt_date"],
+            search["search_query"],
+            match["query"],
+            match["similarity"],
+        )
+        search_query.append(search["search_query"])
+        results.append(match["summary"])
+        sources.extend(match["sources"])
+    return {
+        "pending_searches": pending,
+        "search_query": search_query,
+        "web_research_result": results,
+        "sources_gathered": sources,
+    }
 
-    This is used to spawn n number of web research nodes, one for each search query.
+
+def continue_to_web_research(state: OverallState):
+    """LangGraph routing function that sends the pending searches to the web research node.
+
+    This is used to spawn n number of web research nodes, one for each search query. When
+    the knowledge store answered every query, the research goes straight to reflection.
     """
+    if not state["pending_searches"]:
+        return "reflection"
     return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
-        for idx, search_query in enumerate(state["query_list"])
+        Send("web_research", {"search_query": search["search_query"], "id": int(search["id"])})
+        for search in state["pending_searches"]
     ]
 
 
-def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
+def _build_search_result(state: WebSearchState, response) -> OverallState:
+    """Turn a grounded search response into the web_research state update."""
+    # resolve the urls to short urls for saving tokens and time
+    resolved_urls = resolve_urls(response.candidates[0].grounding_metadata.grounding_chunks)
+    # Gets the citations and adds them to the generated text
+    citations = get_citations(response, resolved_urls)
+    modified_text = insert_citation_markers(response.text, citations)
+    sources_gathered = [item for citation in citations for item in citation["segments"]]
+
+    return {
+        "sources_gathered": sources_gathered,
+        "search_query": [state["search_query"]],
+        "web_research_result": [modified_text],
+    }
+
+
+async def _fallback_research(state: WebSearchState, configurable: Configuration) -> OverallState:
+    """Answer a search query from the fallback model when grounded search is unavailable."""
+    record_fallback(configurable.fallback_model)
+    fallback_breaker = get_circuit_breaker(f"fallback:{configurable.fallback_model}", configurable)
+    if fallback_breaker is not None and not fallback_breaker.allow():
+        logger.warning("Fallback circuit open, skipping the fallback model")
+        return _unavailable_result(state)
+    # 使用 OpenAI 作为备用方案进行简单的文本生成
+    try:
+        fallback_llm = get_chat_model(configurable.fallback_model, **FALLBACK_MODEL_PARAMS)
+
+        fallback_prompt = f"""
+        Research the following topic and provide a comprehensive summary:
+        Topic: {state["search_query"]}
+
+        Please provide:
+        1. Key information about the topic
+        2. Important facts and details
+        3. Current developments or status
+
+        Note: This is a fallback response due to search API connectivity issues.
+        """
+
+        async with get_scheduler(infer_provider(configurable.fallback_model), configurable).slot(
+            priority=state["id"], tokens=estimate_tokens(fallback_prompt) + 1000
+        ):
+            fallback_result = await fallback_llm.ainvoke(fallback_prompt)
+        record_model_usage(configurable.fallback_model, fallback_result)
+        if fallback_breaker is not None:
+            fallback_breaker.record_success()
+
+        return {
+            "sources_gathered": [{
+                "value": "Fallback response due to API connectivity issues",
+                "short_url": "#fallback",
+                "title": "Fallback Research"
+            }],
+            "search_query": [state["search_query"]],
+            "web_research_result": [f"[备用回复] {fallback_result.content}"],
+        }
+
+    except Exception as fallback_error:
+        print(f"❌ Fallback also failed: {fallback_error}")
+        if fallback_breaker is not None:
+            fallback_breaker.record_failure()
+        return _unavailable_result(state)
+
+
+def _unavailable_result(state: WebSearchState) -> OverallState:
+    """Record that the query could not be researched, the final fallback."""
+    return {
+        "sources_gathered": [],
+        "search_query": [state["search_query"]],
+        "web_research_result": [f"抱歉，由于网络连接问题，无法完成对 '{state['search_query']}' 的研究。请检查网络连接或稍后重试。"],
+    }
+
+
+@instrument_node
+async def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """LangGraph node that performs web research using the native Google Search API tool.
 
     Executes a web search using the native Google Search API tool in combination with Gemini 2.0 Flash.
-    Includes retry mechanism for handling network connection issues.
+    Includes retry mechanism for handling network connection issues. The search call and the
+    retry backoff are awaited on the event loop, so a large Send fan-out does not tie up
+    worker threads.
 
     Args:
         state: Current graph state containing the search query and research loop count
@@ -108,98 +319,141 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """
     # Configure
     configurable = Configuration.from_runnable_config(config)
+    current_date = get_current_date()
     formatted_prompt = web_searcher_instructions.format(
-        current_date=get_current_date(),
+        current_date=current_date,
         research_topic=state["search_query"],
     )
 
+    # 先查搜索缓存，命中时直接用缓存的 grounding metadata 生成引用，无需网络请求
+    search_cache = get_search_cache(configurable)
+    if search_cache is not None:
+        cached_response = search_cache.get(
+            state["search_query"], configurable.search_model, current_date
+        )
+        record_search_cache(hit=cached_response is not None)
+        if cached_response is not None:
+            logger.info("Search cache hit: %s", state["search_query"])
+            return _build_search_result(state, cached_response)
+
+    # 熔断器：搜索服务持续出错时，所有运行共享打开状态，直接走备用方案（或快速失败）
+    search_breaker = get_circuit_breaker(f"search:{configurable.search_model}", configurable)
+    if search_breaker is not None and not search_breaker.allow():
+        logger.warning("Search circuit open, skipping search for: %s", state["search_query"])
+        if configurable.circuit_open_fallback:
+            return await _fallback_research(state, configurable)
+        return _unavailable_result(state)
+    # allowed while half-open: this call is the circuit's single probe
+    probing = search_breaker is not None and search_breaker.state == HALF_OPEN
+
     # 重试机制参数
     max_retries = 3
     base_delay = 2  # 基础延迟秒数
+
+    # 所有分支共享同一个调度器：限制并发数和请求/令牌速率，按查询 id 的优先级排队
+    scheduler = get_scheduler("gemini", configurable)
+    estimated_tokens = estimate_tokens(formatted_prompt) + SEARCH_OUTPUT_TOKENS_ESTIMATE
     
+    def search():
+        # Uses the google genai client as the langchain client doesn't return grounding metadata
+        return get_genai_client().aio.models.generate_content(
+            model=configurable.search_model,
+            contents=formatted_prompt,
+            config={
+                "tools": [{"google_search": {}}],
+                "temperature": 0,
+            },
+        )
+
+    # 对冲请求：调用超过近期延迟的分位数仍未返回时，再发一个重复请求，先返回者胜出
+    hedger = get_hedger(configurable.search_model, configurable)
+
     for attempt in range(max_retries):
         try:
-            # Uses the google genai client as the langchain client doesn't return grounding metadata
-            response = genai_client.models.generate_content(
-                model=configurable.query_generator_model,
-                contents=formatted_prompt,
-                config={
-                    "tools": [{"google_search": {}}],
-                    "temperature": 0,
-                },
-            )
+            async with scheduler.slot(priority=state["id"], tokens=estimated_tokens):
+                if hedger is None:
+                    response = await search()
+                else:
+                    response = await hedger.run(
+                        search,
+                        # hedges only use spare rate-limit budget
+                        may_hedge=lambda: scheduler.try_reserve(estimated_tokens),
+                        on_hedge=lambda outcome: record_hedge(configurable.search_model, outcome),
+                    )
+            if search_breaker is not None:
+                search_breaker.record_success()
+            record_model_usage(configurable.search_model, response)
+            usage = response.usage_metadata
+            if usage is not None and usage.total_token_count:
+                scheduler.record_usage(estimated_tokens, usage.total_token_count)
             
             # 如果成功，处理响应并返回结果
-            # resolve the urls to short urls for saving tokens and time
-            resolved_urls = resolve_urls(
-                response.candidates[0].grounding_metadata.grounding_chunks, state["id"]
-            )
-            # Gets the citations and adds them to the generated text
-            citations = get_citations(response, resolved_urls)
-            modified_text = insert_citation_markers(response.text, citations)
-            sources_gathered = [item for citation in citations for item in citation["segments"]]
-
-            return {
-                "sources_gathered": sources_gathered,
-                "search_query": [state["search_query"]],
-                "web_research_result": [modified_text],
-            }
+            result = _build_search_result(state, response)
+            if search_cache is not None:
+                search_cache.put(
+                    state["search_query"], configurable.search_model, current_date, response
+                )
+            knowledge_store = get_knowledge_store(configurable)
+            if knowledge_store is not None:
+                knowledge_store.save(
+                    state["search_query"],
+                    current_date,
+                    result["web_research_result"][0],
+                    result["sources_gathered"],
+                )
+            return result
             
         except Exception as e:
             error_msg = str(e)
             print(f"🔄 Web research attempt {attempt + 1}/{max_retries} failed: {error_msg}")
+            rate_limited = is_rate_limit_error(e)
+            if rate_limited:
+                # 429：让调度器对所有分支统一冷却，而不是每个分支各自重试
+                cooldown = scheduler.note_rate_limited()
+                logger.warning("Search provider rate limited, pausing dispatch for %.0fs", cooldown)
             
-            # 如果是最后一次尝试，使用备用方案
-            if attempt == max_retries - 1:
+            if search_breaker is not None:
+                if not rate_limited:
+                    search_breaker.record_failure()
+                elif probing:
+                    # a 429 says nothing about the provider's health: let another call probe
+                    search_breaker.release_probe()
+
+            # 如果是最后一次尝试，或熔断器已打开，使用备用方案
+            if attempt == max_retries - 1 or (
+                search_breaker is not None and search_breaker.state != CLOSED
+            ):
                 print("❌ All attempts failed, using fallback response")
-                # 使用 OpenAI 作为备用方案进行简单的文本生成
-                try:
-                    fallback_llm = ChatOpenAI(
-                        model="gpt-4o-mini",
-                        temperature=0.1,
-                        max_tokens=1000
-                    )
-                    
-                    fallback_prompt = f"""
-                    Research the following topic and provide a comprehensive summary:
-                    Topic: {state["search_query"]}
-                    
-                    Please provide:
-                    1. Key information about the topic
-                    2. Important facts and details
-                    3. Current developments or status
-                    
-                    Note: This is a fallback response due to search API connectivity issues.
-                    """
-                    
-                    fallback_result = fallback_llm.invoke(fallback_prompt)
-                    
-                    return {
-                        "sources_gathered": [{
-                            "value": "Fallback response due to API connectivity issues",
-                            "short_url": "#fallback",
-                            "title": "Fallback Research"
-                        }],
-                        "search_query": [state["search_query"]],
-                        "web_research_result": [f"[备用回复] {fallback_result.content}"],
-                    }
-                    
-                except Exception as fallback_error:
-                    print(f"❌ Fallback also failed: {fallback_error}")
-                    # 最终备用方案：返回基本信息
-                    return {
-                        "sources_gathered": [],
-                        "search_query": [state["search_query"]],
-                        "web_research_result": [f"抱歉，由于网络连接问题，无法完成对 '{state['search_query']}' 的研究。请检查网络连接或稍后重试。"],
-                    }
-            else:
-                # 指数退避延迟
-                delay = base_delay * (2 ** attempt)
-                print(f"⏳ Waiting {delay} seconds before retry...")
-                time.sleep(delay)
-
-
-def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
+                return await _fallback_research(state, configurable)
+            record_retry(configurable.search_model)
+            if not rate_limited:
+                # 指数退避延迟（带抖动，避免所有分支同时重试）
+                delay = base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"⏳ Waiting {delay:.1f} seconds before retry...")
+                await asyncio.sleep(delay)
+
+
+def _retrieve_research(state: OverallState, research_topic: str, top_k: int) -> list:
+    """Return the BM25 top-``top_k`` research paragraphs for the topic and each query run.
+
+    The run's index lives in memory across loops, so each call only indexes the
+    summaries that arrived since the last one.
+    """
+    started = time.perf_counter()
+    run_key = (state.get("run_started_at"), tuple(state["search_query"][:1]))
+    index = get_research_index(run_key, state["web_research_result"])
+    chunks = index.retrieve([research_topic, *state["search_query"]], top_k)
+    logger.info(
+        "Retrieved %d/%d research paragraphs in %.1f ms",
+        len(chunks),
+        len(index.chunks),
+        (time.perf_counter() - started) * 1000,
+    )
+    return chunks
+
+
+@instrument_node
+async def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     """LangGraph node that identifies knowledge gaps and generates potential follow-up queries.
 
     Analyzes the current summary to identify areas for further research and generates
@@ -216,23 +470,119 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     configurable = Configuration.from_runnable_config(config)
     # Increment the research loop count and get the reasoning model
     state["research_loop_count"] = state.get("research_loop_count", 0) + 1
-    reasoning_model = state.get("reasoning_model") or configurable.reasoning_model
+    reasoning_model = resolve_model_override(
+        state.get("reasoning_model"), configurable.reasoning_model
+    )
 
     # Format the prompt
     current_date = get_current_date()
-    formatted_prompt = reflection_instructions.format(
-        current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
+    research_topic = get_research_topic(state["messages"])
+    digest_update = {}
+    cache_update = {}
+    if configurable.use_research_digest:
+        # Fold only the summaries gathered since the last loop into the running digest,
+        # so the reflection prompt stays roughly the same size on every loop
+        digest = state.get("research_digest") or ""
+        new_results = state["web_research_result"][state.get("digested_result_count") or 0 :]
+        if new_results:
+            digest_llm = get_chat_model(configurable.reflection_model, **REFLECTION_MODEL_PARAMS)
+            digest_result = await digest_llm.ainvoke(
+                digest_instructions.format(
+                    research_topic=research_topic,
+                    current_date=current_date,
+                    max_tokens=configurable.research_digest_max_tokens,
+                    digest=digest or "(empty)",
+                    summaries="\n\n---\n\n".join(new_results),
+                )
+            )
+            record_model_usage(configurable.reflection_model, digest_result)
+            digest = digest_result.content
+        summaries = [digest]
+        digest_update = {
+            "research_digest": digest,
+            "digested_result_count": len(state["web_research_result"]),
+        }
+    elif configurable.use_retrieval:
+        new_results = state["web_research_result"]
+        summaries = _retrieve_research(state, research_topic, configurable.retrieval_top_k)
+    else:
+        new_results = state["web_research_result"]
+        summaries = state["web_research_result"]
+        # the next loop (or the report) reads the prefix this call caches
+        cache_update = {"cached_result_count": len(summaries)}
+
+    # The digest and the retrieved paragraphs change every loop, so only the full
+    # summaries get cache breakpoints
+    formatted_prompt = build_research_prompt(
+        reasoning_model,
+        research_topic,
+        current_date,
+        summaries,
+        reflection_instructions.format(research_topic=research_topic),
+        cached_count=state.get("cached_result_count") or 0,
+        cache_write=bool(cache_update),
+    )
+    prompt_tokens = {
+        "loop": state["research_loop_count"],
+        "prompt_tokens": estimate_tokens(prompt_text(formatted_prompt)),
+        "summary_tokens": sum(estimate_tokens(summary) for summary in summaries),
+        "new_result_tokens": sum(estimate_tokens(text) for text in new_results),
+    }
+    logger.info(
+        "Reflection loop %d prompt tokens: %d", prompt_tokens["loop"], prompt_tokens["prompt_tokens"]
     )
-    result = global_llm.with_structured_output(Reflection).invoke(formatted_prompt)
+    # prompted JSON rather than a tool call, so the tool-less report reads this cache
+    result = await _ainvoke_json(
+        reasoning_model, REFLECTION_MODEL_PARAMS, Reflection, formatted_prompt
+    )
+
+    # Follow-up queries often restate searches that already ran; only dispatch new ones
+    follow_up_queries, dropped = deduplicate_queries(
+        result.follow_up_queries, state["search_query"], configurable.query_dedup_threshold
+    )
+    if dropped:
+        logger.info("Skipped %d near-duplicate follow-up queries: %s", len(dropped), dropped)
+
+    # Anytime mode: fewer follow-ups as the deadline/budget runs down, none once the next
+    # loop would leave too little to write the report
+    budget = check_budget(
+        configurable,
+        state.get("run_started_at"),
+        merge_run_metrics(state.get("run_metrics"), current_node_totals()),
+        state.get("run_spend_baseline"),
+        state["research_loop_count"],
+        state["web_research_result"],
+    )
+    if budget["stop_reason"] and not result.is_sufficient:
+        logger.info("Research budget (%s) nearly spent, writing the report", budget["stop_reason"])
+        record_budget_stop(budget["stop_reason"])
+    elif budget["fraction_remaining"] < 1.0:
+        kept = trim_follow_ups(follow_up_queries, budget["fraction_remaining"])
+        if len(kept) < len(follow_up_queries):
+            logger.info(
+                "Budget %.0f%% left, running %d/%d follow-up queries",
+                budget["fraction_remaining"] * 100,
+                len(kept),
+                len(follow_up_queries),
+            )
+        follow_up_queries = kept
 
     return {
         "is_sufficient": result.is_sufficient,
         "knowledge_gap": result.knowledge_gap,
-        "follow_up_queries": result.follow_up_queries,
+        "follow_up_queries": follow_up_queries,
         "research_loop_count": state["research_loop_count"],
         "number_of_ran_queries": len(state["search_query"]),
+        "pending_searches": [
+            {"search_query": query, "id": len(state["search_query"]) + idx}
+            for idx, query in enumerate(follow_up_queries)
+        ],
+        "deduplicated_query_count": len(dropped),
+        "reflection_prompt_tokens": [prompt_tokens],
+        "budget_exhausted": budget["stop_reason"] is not None,
+        "budget_status": budget,
+        **digest_update,
+        **cache_update,
     }
 
 
@@ -250,7 +600,8 @@ def evaluate_research(
         config: Configuration for the runnable, including max_research_loops setting
 
     Returns:
-        String literal indicating the next node to visit ("web_research" or "finalize_summary")
+        String literal indicating the next node to visit ("knowledge_lookup", or the first
+        report node: "web_build" or "plan_report")
     """
     configurable = Configuration.from_runnable_config(config)
     max_research_loops = (
@@ -258,19 +609,17 @@ def evaluate_research(
         if state.get("max_research_loops") is not None
         else configurable.max_research_loops
     )
-    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
-        return "web_build"
+    if (
+        state["is_sufficient"]
+        or state["research_loop_count"] >= max_research_loops
+        # every follow-up query was a near-duplicate of one already run
+        or not state["follow_up_queries"]
+        # the deadline or token/cost budget leaves only enough for the report
+        or state.get("budget_exhausted")
+    ):
+        return _report_node(configurable)
     else:
-        return [
-            Send(
-                "web_research",
-                {
-                    "search_query": follow_up_query,
-                    "id": state["number_of_ran_queries"] + int(idx),
-                },
-            )
-            for idx, follow_up_query in enumerate(state["follow_up_queries"])
-        ]
+        return "knowledge_lookup"
 
 
 # def finalize_answer(state: OverallState, config: RunnableConfig):
@@ -332,82 +681,387 @@ def evaluate_research(
 #     }
 
 
-def web_build(state: OverallState, config: RunnableConfig):
+async def _report_summaries(state: OverallState, configurable: Configuration, research_topic: str):
+    """Return the summaries the report is written from, the packing report and cached count.
+
+    Fits the summaries into the report's token budget: overlapping summaries are dropped
+    and the most relevant ones kept when all of them would not fit (CPU-bound on long
+    runs). The cached count is the summaries prefix the last reflection loop cached,
+    or 0 when packing or retrieval changed it.
+    """
+    summaries = state["web_research_result"]
+    if configurable.use_retrieval:
+        summaries = _retrieve_research(state, research_topic, configurable.retrieval_top_k)
+    summaries, report_context = await asyncio.to_thread(
+        pack_summaries,
+        summaries,
+        research_topic,
+        configurable.report_context_token_budget,
+        configurable.report_duplicate_threshold,
+    )
+    if report_context["dropped_tokens"]:
+        logger.info(
+            "Report context packed %d -> %d tokens (%.1fx), dropped %d duplicate and %d "
+            "less relevant summaries",
+            report_context["input_tokens"],
+            report_context["kept_tokens"],
+            report_context["compression"],
+            report_context["duplicates_dropped"],
+            report_context["over_budget_dropped"],
+        )
+    if report_context["dropped_tokens"] or configurable.use_retrieval:
+        cached_count = 0
+    else:
+        cached_count = state.get("cached_result_count") or 0
+    return summaries, report_context, cached_count
+
+
+async def _open_report(configurable: Configuration, research_topic: str):
+    """Open a report writer in the report store, off the event loop."""
+    return await asyncio.to_thread(
+        lambda: get_report_store(configurable.output_dir).writer(research_topic)
+    )
+
+
+def _report_published(state: OverallState, configurable: Configuration, record: dict) -> dict:
+    """Announce a report published to the store and return the final state update."""
+    html_filename = os.path.join(configurable.output_dir, record["name"])
+    get_stream_writer()(
+        {
+            "event": "html_done",
+            "html_filename": html_filename,
+            "report_url": f"/reports/{record['name']}",
+            "bytes_written": record["bytes"],
+        }
+    )
+    return {
+        "html_filename": html_filename,
+        "html_bytes": record["bytes"],
+        "messages": state["messages"] + [AIMessage(content=f"HTML报告已生成并保存为: {html_filename}")]
+    }
+
+
+@instrument_node
+async def web_build(state: OverallState, config: RunnableConfig):
     """LangGraph node that generates an HTML file based on the research results.
 
     Takes the finalized research content and creates a beautiful HTML page
-    with proper styling and structure.
+    with proper styling and structure. The HTML is streamed from the model and appended
+    to the output file chunk by chunk; each chunk is also emitted as a custom stream event
+    (``stream_mode="custom"``) so clients can render the report while it is generated.
 
     Args:
         state: Current graph state containing the finalized research content and sources
         config: Configuration for the runnable
 
     Returns:
-        Dictionary with state update, including html_content key containing the generated HTML
+        Dictionary with state update, including the html_filename and html_bytes of the report
     """
     configurable = Configuration.from_runnable_config(config)
-    
-    # Get the research content from the last message
-    research_content = state["messages"][-1].content if state["messages"] else ""
     research_topic = get_research_topic(state["messages"])
-    
+    summaries, report_context, cached_count = await _report_summaries(
+        state, configurable, research_topic
+    )
+
     # Create the HTML generation prompt
-    formatted_html_prompt = html_prompt.format(
-        research_topic=research_topic,
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
+    # Reads the summaries prefix cached by the last reflection loop (unless packing changed
+    # it); nothing runs after the report, so it writes no cache of its own
+    formatted_html_prompt = build_research_prompt(
+        configurable.answer_model,
+        research_topic,
+        get_current_date(),
+        summaries,
+        html_prompt.format(research_topic=research_topic),
+        cached_count=cached_count,
+        cache_write=False,
     )
     
+    # Stream the HTML into the report store; only the current chunk is held in memory, and
+    # the report appears under its content-addressed name once complete. File writes run
+    # in a worker thread so a slow disk never stalls the event loop
+    max_tokens = report_max_tokens(
+        configurable,
+        configurable.answer_max_tokens,
+        merge_run_metrics(state.get("run_metrics"), current_node_totals()),
+        state.get("run_spend_baseline"),
+        estimate_tokens(prompt_text(formatted_html_prompt)),
+    )
+    if max_tokens < configurable.answer_max_tokens:
+        logger.info("Research budget caps the report at %d output tokens", max_tokens)
 
-    # Generate HTML content
-    html_result = global_llm.invoke(formatted_html_prompt)
-    
-    # Save HTML to file
-    output_dir = "output"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    # Create filename based on research topic
-    safe_filename = "".join(c for c in research_topic if c.isalnum() or c in (' ', '-', '_')).rstrip()
-    safe_filename = safe_filename.replace(' ', '_')[:50]  # Limit filename length
-    html_filename = f"{output_dir}/{safe_filename}_research.html"
-    
-    # Write HTML content to file
-    with open(html_filename, 'w', encoding='utf-8') as f:
-        f.write(html_result.content)
-    
+    report = await _open_report(configurable, research_topic)
+    llm = get_chat_model(
+        configurable.answer_model,
+        **{**answer_model_params(configurable), "max_tokens": max_tokens},
+    )
+    writer = get_stream_writer()
+    usage = {}
+    try:
+        async for chunk in llm.astream(formatted_html_prompt):
+            # streamed usage arrives spread over chunks (input first, output last)
+            for key, value in usage_from_response(chunk).items():
+                usage[key] = usage.get(key, 0) + value
+            text = get_message_text(chunk)
+            if not text:
+                continue
+            await asyncio.to_thread(report.write, text)
+            writer({"event": "html_chunk", "chunk": text, "bytes_written": report.bytes_written})
+    except BaseException:
+        report.abort()
+        raise
+    # hashing is done; compressing the variants is CPU-bound, keep it off the event loop
+    record = await asyncio.to_thread(report.finish)
+    record_model_usage(configurable.answer_model, usage=usage)
+    return {**_report_published(state, configurable, record), "report_context": report_context}
+
+
+@instrument_node
+async def plan_report(state: OverallState, config: RunnableConfig) -> OverallState:
+    """LangGraph node that outlines the report for the map-reduce report mode.
+
+    Splits the report into at most ``report_max_sections`` independent sections, each
+    with a heading and a focus, so that ``write_section`` can generate them in parallel.
+    The outline call caches the summaries prefix that every section then reads; like
+    the sections, it sends no tools, so the cached prefixes match.
+
+    Args:
+        state: Current graph state containing the research results
+        config: Configuration for the runnable, including the report settings
+
+    Returns:
+        Dictionary with state update, including the report_outline
+    """
+    configurable = Configuration.from_runnable_config(config)
+    research_topic = get_research_topic(state["messages"])
+    current_date = get_current_date()
+    summaries, report_context, cached_count = await _report_summaries(
+        state, configurable, research_topic
+    )
+    formatted_prompt = build_research_prompt(
+        configurable.answer_model,
+        research_topic,
+        current_date,
+        summaries,
+        report_outline_instructions.format(
+            research_topic=research_topic,
+            current_date=current_date,
+            max_sections=configurable.report_max_sections,
+        ),
+        cached_count=cached_count,
+    )
+    outline = await _ainvoke_json(
+        configurable.answer_model, OUTLINE_MODEL_PARAMS, ReportOutline, formatted_prompt
+    )
+    sections = [
+        {"heading": section.heading, "focus": section.focus}
+        for section in outline.sections[: configurable.report_max_sections]
+    ]
+    if not sections:
+        sections = [{"heading": outline.title or research_topic, "focus": research_topic}]
+    logger.info("Report outline: %d sections", len(sections))
     return {
-        "html_content": html_result.content,
-        "html_filename": html_filename,
-        "messages": state["messages"] + [AIMessage(content=f"HTML报告已生成并保存为: {html_filename}")]
+        "report_outline": {
+            "title": outline.title or research_topic,
+            "sections": sections,
+            "research_topic": research_topic,
+            "date": current_date,
+            "cached_count": len(summaries),
+        },
+        "report_summaries": summaries,
+        # a thread's earlier report must not leak into this one
+        "report_sections": Overwrite([]),
+        "report_context": report_context,
     }
 
 
-# Create our Agent Graph
-builder = StateGraph(OverallState, config_schema=Configuration)
+def continue_to_sections(state: OverallState):
+    """LangGraph routing function that sends every outlined section to ``write_section``.
 
-# Define the nodes we will cycle between
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("reflection", reflection)
-# builder.add_node("finalize_answer", finalize_answer)
-builder.add_node("web_build", web_build)
+    Each payload carries the packed summaries and the run's spend so far; the
+    checkpointer stores the summaries once however many payloads hold them.
+    """
+    outline = state["report_outline"]
+    return [
+        Send(
+            "write_section",
+            {
+                "index": index,
+                "heading": section["heading"],
+                "focus": section["focus"],
+                "report_outline": outline,
+                "research_topic": outline["research_topic"],
+                "summaries": state["report_summaries"],
+                "run_metrics": state.get("run_metrics"),
+                "run_spend_baseline": state.get("run_spend_baseline"),
+            },
+        )
+        for index, section in enumerate(outline["sections"])
+    ]
+
+
+@instrument_node
+async def write_section(state: SectionState, config: RunnableConfig) -> OverallState:
+    """LangGraph node that generates one report section as an HTML fragment.
+
+    Sections run in parallel, so the report's decode time is that of its longest
+    section rather than of the whole document. Chunks are emitted as ``section_chunk``
+    custom stream events and a ``section_done`` event follows each finished section.
+
+    Args:
+        state: The section to write, with the outline
+        config: Configuration for the runnable, including the report settings
+
+    Returns:
+        Dictionary with state update, including the section in report_sections
+    """
+    configurable = Configuration.from_runnable_config(config)
+    outline = state["report_outline"]
+    headings = [section["heading"] for section in outline["sections"]]
+    others = [heading for i, heading in enumerate(headings) if i != state["index"]]
+    # the outline call cached the preamble and summaries; each section reads that prefix
+    formatted_prompt = build_research_prompt(
+        configurable.answer_model,
+        state["research_topic"],
+        outline["date"],
+        state["summaries"],
+        section_prompt.format(
+            index=state["index"] + 1,
+            total=len(headings),
+            title=outline["title"],
+            research_topic=state["research_topic"],
+            heading=state["heading"],
+            focus=state["focus"],
+            other_headings="; ".join(others) or "(none)",
+        ),
+        cached_count=outline["cached_count"],
+        cache_write=False,
+    )
+    # the sections run in parallel and split what the budgets have left between them
+    max_tokens = report_max_tokens(
+        configurable,
+        configurable.report_section_max_tokens,
+        state.get("run_metrics"),
+        state.get("run_spend_baseline"),
+        estimate_tokens(prompt_text(formatted_prompt)),
+        calls=len(headings),
+    )
+    llm = get_chat_model(
+        configurable.answer_model,
+        **{**answer_model_params(configurable), "max_tokens": max_tokens},
+    )
+    writer = get_stream_writer()
+    usage, parts = {}, []
+    async for chunk in llm.astream(formatted_prompt):
+        for key, value in usage_from_response(chunk).items():
+            usage[key] = usage.get(key, 0) + value
+        text = get_message_text(chunk)
+        if text:
+            parts.append(text)
+            writer({"event": "section_chunk", "section": state["index"], "chunk": text})
+    record_model_usage(configurable.answer_model, usage=usage)
+    fragment = "".join(parts)
+    writer(
+        {
+            "event": "section_done",
+            "section": state["index"],
+            "heading": state["heading"],
+            "bytes": len(fragment.encode("utf-8")),
+        }
+    )
+    return {
+        "report_sections": [
+            {"index": state["index"], "heading": state["heading"], "html": fragment}
+        ]
+    }
+
+
+@instrument_node
+async def assemble_report(state: OverallState, config: RunnableConfig) -> OverallState:
+    """LangGraph node that stitches the written sections into the HTML report.
+
+    No model call: the sections are put in outline order inside the shared page shell
+    (header, table of contents, stylesheet, references and footer), citation links are
+    pointed at their sources, and the document is published to the report store.
+
+    Args:
+        state: Current graph state containing the outline and the written sections
+        config: Configuration for the runnable
+
+    Returns:
+        Dictionary with state update, including the html_filename and html_bytes of the report
+    """
+    configurable = Configuration.from_runnable_config(config)
+    outline = state["report_outline"]
+    sections = sorted(state["report_sections"], key=lambda section: section["index"])
+    document = render_report(
+        outline["title"],
+        outline["research_topic"],
+        outline["date"],
+        sections,
+        state.get("sources_gathered") or [],
+    )
+    report = await _open_report(configurable, outline["research_topic"])
+    try:
+        await asyncio.to_thread(report.write, document)
+    except BaseException:
+        report.abort()
+        raise
+    record = await asyncio.to_thread(report.finish)
+    return _report_published(state, configurable, record)
+
+
+def _report_node(configurable: Configuration) -> str:
+    """Return the first node of the configured report mode."""
+    return "plan_report" if configurable.report_mode == "sections" else "web_build"
+
+
+def build_graph(checkpointer=None):
+    """Build and compile the research graph.
+
+    Args:
+        checkpointer: Optional checkpoint saver, e.g. ``agent.checkpointer.get_checkpointer()``
+            to make runs resumable. The served ``graph`` has none; the LangGraph server
+            persists threads itself.
+    """
+    # Create our Agent Graph
+    builder = StateGraph(OverallState, config_schema=Configuration)
+
+    # Define the nodes we will cycle between
+    builder.add_node("generate_query", generate_query)
+    builder.add_node("knowledge_lookup", knowledge_lookup)
+    builder.add_node("web_research", web_research)
+    builder.add_node("reflection", reflection)
+    # builder.add_node("finalize_answer", finalize_answer)
+    builder.add_node("web_build", web_build)
+    builder.add_node("plan_report", plan_report)
+    builder.add_node("write_section", write_section)
+    builder.add_node("assemble_report", assemble_report)
+
+    # Set the entrypoint as `generate_query`
+    # This means that this node is the first one called
+    builder.add_edge(START, "generate_query")
+    # Reuse earlier runs' research before searching
+    builder.add_edge("generate_query", "knowledge_lookup")
+    # Add conditional edge to continue with the remaining search queries in parallel branches
+    builder.add_conditional_edges(
+        "knowledge_lookup", continue_to_web_research, ["web_research", "reflection"]
+    )
+    # Reflect on the web research
+    builder.add_edge("web_research", "reflection")
+    # Evaluate the research
+    builder.add_conditional_edges(
+        "reflection", evaluate_research, ["knowledge_lookup", "web_build", "plan_report"]
+    )
+    # Map-reduce report mode: outline, sections in parallel, local assembly
+    builder.add_conditional_edges("plan_report", continue_to_sections, ["write_section"])
+    builder.add_edge("write_section", "assemble_report")
+    builder.add_edge("assemble_report", END)
+    # Generate HTML report after finalizing answer
+    # builder.add_edge("finalize_answer", "web_build")
+    # End after building HTML
+    builder.add_edge("web_build", END)
+
+    return builder.compile(checkpointer=checkpointer, name="pro-search-agent")
 
-# Set the entrypoint as `generate_query`
-# This means that this node is the first one called
-builder.add_edge(START, "generate_query")
-# Add conditional edge to continue with search queries in a parallel branch
-builder.add_conditional_edges(
-    "generate_query", continue_to_web_research, ["web_research"]
-)
-# Reflect on the web research
-builder.add_edge("web_research", "reflection")
-# Evaluate the research
-builder.add_conditional_edges(
-    "reflection", evaluate_research, ["web_research", "web_build"]
-)
-# Generate HTML report after finalizing answer
-# builder.add_edge("finalize_answer", "web_build")
-# End after building HTML
-builder.add_edge("web_build", END)
 
-graph = builder.compile(name="pro-search-agent")
+graph = build_graph()
@@ -0,0 +1,184 @@
+"""Hedged requests for slow web research calls."""
+
+import asyncio
+import collections
+import math
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = 200):
+        """Keep the latest ``window`` latencies."""
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        """Record a call's latency."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        """Return the number of latencies in the window."""
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the ``pct`` (0-100) percentile of the window, or None when empty."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+        return ordered[min(rank, len(ordered) - 1)]
+
+
+class Hedger:
+    """Issues a duplicate request when a call outlives a percentile of recent latency.
+
+    Whichever request answers first wins and the other is cancelled. Hedges are only
+    sent once ``min_samples`` latencies have been seen, and are paid for from a token
+    bucket that every call refills by ``max_ratio`` up to ``burst`` tokens, so over any
+    stretch of calls at most ``max_ratio`` of them (plus the burst) hedge, however many
+    calls came before (at the 95th percentile, roughly 5% of calls hedge).
+
+    A primary that loses to its hedge is cancelled before it finishes; the time it had
+    run is recorded as its latency (a lower bound), so the slow calls that trigger hedges
+    keep counting towards the percentile instead of dropping out of the window.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        max_ratio: float,
+        min_samples: int = 20,
+        window: int = 200,
+        burst: float = 2.0,
+    ):
+        """Create a hedger whose token bucket starts full.
+
+        Args:
+            percentile: The percentile (0-100) of recent latency after which a call hedges.
+            max_ratio: The share of calls that may hedge, refilled per call.
+            min_samples: The number of latencies to see before hedging starts.
+            window: The number of recent latencies the percentile is taken over.
+            burst: The most hedges a quiet stretch can bank.
+        """
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.burst = burst
+        self.latencies = LatencyTracker(window)
+        self._hedge_tokens = burst
+        self.calls = 0
+        self.hedged = 0
+        self.hedges_won = 0
+        self.hedges_skipped = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return how long to wait before hedging, or None while there is too little data."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    async def _timed(self, call: Callable[[], Awaitable[T]]) -> T:
+        started = time.perf_counter()
+        result = await call()
+        self.latencies.add(time.perf_counter() - started)
+        return result
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        may_hedge: Callable[[], bool] = lambda: True,
+        on_hedge: Optional[Callable[[str], None]] = None,
+    ) -> T:
+        """Await ``call()``, hedging it with a second ``call()`` if it runs long.
+
+        Args:
+            call: Starts one request; called a second time for the hedge.
+            may_hedge: Checked before hedging, e.g. for spare rate-limit budget.
+            on_hedge: Told the outcome of each hedge decision: "won", "lost" or "skipped".
+
+        Raises:
+            Exception: The primary request's error when both requests fail.
+        """
+        self.calls += 1
+        self._hedge_tokens = min(self.burst, self._hedge_tokens + self.max_ratio)
+        delay = self.hedge_delay()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._timed(call))
+        hedge = None
+        try:
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            if self._hedge_tokens < 1 or not may_hedge():
+                self.hedges_skipped += 1
+                if on_hedge:
+                    on_hedge("skipped")
+                return await primary
+
+            self.hedged += 1
+            self._hedge_tokens -= 1
+            hedge = asyncio.ensure_future(self._timed(call))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    won = winner is hedge
+                    self.hedges_won += won
+                    if won and not primary.done():
+                        # censored sample: the primary took at least this long
+                        self.latencies.add(time.perf_counter() - started)
+                    if on_hedge:
+                        on_hedge("won" if won else "lost")
+                    return winner.result()
+            # both failed
+            if on_hedge:
+                on_hedge("lost")
+            return primary.result()
+        finally:
+            # the losing request, or both when the caller is cancelled
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, float]:
+        """Return call/hedge counters and the current hedge delay."""
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedges_won": self.hedges_won,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_delay": self.hedge_delay() or 0.0,
+        }
+
+
+_hedgers: Dict[tuple, Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def get_hedger(model: str, configurable) -> Optional[Hedger]:
+    """Return the process-wide hedger for a search model, or None when hedging is off."""
+    if not configurable.enable_search_hedging:
+        return None
+    key = (
+        model,
+        configurable.search_hedge_percentile,
+        configurable.search_hedge_max_ratio,
+        configurable.search_hedge_min_samples,
+    )
+    with _hedgers_lock:
+        hedger = _hedgers.get(key)
+        if hedger is None:
+            hedger = Hedger(*key[1:])
+            _hedgers[key] = hedger
+    return hedger
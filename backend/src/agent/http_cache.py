@@ -0,0 +1,197 @@
+"""Content-addressed file serving with ETags and precompressed variants."""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import shutil
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: pip install "agent[brotli]"
+    brotli = None
+
+if TYPE_CHECKING:
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+# Content-addressed responses never change under the same URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Preferred first: brotli is ~15-20% smaller than gzip on HTML
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# A variant is only kept if it is at least this much smaller than the original
+MIN_COMPRESSION_SAVING = 0.05
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress ``data`` at the highest level, for content compressed once and served often."""
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    if encoding == "gzip":
+        # mtime=0 keeps the output (and so its ETag) identical across runs
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    raise ValueError(f"Unsupported content encoding '{encoding}'")
+
+
+def compress_file(source: str, target: str, encoding: str, chunk_size: int = 1 << 16) -> int:
+    """Compress the file ``source`` into ``target`` chunk by chunk and return its size.
+
+    Produces the same encoding as ``compress`` while holding only one chunk of the
+    input in memory.
+    """
+    if encoding not in ENCODING_SUFFIXES:
+        raise ValueError(f"Unsupported content encoding '{encoding}'")
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=11)
+            while chunk := src.read(chunk_size):
+                dst.write(compressor.process(chunk))
+            dst.write(compressor.finish())
+        else:
+            with gzip.GzipFile(
+                filename="", mode="wb", compresslevel=9, fileobj=dst, mtime=0
+            ) as gz:
+                shutil.copyfileobj(src, gz, chunk_size)
+        return dst.tell()
+
+
+def precompress(data: bytes, min_saving: float = MIN_COMPRESSION_SAVING) -> Dict[str, bytes]:
+    """Return every supported encoding of ``data`` that saves at least ``min_saving``."""
+    variants = {}
+    for encoding in ENCODINGS:
+        compressed = compress(data, encoding)
+        if len(compressed) <= len(data) * (1 - min_saving):
+            variants[encoding] = compressed
+    return variants
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into ``{coding: q}``; malformed q-values count as 0."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """Pick the first of ``available`` (in preference order) the client accepts, or None."""
+    accepted = parse_accept_encoding(header)
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def etag_for(digest: str, encoding: Optional[str] = None) -> str:
+    """Return the strong ETag of one encoding of content with the given hash."""
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return whether an If-None-Match header matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(","))
+
+
+# Types worth compressing; images and fonts are already compressed
+_COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+@dataclass
+class CachedFile:
+    """One static file held in memory with its precompressed variants."""
+
+    body: bytes
+    media_type: str
+    digest: str
+    cache_control: str
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def response(self, request: "Request") -> "Response":
+        """Answer a GET/HEAD: 304 on a matching If-None-Match, else the best encoding."""
+        from starlette.responses import Response
+
+        encoding = choose_encoding(request.headers.get("accept-encoding"), self.variants)
+        headers = {
+            "ETag": etag_for(self.digest, encoding),
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        body = self.variants[encoding] if encoding else self.body
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=headers, media_type=self.media_type)
+        return Response(body, headers=headers, media_type=self.media_type)
+
+
+class StaticFileCache:
+    """Every file of a static build, loaded into memory and precompressed once.
+
+    Files under one of ``immutable_prefixes`` (Vite's content-hashed ``assets/``) are
+    served as immutable; everything else, ``index.html`` in particular, must be
+    revalidated, which the ETag turns into a cheap 304.
+    """
+
+    def __init__(self, directory: str, immutable_prefixes: Iterable[str] = ("assets/",)):
+        """Load and precompress every file under ``directory``."""
+        self.directory = directory
+        self.files: Dict[str, CachedFile] = {}
+        prefixes = tuple(immutable_prefixes)
+        for root, _, names in os.walk(directory):
+            for filename in names:
+                path = os.path.join(root, filename)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                if media_type.startswith("text/") or media_type == "application/javascript":
+                    media_type += "; charset=utf-8"
+                self.files[relative] = CachedFile(
+                    body=body,
+                    media_type=media_type,
+                    digest=hashlib.sha256(body).hexdigest()[:32],
+                    cache_control=IMMUTABLE_CACHE_CONTROL
+                    if relative.startswith(prefixes)
+                    else "no-cache",
+                    variants=precompress(body)
+                    if media_type.startswith(_COMPRESSIBLE_TYPES)
+                    else {},
+                )
+
+    def get(self, path: str) -> Optional[CachedFile]:
+        """Return the file at a path relative to the build directory, or None."""
+        return self.files.get(path.lstrip("/"))
+
+    @property
+    def size(self) -> int:
+        """Bytes held in memory, variants included."""
+        return sum(
+            len(file.body) + sum(len(variant) for variant in file.variants.values())
+            for file in self.files.values()
+        )
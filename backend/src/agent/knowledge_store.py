@@ -0,0 +1,177 @@
+"""Cross-run store of web research results, reused for similar queries."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from agent.bm25 import tokenize
+from agent.dedup import jaccard_similarity, query_shingles
+
+# FTS candidates checked for similarity per lookup, best BM25 rank first
+_CANDIDATES = 20
+
+
+class KnowledgeStore:
+    """SQLite store of past web research results, shared by all runs.
+
+    Every grounded search result is saved with its query, the date in the search prompt
+    and its sources. Unlike the search cache, which only answers the exact same
+    normalized query, a lookup finds earlier queries that are worded differently but
+    close enough: an FTS5 index over the query terms (the BM25 tokenizer, so Chinese
+    queries match by character bigrams) yields candidates, and the one most similar to
+    the new query is reused when its shingle similarity reaches the threshold and it is
+    younger than ``max_age_seconds``. The oldest entries are dropped once
+    ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, path: str, max_age_seconds: int, max_entries: int):
+        """Open (or create) the SQLite file at ``path``."""
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Lookups are indexed local reads, so the connection is used directly from the
+        # event loop; the lock serializes access from worker threads.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS knowledge (
+                id INTEGER PRIMARY KEY,
+                query TEXT NOT NULL,
+                prompt_date TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                summary TEXT NOT NULL,
+                sources TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS knowledge_created_at ON knowledge (created_at)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(terms)"
+        )
+
+    def save(
+        self, query: str, prompt_date: str, summary: str, sources: List[Dict[str, Any]]
+    ) -> None:
+        """Store a research result and drop the oldest entries over ``max_entries``."""
+        terms = " ".join(tokenize(query))
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO knowledge (query, prompt_date, created_at, summary, sources) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (query, prompt_date, now, summary, json.dumps(sources, ensure_ascii=False)),
+                )
+                self._conn.execute(
+                    "INSERT INTO knowledge_fts (rowid, terms) VALUES (?, ?)",
+                    (cursor.lastrowid, terms),
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self) -> None:
+        (size,) = self._conn.execute("SELECT COUNT(*) FROM knowledge").fetchone()
+        overflow = size - self.max_entries
+        if overflow <= 0:
+            return
+        ids = [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT id FROM knowledge ORDER BY created_at LIMIT ?", (overflow,)
+            )
+        ]
+        self._conn.executemany("DELETE FROM knowledge WHERE id = ?", [(i,) for i in ids])
+        self._conn.executemany("DELETE FROM knowledge_fts WHERE rowid = ?", [(i,) for i in ids])
+
+    def lookup(self, query: str, threshold: float) -> Optional[Dict[str, Any]]:
+        """Return the freshest close match for ``query``, or None.
+
+        Returns:
+            A dict with the stored ``query``, ``prompt_date``, ``created_at``, ``summary``,
+            ``sources`` and the ``similarity`` to the new query.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            self.misses += 1
+            return None
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT k.query, k.prompt_date, k.created_at, k.summary, k.sources "
+                "FROM knowledge_fts JOIN knowledge AS k ON k.id = knowledge_fts.rowid "
+                "WHERE knowledge_fts MATCH ? AND k.created_at >= ? "
+                "ORDER BY knowledge_fts.rank LIMIT ?",
+                (match, cutoff, _CANDIDATES),
+            ).fetchall()
+        shingles = query_shingles(query)
+        best, best_key = None, None
+        for row in rows:
+            similarity = jaccard_similarity(shingles, query_shingles(row[0]))
+            # most similar wins; among equally similar queries, the newest result
+            key = (similarity, row[2])
+            if similarity >= threshold and (best_key is None or key > best_key):
+                best, best_key = row, key
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            "query": best[0],
+            "prompt_date": best[1],
+            "created_at": best[2],
+            "summary": best[3],
+            "sources": json.loads(best[4]),
+            "similarity": best_key[0],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM knowledge").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": size,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_stores: Dict[tuple, KnowledgeStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_knowledge_store(configurable) -> Optional[KnowledgeStore]:
+    """Return the process-wide knowledge store for a Configuration, or None when disabled."""
+    if not configurable.enable_knowledge_store:
+        return None
+    store_key = (
+        os.path.abspath(configurable.knowledge_store_path),
+        configurable.knowledge_max_age_seconds,
+        configurable.knowledge_store_max_entries,
+    )
+    with _stores_lock:
+        store = _stores.get(store_key)
+        if store is None:
+            store = KnowledgeStore(*store_key)
+            _stores[store_key] = store
+    return store
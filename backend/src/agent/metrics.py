@@ -0,0 +1,444 @@
+"""Prometheus metrics and per-run totals for graph nodes and model calls."""
+
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# USD per million (input, output) tokens, matched by longest model-name prefix
+MODEL_PRICES_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+    "gemini-2.0-flash": (0.1, 0.4),
+    "gemini-2.5-flash": (0.3, 2.5),
+    "gemini-2.5-pro": (1.25, 10.0),
+}
+
+# Prompt-cache pricing relative to the input price (Anthropic's 5-minute cache)
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+USAGE_KEYS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+NODE_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        """Create the metric; every update must pass all of ``labelnames``."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the labeled series."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the labeled series' value, 0 if it was never updated."""
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def samples(self):
+        """Yield the metric's exposition lines, one per labeled series."""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value:g}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down, with a fixed set of label names."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the labeled series to ``value``."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = NODE_LATENCY_BUCKETS,
+    ):
+        """Create the histogram; every observation must pass all of ``labelnames``."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Count ``value`` in its bucket of the labeled series."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        """Yield the bucket, sum and count lines of every labeled series."""
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total)) for key, (counts, total) in self._values.items()
+            )
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:g}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        """Add a metric to the registry and return it."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every registered metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+NODE_DURATION = registry.register(
+    Histogram(
+        "agent_node_duration_seconds",
+        "Wall time of graph node executions, labeled with the models each execution called "
+        '("+"-joined, "none" if it called none).',
+        ["node", "model"],
+    )
+)
+NODE_ERRORS = registry.register(
+    Counter("agent_node_errors_total", "Graph node executions that raised.", ["node"])
+)
+MODEL_CALLS = registry.register(
+    Counter("agent_model_calls_total", "Model and search API calls.", ["node", "model"])
+)
+MODEL_TOKENS = registry.register(
+    Counter(
+        "agent_model_tokens_total",
+        "Tokens reported by model and search API calls; cache_read/cache_write are the "
+        "prompt-cache share of input.",
+        ["node", "model", "direction"],
+    )
+)
+MODEL_COST = registry.register(
+    Counter("agent_model_cost_usd_total", "Estimated model spend in USD.", ["node", "model"])
+)
+SEARCH_CACHE = registry.register(
+    Counter("agent_search_cache_total", "Search cache lookups.", ["result"])
+)
+KNOWLEDGE_STORE = registry.register(
+    Counter("agent_knowledge_store_total", "Knowledge store lookups.", ["result"])
+)
+RETRIES = registry.register(
+    Counter("agent_retries_total", "Retried model and search calls.", ["node", "model"])
+)
+FALLBACKS = registry.register(
+    Counter("agent_fallbacks_total", "Fallback activations.", ["node", "model"])
+)
+SEARCH_HEDGES = registry.register(
+    Counter(
+        "agent_search_hedges_total",
+        "Hedged search decisions: won (the duplicate answered first), lost or skipped (cap).",
+        ["model", "outcome"],
+    )
+)
+CIRCUIT_STATE = registry.register(
+    Gauge(
+        "agent_circuit_state",
+        "Circuit breaker state as seen by this process: 0 closed, 1 half-open, 2 open.",
+        ["name"],
+    )
+)
+CIRCUIT_TRANSITIONS = registry.register(
+    Counter(
+        "agent_circuit_transitions_total",
+        "Circuit breaker state changes made by this process.",
+        ["name", "state"],
+    )
+)
+CIRCUIT_REJECTED = registry.register(
+    Counter(
+        "agent_circuit_rejected_total",
+        "Calls that skipped a provider because its circuit was open.",
+        ["name"],
+    )
+)
+BUDGET_STOPS = registry.register(
+    Counter(
+        "agent_budget_stops_total",
+        "Runs that stopped researching early to meet a deadline or budget.",
+        ["reason"],
+    )
+)
+
+
+def model_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+) -> float:
+    """Estimate the USD cost of a call from MODEL_PRICES_PER_MILLION (0 if unknown).
+
+    ``input_tokens`` includes the prompt-cache reads and writes, which are billed at
+    CACHE_READ_PRICE_FACTOR and CACHE_WRITE_PRICE_FACTOR times the input price.
+    """
+    name = model.lower()
+    prefixes = [prefix for prefix in MODEL_PRICES_PER_MILLION if name.startswith(prefix)]
+    if not prefixes:
+        return 0.0
+    input_price, output_price = MODEL_PRICES_PER_MILLION[max(prefixes, key=len)]
+    uncached = max(input_tokens - cache_read_tokens - cache_write_tokens, 0)
+    billed_input = (
+        uncached
+        + cache_read_tokens * CACHE_READ_PRICE_FACTOR
+        + cache_write_tokens * CACHE_WRITE_PRICE_FACTOR
+    )
+    return (billed_input * input_price + output_tokens * output_price) / 1_000_000
+
+
+def merge_run_metrics(left: Optional[Dict], right: Optional[Dict]) -> Dict:
+    """Reducer for the ``run_metrics`` state channel: sums numbers, merges nested dicts."""
+    if not left:
+        return dict(right or {})
+    if not right:
+        return left
+    merged = dict(left)
+    for key, value in right.items():
+        if isinstance(value, dict):
+            merged[key] = merge_run_metrics(merged.get(key), value)
+        else:
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+class _NodeRun:
+    """Per-run totals collected while one node execution is active."""
+
+    def __init__(self, node: str):
+        self.node = node
+        self.totals: Dict[str, Any] = {}
+
+    def add(self, update: Dict[str, Any]) -> None:
+        self.totals = merge_run_metrics(self.totals, update)
+
+
+_current_node: ContextVar[Optional[_NodeRun]] = ContextVar("agent_current_node", default=None)
+
+
+def _node_name() -> str:
+    run = _current_node.get()
+    return run.node if run is not None else "unknown"
+
+
+def _add_to_run(update: Dict[str, Any]) -> None:
+    run = _current_node.get()
+    if run is not None:
+        run.add(update)
+
+
+def current_node_totals() -> Dict[str, Any]:
+    """Return the totals recorded so far by the running node (not yet in state)."""
+    run = _current_node.get()
+    return run.totals if run is not None else {}
+
+
+def _models_label(totals: Dict[str, Any]) -> str:
+    return "+".join(sorted(totals.get("models") or {})) or "none"
+
+
+def instrument_node(func: Callable) -> Callable:
+    """Time an async graph node and attach its per-run totals as ``run_metrics``.
+
+    Helpers called while the node runs (record_model_usage, record_search_cache, ...)
+    are labeled with the node's name; the node's latency is labeled with the models it
+    called.
+    """
+    node = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        run = _NodeRun(node)
+        token = _current_node.set(run)
+        started = time.perf_counter()
+        try:
+            update = await func(*args, **kwargs)
+        except Exception:
+            NODE_ERRORS.inc(node=node)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            NODE_DURATION.observe(elapsed, node=node, model=_models_label(run.totals))
+            _current_node.reset(token)
+        run.add({"nodes": {node: {"calls": 1, "seconds": elapsed}}})
+        return {**update, "run_metrics": run.totals}
+
+    return wrapper
+
+
+def record_model_usage(model: str, message: Any = None, usage: Optional[Dict] = None) -> None:
+    """Count one model call and its tokens.
+
+    Args:
+        model: Model name.
+        message: A LangChain message carrying ``usage_metadata``, or a google-genai
+            response carrying ``usage_metadata.prompt_token_count`` and friends.
+        usage: Explicit token counts as returned by usage_from_response, e.g. summed
+            over a stream.
+    """
+    if usage is None:
+        usage = usage_from_response(message)
+    node = _node_name()
+    tokens = {key: usage.get(key) or 0 for key in USAGE_KEYS}
+    cost = model_cost(
+        model,
+        tokens["input_tokens"],
+        tokens["output_tokens"],
+        tokens["cache_read_tokens"],
+        tokens["cache_write_tokens"],
+    )
+    MODEL_CALLS.inc(node=node, model=model)
+    for key, direction in zip(USAGE_KEYS, ("input", "output", "cache_read", "cache_write")):
+        MODEL_TOKENS.inc(tokens[key], node=node, model=model, direction=direction)
+    MODEL_COST.inc(cost, node=node, model=model)
+    _add_to_run({"models": {model: {"calls": 1, **tokens, "cost_usd": cost}}})
+
+
+def usage_from_response(response: Any) -> Dict[str, int]:
+    """Extract token counts from a LangChain message or a genai response.
+
+    ``input_tokens`` includes prompt-cache reads and writes, which are also reported
+    on their own as ``cache_read_tokens`` and ``cache_write_tokens``.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return {}
+    if isinstance(usage, dict):
+        details = usage.get("input_token_details") or {}
+        return {
+            "input_tokens": usage.get("input_tokens") or 0,
+            "output_tokens": usage.get("output_tokens") or 0,
+            "cache_read_tokens": details.get("cache_read") or 0,
+            "cache_write_tokens": details.get("cache_creation") or 0,
+        }
+    return {
+        "input_tokens": usage.prompt_token_count or 0,
+        "output_tokens": usage.candidates_token_count or 0,
+        "cache_read_tokens": usage.cached_content_token_count or 0,
+        "cache_write_tokens": 0,
+    }
+
+
+def record_search_cache(hit: bool) -> None:
+    """Count a search cache lookup."""
+    result = "hit" if hit else "miss"
+    SEARCH_CACHE.inc(result=result)
+    _add_to_run({f"search_cache_{result}s": 1})
+
+
+def record_knowledge_store(hit: bool) -> None:
+    """Count a knowledge store lookup."""
+    KNOWLEDGE_STORE.inc(result="hit" if hit else "miss")
+    _add_to_run({"knowledge_store_hits" if hit else "knowledge_store_misses": 1})
+
+
+def record_retry(model: str) -> None:
+    """Count a retried call to ``model``."""
+    RETRIES.inc(node=_node_name(), model=model)
+    _add_to_run({"retries": 1})
+
+
+def record_fallback(model: str) -> None:
+    """Count a fallback to ``model``."""
+    FALLBACKS.inc(node=_node_name(), model=model)
+    _add_to_run({"fallbacks": 1})
+
+
+def record_hedge(model: str, outcome: str) -> None:
+    """Count a hedging decision: ``won``, ``lost`` or ``skipped``."""
+    SEARCH_HEDGES.inc(model=model, outcome=outcome)
+    _add_to_run({"hedges": {outcome: 1}})
+
+
+_CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def record_circuit_transition(name: str, state: str, changed: bool = True) -> None:
+    """Update a breaker's state gauge; count the transition when this process made it."""
+    CIRCUIT_STATE.set(_CIRCUIT_STATE_VALUES[state], name=name)
+    if changed:
+        CIRCUIT_TRANSITIONS.inc(name=name, state=state)
+
+
+def record_circuit_rejected(name: str) -> None:
+    """Count a call that skipped a provider because its circuit was open."""
+    CIRCUIT_REJECTED.inc(name=name)
+    _add_to_run({"circuit_rejected": 1})
+
+
+def record_budget_stop(reason: str) -> None:
+    """Count a run that stopped researching early, and why."""
+    BUDGET_STOPS.inc(reason=reason)
+
+
+def render_metrics() -> str:
+    """Return every agent metric in the Prometheus text exposition format."""
+    return registry.render()
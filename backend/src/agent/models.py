@@ -0,0 +1,192 @@
+"""Pooled model clients shared across graph nodes."""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agent.cassette import get_cassette
+from agent.configuration import Configuration, load_environment
+
+if TYPE_CHECKING:
+    from google.genai import Client
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+logger = logging.getLogger(__name__)
+
+# Per-node generation settings; the model names themselves come from Configuration
+QUERY_MODEL_PARAMS = {"temperature": 0.3, "max_tokens": 4096}
+REFLECTION_MODEL_PARAMS = {"temperature": 0.3, "max_tokens": 8192}
+OUTLINE_MODEL_PARAMS = {"temperature": 0.3, "max_tokens": 4096}
+FALLBACK_MODEL_PARAMS = {"temperature": 0.1, "max_tokens": 1000}
+
+
+def answer_model_params(configurable: Configuration) -> Dict[str, Any]:
+    """Return the generation settings for the report model."""
+    return {"temperature": 0.3, "max_tokens": configurable.answer_max_tokens}
+
+
+def infer_provider(model: str) -> str:
+    """Infer the LangChain provider for a model name."""
+    name = model.lower()
+    if name.startswith("claude"):
+        return "anthropic"
+    if name.startswith("gemini"):
+        return "google_genai"
+    if name.startswith(("gpt", "o1", "o3", "o4", "chatgpt")):
+        return "openai"
+    raise ValueError(f"Cannot infer the provider of model '{model}'")
+
+
+# The environment variable holding each provider's API key
+PROVIDER_API_KEYS = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "google_genai": "GEMINI_API_KEY",
+}
+
+
+def resolve_model_override(requested: Optional[str], default: str) -> str:
+    """Return a per-run model override when the registry can serve it, else ``default``.
+
+    Clients send model names in the run's state (the frontend's model selector). A name
+    whose provider cannot be inferred, or whose provider has no API key configured, would
+    only fail the run mid-way, so it is ignored with a warning.
+    """
+    if not requested or requested == default:
+        return default
+    try:
+        provider = infer_provider(requested)
+    except ValueError:
+        provider = None
+    if provider is not None:
+        load_environment()
+        cassette = get_cassette()
+        if (
+            _chat_model_factory is not None
+            or (cassette is not None and cassette.replaying)
+            or os.getenv(PROVIDER_API_KEYS[provider])
+        ):
+            return requested
+    logger.warning(
+        "Ignoring model override '%s' the registry cannot serve, using %s", requested, default
+    )
+    return default
+
+
+def _build_chat_model(provider: str, model: str, params: Dict[str, Any]) -> "BaseChatModel":
+    # Provider SDKs are imported on first use; they dominate the agent's import time
+    load_environment()
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(model=model, api_key=os.getenv("ANTHROPIC_API_KEY"), **params)
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=model, **params)
+    if provider == "google_genai":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(model=model, api_key=os.getenv("GEMINI_API_KEY"), **params)
+    raise ValueError(f"Unsupported model provider '{provider}'")
+
+
+_chat_models: Dict[Tuple, "BaseChatModel"] = {}
+_genai_client = None
+_lock = threading.Lock()
+
+# Stand-ins installed by override_clients (offline benchmarks, record/replay)
+_chat_model_factory: Optional[Callable[..., Any]] = None
+_genai_client_override: Optional[Any] = None
+
+
+@contextmanager
+def override_clients(
+    chat_model_factory: Optional[Callable[..., Any]] = None,
+    genai_client: Optional[Any] = None,
+) -> Iterator[None]:
+    """Route get_chat_model/get_genai_client to stand-ins while the context is active.
+
+    Args:
+        chat_model_factory: Called as ``factory(model, **params)`` instead of building a
+            provider client.
+        genai_client: Returned by get_genai_client instead of the google-genai client.
+    """
+    global _chat_model_factory, _genai_client_override
+    previous = (_chat_model_factory, _genai_client_override)
+    _chat_model_factory, _genai_client_override = chat_model_factory, genai_client
+    try:
+        yield
+    finally:
+        _chat_model_factory, _genai_client_override = previous
+
+
+def get_chat_model(model: str, **params: Any) -> "BaseChatModel":
+    """Return the pooled chat model for a model name and generation settings.
+
+    Clients are keyed by (provider, model, params) and reused for the life of the
+    process, so every node call shares the client's HTTP connection pool instead of
+    opening new connections. When a cassette is active (AGENT_CASSETTE_MODE) the client
+    is wrapped to record its calls, or replaced by recorded responses in replay mode.
+    """
+    if _chat_model_factory is not None:
+        return _chat_model_factory(model, **params)
+    provider = infer_provider(model)
+    key = (provider, model, tuple(sorted(params.items())))
+    with _lock:
+        chat_model = _chat_models.get(key)
+        if chat_model is None:
+            cassette = get_cassette()
+            if cassette is not None and cassette.replaying:
+                chat_model = cassette.wrap_chat_model(None, model, params)
+            else:
+                chat_model = _build_chat_model(provider, model, params)
+                if cassette is not None:
+                    chat_model = cassette.wrap_chat_model(chat_model, model, params)
+            _chat_models[key] = chat_model
+    return chat_model
+
+
+def get_genai_client() -> "Client":
+    """Return the shared google-genai client used for grounded search.
+
+    Raises:
+        ValueError: If GEMINI_API_KEY is not set. The check runs when a node first needs
+            the client, not when the agent is imported, and is skipped in cassette replay.
+    """
+    global _genai_client
+    if _genai_client_override is not None:
+        return _genai_client_override
+    with _lock:
+        if _genai_client is None:
+            cassette = get_cassette()
+            if cassette is not None and cassette.replaying:
+                _genai_client = cassette.wrap_genai_client(None)
+            else:
+                load_environment()
+                if os.getenv("GEMINI_API_KEY") is None:
+                    raise ValueError("GEMINI_API_KEY is not set")
+                from google.genai import Client
+
+                _genai_client = Client(api_key=os.getenv("GEMINI_API_KEY"))
+                if cassette is not None:
+                    _genai_client = cassette.wrap_genai_client(_genai_client)
+    return _genai_client
+
+
+def warm_up_models(configurable: Configuration) -> List[Tuple]:
+    """Build the clients every node will use, ahead of the first request.
+
+    Returns:
+        The (provider, model, params) keys of the pooled chat models.
+    """
+    get_genai_client()
+    get_chat_model(configurable.query_generator_model, **QUERY_MODEL_PARAMS)
+    get_chat_model(configurable.reflection_model, **REFLECTION_MODEL_PARAMS)
+    get_chat_model(configurable.reasoning_model, **REFLECTION_MODEL_PARAMS)
+    get_chat_model(configurable.answer_model, **answer_model_params(configurable))
+    get_chat_model(configurable.fallback_model, **FALLBACK_MODEL_PARAMS)
+    with _lock:
+        return list(_chat_models)
@@ -0,0 +1,81 @@
+"""Prompt-cache breakpoints for the shared research-summary prefix."""
+
+from typing import Any, List, Union
+
+from langchain_core.messages import HumanMessage
+
+from agent.models import infer_provider
+from agent.prompts import research_context_preamble
+
+# Anthropic honours at most four cache breakpoints per request
+MAX_CACHE_BREAKPOINTS = 4
+
+SUMMARY_SEPARATOR = "\n\n---\n\n"
+
+
+def build_research_prompt(
+    model: str,
+    research_topic: str,
+    current_date: str,
+    summaries: List[str],
+    instructions: str,
+    cached_count: int = 0,
+    cache_write: bool = True,
+) -> Union[str, List[HumanMessage]]:
+    """Build a prompt over the research summaries with a stable, cacheable prefix.
+
+    The prompt is the research_context_preamble, one block per summary, then the task
+    ``instructions``. Summaries only ever get appended, so each reflection loop and the
+    report share the prefix written by the previous call. For Anthropic models the
+    prompt is a single message of text blocks with ``cache_control`` breakpoints:
+
+    - after the first ``cached_count`` summaries, which reads the prefix cached by the
+      previous call even when more than the ~20 blocks Anthropic looks back over were
+      appended since;
+    - after the last summary when ``cache_write`` is set, so the next call can read it.
+
+    Other providers cache prefixes implicitly (or not at all) and get the same text as
+    a plain string.
+
+    Args:
+        model: The model the prompt is for.
+        research_topic: The user's research topic.
+        current_date: The date shown in the preamble.
+        summaries: The web research summaries, oldest first.
+        instructions: The formatted task instructions that follow the summaries.
+        cached_count: How many leading summaries a previous call cached.
+        cache_write: Whether to cache the prefix up to the last summary.
+    """
+    preamble = research_context_preamble.format(
+        research_topic=research_topic, current_date=current_date
+    )
+    if infer_provider(model) != "anthropic":
+        return SUMMARY_SEPARATOR.join([preamble, *summaries, instructions])
+
+    blocks = [{"type": "text", "text": preamble}]
+    blocks += [{"type": "text", "text": f"---\n\n{summary}"} for summary in summaries]
+    blocks.append({"type": "text", "text": instructions})
+
+    # block i + 1 ends the prefix holding the first i summaries
+    breakpoints = set()
+    if 0 < cached_count <= len(summaries):
+        breakpoints.add(cached_count)
+    if cache_write and summaries:
+        breakpoints.add(len(summaries))
+    for index in sorted(breakpoints)[-MAX_CACHE_BREAKPOINTS:]:
+        blocks[index] = {**blocks[index], "cache_control": {"type": "ephemeral"}}
+    return [HumanMessage(content=blocks)]
+
+
+def prompt_text(prompt: Union[str, List[Any]]) -> str:
+    """Return the plain text of a prompt built by build_research_prompt."""
+    if isinstance(prompt, str):
+        return prompt
+    parts = []
+    for message in prompt:
+        content = message.content
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return SUMMARY_SEPARATOR.join(parts)
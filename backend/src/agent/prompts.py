@@ -47,7 +47,17 @@ Research Topic:
 {research_topic}
 """
 
-reflection_instructions = """You are an expert research assistant analyzing summaries about "{research_topic}".
+# Prompts that read the gathered summaries are laid out as research_context_preamble,
+# one block per summary, then the task instructions. The preamble and the summaries
+# only ever grow at the end, so every call shares a long cacheable prefix.
+research_context_preamble = """Research topic: {research_topic}
+Current date: {current_date}
+
+The summaries below were gathered by web research for this topic, one per search query. The task to perform with them follows the summaries.
+
+Summaries:"""
+
+reflection_instructions = """You are an expert research assistant analyzing the summaries above about "{research_topic}".
 
 Instructions:
 - Identify knowledge gaps or areas that need deeper exploration and generate a follow-up query. (1 or multiple).
@@ -61,8 +71,8 @@ Requirements:
 Output Format:
 - Format your response as a JSON object with these exact keys:
    - "is_sufficient": true or false
-   - "knowledge_gap": Describe what information is missing or needs clarification
-   - "follow_up_queries": Write a specific question to address this gap
+   - "knowledge_gap": Describe what information is missing or needs clarification ("" if is_sufficient is true)
+   - "follow_up_queries": Write a specific question to address this gap ([] if is_sufficient is true)
 
 
 Please evaluate the current task completion status. Review historical messages and execution results to determine if the task has achieved its main objectives. 
@@ -74,15 +84,29 @@ If you believe the task has notable deficiencies or important room for improveme
 Example:
 ```json
 {{
-    "is_sufficient": true, // or false
-    "knowledge_gap": "The summary lacks information about performance metrics and benchmarks", // "" if is_sufficient is true
-    "follow_up_queries": ["What are typical performance benchmarks and metrics used to evaluate [specific technology]?"] // [] if is_sufficient is true
+    "is_sufficient": false,
+    "knowledge_gap": "The summary lacks information about performance metrics and benchmarks",
+    "follow_up_queries": ["What are typical performance benchmarks and metrics used to evaluate [specific technology]?"]
 }}
 ```
 
-Reflect carefully on the Summaries to identify knowledge gaps and produce a follow-up query. Then, produce your output following this JSON format:
+Reflect carefully on the Summaries above to identify knowledge gaps and produce a follow-up query. Then, produce your output following this JSON format, and return only the JSON object.
+"""
 
-Summaries:
+digest_instructions = """You maintain a running research digest about "{research_topic}". The digest replaces the full set of search summaries when deciding whether more research is needed.
+
+Instructions:
+- The current date is {current_date}.
+- Fold the new summaries into the current digest: add new facts, figures and dates, update anything the new summaries supersede, and drop repetition.
+- Keep the markdown citation links (e.g. [label](https://...)) next to the facts they support.
+- Note open questions or contradictions that the summaries leave unresolved.
+- Stay under roughly {max_tokens} tokens; compress older, less relevant details first.
+- Return only the updated digest, without any preamble.
+
+Current Digest:
+{digest}
+
+New Summaries:
 {summaries}
 """
 
@@ -141,11 +165,43 @@ Requirements:
 9. Make sure all citations and links are properly formatted
 10. Add some subtle animations or hover effects for better UX
 
+Build the page from the Summaries above.
 Return only the complete HTML content without any explanations or markdown formatting.
 User Context:
 - {research_topic}
+"""
 
-Summaries:
-{summaries}
+# report_outline_instructions (map-reduce report mode)
+report_outline_instructions = """You are planning an HTML research report on "{research_topic}" from the summaries above. The sections will be written in parallel by separate writers who each see the summaries and only their own section plan.
 
-"""
\ No newline at end of file
+Instructions:
+- Split the report into at most {max_sections} sections, in reading order: open with an overview and close with a conclusion.
+- Give each section a short heading and a focus that names the facts, figures and sources from the summaries it must cover.
+- Make the sections independent and non-overlapping, so that no fact is covered twice.
+- Do not plan a references section; the sources are listed automatically.
+- Write the title and headings in the language of the research topic.
+- The current date is {current_date}.
+
+Output Format:
+- Format your response as a JSON object with these exact keys:
+   - "title": The report title
+   - "sections": A list of objects with "heading" and "focus" keys
+- Return only the JSON object, without any explanations.
+"""
+
+
+# section_prompt (map-reduce report mode)
+section_prompt = """Write section {index} of {total} of an HTML research report titled "{title}" about "{research_topic}", from the summaries above.
+
+Section heading: {heading}
+Section focus: {focus}
+The other sections, written separately (do not repeat their material): {other_headings}
+
+Requirements:
+1. Return only an HTML fragment: a single <section> element that starts with <h2>{heading}</h2>. No DOCTYPE, <html>, <head>, <body>, <style> or <script>; the page header, footer and stylesheet are shared by all sections.
+2. Use plain semantic markup, which the shared stylesheet styles: <h3>, <p>, <ul>/<ol>, <table>, <blockquote>, and <div class="callout"> for key findings.
+3. Keep the citations of the summaries as links: <a href="URL">label</a>.
+4. Write in the language of the research topic.
+
+Return only the HTML fragment without any explanations or markdown formatting.
+"""
@@ -0,0 +1,209 @@
+"""Content-addressed storage for the HTML reports."""
+
+import collections
+import contextlib
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from agent.http_cache import (
+    ENCODING_SUFFIXES,
+    ENCODINGS,
+    MIN_COMPRESSION_SAVING,
+    compress_file,
+)
+
+# Report names are <stem>-<hash>.html; the hash prefix keeps names short but unique
+NAME_HASH_CHARS = 16
+_NAME_RE = re.compile(rf"^[\w\-]+-[0-9a-f]{{{NAME_HASH_CHARS}}}\.html$")
+
+
+def safe_stem(research_topic: str) -> str:
+    """Build a filename stem from a research topic (letters, digits, '-' and '_')."""
+    stem = "".join(c for c in research_topic if c.isalnum() or c in (" ", "-", "_")).strip()
+    return stem.replace(" ", "_")[:50] or "report"
+
+
+class ReportWriter:
+    """Streams one report into a temporary file, hashing it as it goes.
+
+    Nothing is visible under the final name until ``finish``, so readers never see a
+    half-written report and concurrent runs never overwrite each other.
+    """
+
+    def __init__(self, store: "ReportStore", stem: str, topic: str):
+        """Open a temporary file in ``store``'s directory."""
+        self.store = store
+        self.stem = stem
+        self.topic = topic
+        self.bytes_written = 0
+        self._hash = hashlib.sha256()
+        self._tmp_path = os.path.join(store.directory, f".{stem}.{uuid.uuid4().hex}.tmp")
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, text: str) -> int:
+        """Append text to the report and return the number of bytes written."""
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self._hash.update(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def finish(self) -> Dict[str, Any]:
+        """Publish the report under its content-addressed name and return its index record."""
+        self._file.close()
+        return self.store._publish(self._tmp_path, self._hash.hexdigest(), self.stem, self.topic)
+
+    def abort(self) -> None:
+        """Discard the half-written report."""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class ReportStore:
+    """Content-addressed store for the HTML reports.
+
+    Each report is written once as ``<stem>-<sha256 prefix>.html``, with gzip (and, when
+    the ``brotli`` package is installed, brotli) variants next to it, so they can be
+    served precompressed with a long immutable cache lifetime. Identical reports share
+    one file. A SQLite index in ``reports.sqlite`` lists every report with its topic,
+    hash, sizes and encodings.
+
+    Every index operation opens its own short-lived connection, so a store holds no file
+    descriptors between operations; a batch run with an output directory per topic does
+    not pile up open databases.
+    """
+
+    def __init__(self, directory: str):
+        """Open (or create) the store and its index in ``directory``."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "reports.sqlite")
+        with self._connect() as conn:
+            # WAL is a property of the database file, so it is set once
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reports (
+                    name TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    encodings TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def writer(self, research_topic: str) -> ReportWriter:
+        """Start writing a report on ``research_topic``."""
+        return ReportWriter(self, safe_stem(research_topic), research_topic)
+
+    def path(self, name: str, encoding: Optional[str] = None) -> str:
+        """Return the file of a report, or of one of its compressed variants."""
+        suffix = ENCODING_SUFFIXES[encoding] if encoding else ""
+        return os.path.join(self.directory, name + suffix)
+
+    def _publish(self, tmp_path: str, digest: str, stem: str, topic: str) -> Dict[str, Any]:
+        name = f"{stem}-{digest[:NAME_HASH_CHARS]}.html"
+        path = self.path(name)
+        size = os.path.getsize(tmp_path)
+        # variants first, so the report never shows up in the index without them; they
+        # are compressed from the file chunk by chunk, never holding the whole report
+        encodings = []
+        for encoding in ENCODINGS:
+            encoded_path = self.path(name, encoding)
+            if not os.path.exists(encoded_path):
+                encoded_tmp = f"{tmp_path}.{encoding}"
+                compressed_size = compress_file(tmp_path, encoded_tmp, encoding)
+                if compressed_size > size * (1 - MIN_COMPRESSION_SAVING):
+                    os.remove(encoded_tmp)
+                    continue
+                os.replace(encoded_tmp, encoded_path)
+            encodings.append(encoding)
+        os.replace(tmp_path, path)
+        record = {
+            "name": name,
+            "topic": topic,
+            "sha256": digest,
+            "bytes": size,
+            "encodings": ",".join(encodings),
+            "created_at": time.time(),
+        }
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO reports VALUES "
+                "(:name, :topic, :sha256, :bytes, :encodings, :created_at)",
+                record,
+            )
+        return self.get(name)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the index record of a report, or None for an unknown name."""
+        if not _NAME_RE.match(name):
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT name, topic, sha256, bytes, encodings, created_at FROM reports "
+                "WHERE name = ?",
+                (name,),
+            ).fetchone()
+        return self._record(row) if row else None
+
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Return index records, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, topic, sha256, bytes, encodings, created_at FROM reports "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row) -> Dict[str, Any]:
+        name, topic, digest, size, encodings, created_at = row
+        return {
+            "name": name,
+            "topic": topic,
+            "sha256": digest,
+            "bytes": size,
+            "encodings": [encoding for encoding in encodings.split(",") if encoding],
+            "created_at": created_at,
+        }
+
+
+_stores: "collections.OrderedDict[str, ReportStore]" = collections.OrderedDict()
+_stores_lock = threading.Lock()
+MAX_CACHED_STORES = 64
+
+
+def get_report_store(directory: str) -> ReportStore:
+    """Return the report store for a directory.
+
+    Stores are kept in a small LRU so the index table is only created once per
+    directory; an evicted store holds nothing open and stays usable by its writers.
+    """
+    directory = os.path.abspath(directory)
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = ReportStore(directory)
+        _stores.move_to_end(directory)
+        while len(_stores) > MAX_CACHED_STORES:
+            _stores.popitem(last=False)
+    return store
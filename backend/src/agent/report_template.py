@@ -0,0 +1,123 @@
+"""Local assembly of the HTML report from model-written fragments."""
+
+import html
+import re
+from typing import Dict, List
+
+# Models sometimes wrap a fragment in a markdown fence or a document of its own
+_FENCE_RE = re.compile(r"^\s*```[a-z]*\s*\n?|\n?\s*```\s*$", re.I)
+_DOCUMENT_TAG_RE = re.compile(r"<!doctype[^>]*>|</?(?:html|head|body)\b[^>]*>", re.I)
+_HEAD_RE = re.compile(r"<head\b.*?</head>", re.I | re.S)
+_CHINESE_RE = re.compile(r"[\u4e00-\u9fff]")
+_SHORT_URL_RE = re.compile(r"https://vertexaisearch\.cloud\.google\.com/id/[0-9a-z-]+")
+
+REPORT_CSS = """
+:root { --ink: #1f2933; --muted: #52606d; --accent: #2563eb; --line: #e4e7eb;
+  --paper: #ffffff; --wash: #f5f7fa; }
+* { box-sizing: border-box; }
+body { margin: 0; background: var(--wash); color: var(--ink); line-height: 1.7;
+  font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", "PingFang SC",
+  "Microsoft YaHei", "Noto Sans CJK SC", sans-serif; }
+header { background: linear-gradient(135deg, #1e3a8a, var(--accent)); color: #fff;
+  padding: 3rem 1.5rem 2.5rem; }
+header h1 { margin: 0 auto; max-width: 960px; font-size: clamp(1.8rem, 4vw, 2.6rem); }
+header p { margin: .75rem auto 0; max-width: 960px; opacity: .85; }
+nav { max-width: 960px; margin: -1.25rem auto 0; padding: 1rem 1.5rem;
+  background: var(--paper); border-radius: 10px; box-shadow: 0 4px 18px rgba(0,0,0,.08); }
+nav ol { margin: 0; padding-left: 1.25rem; columns: 2 260px; }
+nav a { color: var(--accent); text-decoration: none; }
+main { max-width: 960px; margin: 0 auto; padding: 1.5rem; }
+section { background: var(--paper); border-radius: 10px; padding: 1.5rem 2rem;
+  margin: 1.5rem 0; box-shadow: 0 2px 10px rgba(0,0,0,.05);
+  transition: box-shadow .2s ease, transform .2s ease; }
+section:hover { box-shadow: 0 6px 24px rgba(0,0,0,.09); transform: translateY(-2px); }
+h2 { margin-top: 0; color: #1e3a8a; border-bottom: 2px solid var(--line);
+  padding-bottom: .5rem; }
+h3 { color: var(--ink); }
+a { color: var(--accent); }
+table { width: 100%; border-collapse: collapse; margin: 1rem 0; display: block;
+  overflow-x: auto; }
+th, td { border: 1px solid var(--line); padding: .5rem .75rem; text-align: left; }
+th { background: var(--wash); }
+blockquote { margin: 1rem 0; padding: .5rem 1rem; border-left: 4px solid var(--accent);
+  color: var(--muted); background: var(--wash); }
+.callout { margin: 1rem 0; padding: 1rem 1.25rem; border-radius: 8px;
+  background: #eff6ff; border: 1px solid #bfdbfe; }
+.references ol { padding-left: 1.25rem; word-break: break-word; }
+footer { text-align: center; color: var(--muted); padding: 2rem 1rem 3rem;
+  font-size: .9rem; }
+@media (max-width: 640px) { section { padding: 1.25rem; } }
+"""
+
+
+def clean_fragment(text: str) -> str:
+    """Strip markdown fences and any document shell from a generated section."""
+    text = _FENCE_RE.sub("", text.strip())
+    text = _HEAD_RE.sub("", text)
+    return _DOCUMENT_TAG_RE.sub("", text).strip()
+
+
+def resolve_source_links(fragment: str, sources: List[dict]) -> str:
+    """Point the short citation URLs of the summaries back at their sources."""
+    short_urls: Dict[str, str] = {
+        source["short_url"]: source["value"]
+        for source in sources
+        if source.get("short_url") and source.get("value")
+    }
+    return _SHORT_URL_RE.sub(
+        lambda match: html.escape(short_urls.get(match.group(0), match.group(0))), fragment
+    )
+
+
+def render_report(
+    title: str,
+    research_topic: str,
+    generated_date: str,
+    sections: List[Dict[str, str]],
+    sources: List[dict],
+) -> str:
+    """Stitch generated sections into one HTML document with the shared shell.
+
+    Args:
+        title: The report title.
+        research_topic: The research topic, shown under the title.
+        generated_date: The date shown in the footer.
+        sections: ``{"heading", "html"}`` dicts in reading order; ``html`` is a fragment.
+        sources: The run's ``sources_gathered``, listed as the references.
+    """
+    toc, body = [], []
+    for number, section in enumerate(sections, start=1):
+        anchor = f"section-{number}"
+        fragment = resolve_source_links(clean_fragment(section["html"]), sources)
+        toc.append(f'<li><a href="#{anchor}">{html.escape(section["heading"])}</a></li>')
+        body.append(f'<div id="{anchor}">\n{fragment}\n</div>')
+
+    references = []
+    for source in sources:
+        url = source.get("value")
+        if not url or not url.startswith("http"):
+            continue
+        label = html.escape(source.get("label") or url)
+        references.append(f'<li><a href="{html.escape(url)}" target="_blank">{label}</a></li>')
+    if references:
+        body.append(
+            '<section class="references"><h2>References</h2><ol>\n'
+            + "\n".join(references)
+            + "\n</ol></section>"
+        )
+
+    main = "\n".join(body)
+    topic = research_topic.strip()
+    lang = "zh-CN" if _CHINESE_RE.search(topic) else "en"
+    return (
+        "<!DOCTYPE html>\n"
+        f'<html lang="{lang}">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f"<title>{html.escape(title)}</title>\n<style>{REPORT_CSS}</style>\n</head>\n<body>\n"
+        f"<header><h1>{html.escape(title)}</h1>"
+        + (f"<p>{html.escape(topic)}</p>" if topic and topic != title else "")
+        + "</header>\n"
+        f'<nav><ol>\n{"".join(toc)}\n</ol></nav>\n'
+        f"<main>\n{main}\n</main>\n"
+        f"<footer>Generated on {html.escape(generated_date)}</footer>\n</body>\n</html>\n"
+    )
@@ -0,0 +1,199 @@
+"""Per-provider rate limiting for web research calls."""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+# Expected size of a grounded search answer, added to the prompt estimate when reserving
+# tokens/min quota before the real usage is known.
+SEARCH_OUTPUT_TOKENS_ESTIMATE = 1024
+
+_MAX_COOLDOWN_SECONDS = 30.0
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of polling.
+
+    ``reserve`` debits the bucket immediately, letting it go negative, and returns how
+    long the caller has to wait before the reservation is covered. Callers therefore
+    queue up at the refill rate without busy-waiting.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        """Create a full bucket of ``capacity`` tokens refilled at ``rate_per_second``."""
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate_per_second
+        )
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Debit ``amount`` tokens and return the seconds to wait until they are available."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # a single request larger than the bucket would otherwise never be admitted
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+    def try_take(self, amount: float) -> bool:
+        """Debit ``amount`` tokens only if they are available right now."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < min(amount, self.capacity):
+                return False
+            self._tokens -= min(amount, self.capacity)
+            return True
+
+    def adjust(self, amount: float) -> None:
+        """Debit (positive) or refund (negative) tokens once real usage is known."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class SearchScheduler:
+    """Admission control for calls to one provider.
+
+    Combines a requests/sec and a tokens/min token bucket with a cap on concurrent calls.
+    Callers waiting for a free slot are admitted in priority order (lower first, FIFO on
+    ties), so earlier research loops are not starved by later fan-outs. A rate-limit
+    response from the provider puts every caller into a shared, growing cooldown instead
+    of letting each branch retry on its own schedule.
+    """
+
+    def __init__(self, requests_per_second: float, tokens_per_minute: int, max_in_flight: int):
+        """Create a scheduler with full buckets and no calls in flight."""
+        self.max_in_flight = max_in_flight
+        self._requests = TokenBucket(requests_per_second, max(1.0, requests_per_second))
+        self._tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._loop = None
+        self._cooldown_until = 0.0
+        self._rate_limit_streak = 0
+        self.admitted = 0
+        self.rate_limited = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0, tokens: int = 0) -> AsyncIterator[None]:
+        """Wait for a concurrency slot and rate-limit budget, then hold the slot."""
+        await self._acquire(priority)
+        try:
+            wait = max(
+                self._requests.reserve(1),
+                self._tokens.reserve(tokens),
+                self._cooldown_until - time.monotonic(),
+            )
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.admitted += 1
+            yield
+        finally:
+            self._release()
+
+    def try_reserve(self, tokens: int = 0) -> bool:
+        """Take rate-limit budget for an extra, optional call if it is spare right now.
+
+        Unlike ``slot`` this never waits or queues, and does not take a concurrency slot;
+        speculative work such as hedged requests only runs on leftover capacity.
+        """
+        if time.monotonic() < self._cooldown_until or not self._requests.try_take(1):
+            return False
+        if not self._tokens.try_take(tokens):
+            self._requests.adjust(-1)
+            return False
+        self.admitted += 1
+        return True
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the tokens/min bucket with the real usage of a successful call."""
+        self._tokens.adjust(actual_tokens - estimated_tokens)
+        self._rate_limit_streak = 0
+
+    def note_rate_limited(self) -> float:
+        """Start (or extend) a shared cooldown after the provider returned a 429."""
+        self.rate_limited += 1
+        self._rate_limit_streak += 1
+        cooldown = min(_MAX_COOLDOWN_SECONDS, 2.0 ** (self._rate_limit_streak - 1))
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown)
+        return cooldown
+
+    def stats(self) -> Dict[str, int]:
+        """Return admission counters and the current queue depth."""
+        return {
+            "in_flight": self._in_flight,
+            "queued": sum(1 for *_, fut in self._waiters if not fut.done()),
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+        }
+
+    async def _acquire(self, priority: int) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # futures are bound to a loop; start clean when a new loop takes over
+            self._loop = loop
+            self._waiters = []
+            self._in_flight = 0
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just before the cancellation landed
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        while self._waiters:
+            *_, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._in_flight += 1
+                future.set_result(None)
+                break
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Return True when an exception is a provider rate-limit (HTTP 429) response."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "rate limit" in message.lower()
+
+
+_schedulers: Dict[tuple, SearchScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider: str, configurable) -> SearchScheduler:
+    """Return the process-wide scheduler for a provider and its Configuration limits."""
+    key = (
+        provider,
+        configurable.search_requests_per_second,
+        configurable.search_tokens_per_minute,
+        configurable.search_max_in_flight,
+    )
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+        if scheduler is None:
+            scheduler = SearchScheduler(*key[1:])
+            _schedulers[key] = scheduler
+    return scheduler
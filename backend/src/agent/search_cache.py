@@ -0,0 +1,181 @@
+"""Persistent SQLite cache for grounded search responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from agent.utils import normalize_query
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+
+class SearchCache:
+    """SQLite-backed cache for grounded search responses.
+
+    Entries are keyed by the normalized query, the search model and the date used in the
+    prompt. Each entry keeps the response text and its grounding metadata, so citations can
+    be rebuilt from a hit without a network call. Entries expire after ``ttl_seconds`` and
+    the least recently used entries are evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        """Open (or create) the SQLite file at ``path``."""
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Lookups are sub-millisecond local reads, so the connection is used directly
+        # from the event loop; the lock serializes access from worker threads.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS search_cache_last_access ON search_cache (last_access)"
+        )
+
+    @staticmethod
+    def make_key(query: str, model: str, prompt_date: str) -> str:
+        """Build the cache key for a query, model and prompt date."""
+        raw = "\x1f".join((normalize_query(query), model, prompt_date))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(
+        self, query: str, model: str, prompt_date: str
+    ) -> Optional["types.GenerateContentResponse"]:
+        """Return the cached response for the query, or None on a miss."""
+        key = self.make_key(query, model, prompt_date)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, payload FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[0] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return _decode_response(row[1])
+
+    def put(
+        self,
+        query: str,
+        model: str,
+        prompt_date: str,
+        response: "types.GenerateContentResponse",
+    ) -> None:
+        """Store a response and evict expired and least recently used entries."""
+        key = self.make_key(query, model, prompt_date)
+        payload = _encode_response(response)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, created_at, last_access, payload) "
+                "VALUES (?, ?, ?, ?)",
+                (key, now, now, payload),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        (size,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        overflow = size - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_access LIMIT ?)",
+                (overflow,),
+            )
+        self.evictions += expired + max(overflow, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and the current number of entries."""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _encode_response(response: "types.GenerateContentResponse") -> bytes:
+    """Serialize the parts of a response that web_research needs into a compact blob."""
+    grounding_metadata = response.candidates[0].grounding_metadata
+    record = {
+        "text": response.text,
+        "grounding_metadata": grounding_metadata.model_dump(mode="json", exclude_none=True)
+        if grounding_metadata
+        else None,
+    }
+    return zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+
+def _decode_response(payload: bytes) -> "types.GenerateContentResponse":
+    """Rebuild a response object that resolve_urls/get_citations can consume."""
+    from google.genai import types
+
+    record = json.loads(zlib.decompress(payload))
+    grounding_metadata = record["grounding_metadata"]
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=record["text"])]),
+                grounding_metadata=types.GroundingMetadata.model_validate(grounding_metadata)
+                if grounding_metadata
+                else None,
+            )
+        ]
+    )
+
+
+_caches: Dict[tuple, SearchCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache(configurable) -> Optional[SearchCache]:
+    """Return the process-wide search cache for a Configuration, or None when disabled."""
+    if not configurable.enable_search_cache:
+        return None
+    cache_key = (
+        os.path.abspath(configurable.search_cache_path),
+        configurable.search_cache_ttl_seconds,
+        configurable.search_cache_max_entries,
+    )
+    with _caches_lock:
+        cache = _caches.get(cache_key)
+        if cache is None:
+            cache = SearchCache(*cache_key)
+            _caches[cache_key] = cache
+    return cache
@@ -0,0 +1,102 @@
+"""Run-wide source URL interning and deduplicated source lists."""
+
+import hashlib
+import string
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+SHORT_URL_PREFIX = "https://vertexaisearch.cloud.google.com/id/"
+
+_ALPHABET = string.digits + string.ascii_lowercase
+_SHORT_ID_LENGTH = 7
+
+
+def _short_id(url: str, length: int) -> str:
+    number = int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest(), "big")
+    digits = []
+    for _ in range(length):
+        number, remainder = divmod(number, len(_ALPHABET))
+        digits.append(_ALPHABET[remainder])
+    return "".join(digits)
+
+
+class UrlRegistry:
+    """Interns source URLs to short, stable URLs.
+
+    The short id is derived from a hash of the URL, so every web_research branch, every
+    loop and every worker process assigns the same short URL to the same source without
+    coordinating. The registry only has to step in when two URLs hash to the same id, in
+    which case the later one gets a longer id. The least recently used URLs are forgotten
+    once ``max_size`` is exceeded.
+    """
+
+    def __init__(self, max_size: int = 100_000):
+        """Create an empty registry that remembers up to ``max_size`` URLs."""
+        self.max_size = max_size
+        self._short_urls: OrderedDict[str, str] = OrderedDict()
+        self._owners: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def intern(self, url: str) -> str:
+        """Return the short URL for ``url``, assigning one on first sight."""
+        with self._lock:
+            short_url = self._short_urls.get(url)
+            if short_url is not None:
+                self._short_urls.move_to_end(url)
+                return short_url
+            length = _SHORT_ID_LENGTH
+            short_url = f"{SHORT_URL_PREFIX}{_short_id(url, length)}"
+            while self._owners.get(short_url, url) != url:
+                length += 1
+                short_url = f"{SHORT_URL_PREFIX}{_short_id(url, length)}"
+            self._short_urls[url] = short_url
+            self._owners[short_url] = url
+            if len(self._short_urls) > self.max_size:
+                old_url, old_short_url = self._short_urls.popitem(last=False)
+                del self._owners[old_short_url]
+            return short_url
+
+    def __len__(self) -> int:
+        """Return the number of interned URLs."""
+        return len(self._short_urls)
+
+
+# Shared by every run in the process
+url_registry = UrlRegistry()
+
+
+class SourceList(list):
+    """A list of source dicts that carries an index from source URL to position."""
+
+    __slots__ = ("index",)
+
+
+def _source_key(source: dict) -> str:
+    return source.get("value") or source.get("short_url") or ""
+
+
+def merge_sources(left: List[dict], right: List[dict]) -> SourceList:
+    """Reducer for ``sources_gathered`` that keeps one entry per source URL.
+
+    The accumulated list is a SourceList carrying a dict index of the URLs it holds.
+    Neither ``left`` nor its index is changed: the merge returns a new SourceList with
+    shallow copies of both (a C-level copy of references, with no per-source Python
+    work) and only looks up the keys of the new items. After a checkpoint round trip
+    the list is a plain list and the index is rebuilt from it once.
+    """
+    merged = SourceList(left)
+    if isinstance(left, SourceList):
+        merged.index = dict(left.index)
+    else:
+        merged.index = {}
+        for position, source in enumerate(left):
+            merged.index.setdefault(_source_key(source), position)
+    index = merged.index
+    for source in right:
+        key = _source_key(source)
+        if key in index:
+            continue
+        index[key] = len(merged)
+        merged.append(source)
+    return merged
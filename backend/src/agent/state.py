@@ -6,6 +6,8 @@ from typing import TypedDict
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
+from agent.metrics import merge_run_metrics
+from agent.sources import merge_sources
 
 import operator
 from dataclasses import dataclass, field
@@ -15,20 +17,37 @@ from typing_extensions import Annotated
 class OverallState(TypedDict):
     messages: Annotated[list, add_messages]
     search_query: Annotated[list, operator.add]
+    pending_searches: list
     web_research_result: Annotated[list, operator.add]
-    sources_gathered: Annotated[list, operator.add]
+    sources_gathered: Annotated[list, merge_sources]
     initial_search_query_count: int
     max_research_loops: int
     research_loop_count: int
     reasoning_model: str
+    deduplicated_query_count: Annotated[int, operator.add]
+    research_digest: str
+    digested_result_count: int
+    cached_result_count: int
+    reflection_prompt_tokens: Annotated[list, operator.add]
+    html_filename: str
+    html_bytes: int
+    report_context: dict
+    report_outline: dict
+    report_summaries: list
+    report_sections: Annotated[list, operator.add]
+    run_metrics: Annotated[dict, merge_run_metrics]
+    run_started_at: float
+    run_spend_baseline: dict
+    budget_status: dict
 
 
 class ReflectionState(TypedDict):
     is_sufficient: bool
     knowledge_gap: str
-    follow_up_queries: Annotated[list, operator.add]
+    follow_up_queries: list
     research_loop_count: int
     number_of_ran_queries: int
+    budget_exhausted: bool
 
 
 class Query(TypedDict):
@@ -40,6 +59,19 @@ class QueryGenerationState(TypedDict):
     query_list: list[Query]
 
 
+class SectionState(TypedDict):
+    """Payload of one write_section branch."""
+
+    index: int
+    heading: str
+    focus: str
+    report_outline: dict
+    research_topic: str
+    summaries: list
+    run_metrics: dict
+    run_spend_baseline: dict
+
+
 class WebSearchState(TypedDict):
     search_query: str
     id: str
@@ -21,3 +21,21 @@ class Reflection(BaseModel):
     follow_up_queries: List[str] = Field(
         description="A list of follow-up queries to address the knowledge gap."
     )
+
+
+class ReportSection(BaseModel):
+    """One section of the report outline."""
+
+    heading: str = Field(description="The section heading.")
+    focus: str = Field(
+        description="What the section covers: the facts, figures and sources it draws on."
+    )
+
+
+class ReportOutline(BaseModel):
+    """The outline of a report written section by section."""
+
+    title: str = Field(description="The report title.")
+    sections: List[ReportSection] = Field(
+        description="The report sections in reading order, excluding references."
+    )
@@ -1,11 +1,16 @@
+import re
+import unicodedata
 from typing import Any, Dict, List
-from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+from agent.sources import UrlRegistry, url_registry
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
 
 
 def get_research_topic(messages: List[AnyMessage]) -> str:
-    """
-    Get the research topic from the messages.
-    """
+    """Get the research topic from the messages."""
     # check if request has a history and combine the messages into a single string
     if len(messages) == 1:
         research_topic = messages[-1].content
@@ -19,65 +24,136 @@ def get_research_topic(messages: List[AnyMessage]) -> str:
     return research_topic
 
 
-def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
+def get_message_text(message: AnyMessage) -> str:
+    """Get the plain text of a message or message chunk.
+
+    Some providers (e.g. Anthropic) return content as a list of content blocks instead of
+    a string, especially while streaming.
+    """
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings compare equal.
+
+    Applies NFKC folding, lower-casing, punctuation stripping and whitespace collapsing,
+    then sorts the remaining tokens so word order does not matter.
     """
-    Create a map of the vertex ai search urls (very long) to a short url with a unique id for each url.
-    Ensures each original URL gets a consistent shortened form while maintaining uniqueness.
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return " ".join(sorted(text.split()))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a text without loading a tokenizer.
+
+    CJK characters are counted as one token each and everything else as four characters
+    per token, which is close enough for rate limiting and budgeting.
     """
-    prefix = f"https://vertexaisearch.cloud.google.com/id/"
-    urls = [site.web.uri for site in urls_to_resolve]
+    cjk = sum(1 for c in text if "\u3040" <= c <= "\u9fff" or "\uac00" <= c <= "\ud7af")
+    return cjk + (len(text) - cjk + 3) // 4
 
-    # Create a dictionary that maps each unique URL to its first occurrence index
+
+def resolve_urls(urls_to_resolve: List[Any], registry: UrlRegistry = url_registry) -> Dict[str, str]:
+    """Create a map of the vertex ai search urls (very long) to a short url for each url.
+
+    Short urls come from the run-wide registry, so the same source gets the same short
+    url in every web_research branch instead of a per-branch ``{id}-{idx}`` one.
+    """
     resolved_map = {}
-    for idx, url in enumerate(urls):
+    for site in urls_to_resolve:
+        url = site.web.uri
         if url not in resolved_map:
-            resolved_map[url] = f"{prefix}{id}-{idx}"
+            resolved_map[url] = registry.intern(url)
 
     return resolved_map
 
 
-def insert_citation_markers(text, citations_list):
+def _byte_to_char_offsets(text: str, byte_offsets) -> Dict[int, int]:
+    """Map UTF-8 byte offsets into ``text`` to character offsets in a single pass.
+
+    The offsets are visited in sorted order while a running prefix sum counts the
+    characters decoded between consecutive offsets, so the text is decoded once in total.
+    An offset that falls inside a multi-byte character snaps to the end of that character.
     """
-    Inserts citation markers into a text string based on start and end indices.
+    encoded = text.encode("utf-8")
+    size = len(encoded)
+    char_offsets = {}
+    previous_byte = 0
+    chars = 0
+    for byte_offset in sorted(set(byte_offsets)):
+        boundary = min(max(byte_offset, 0), size)
+        while boundary < size and (encoded[boundary] & 0xC0) == 0x80:
+            boundary += 1
+        if boundary > previous_byte:
+            chars += len(encoded[previous_byte:boundary].decode("utf-8"))
+            previous_byte = boundary
+        char_offsets[byte_offset] = chars
+    return char_offsets
+
+
+def insert_citation_markers(text, citations_list):
+    """Insert citation markers into a text string based on start and end indices.
+
+    Gemini grounding segments report ``start_index``/``end_index`` as UTF-8 byte offsets,
+    which only coincide with Python character indices for ASCII text. Byte offsets are
+    mapped to character offsets with a running prefix sum over the sorted offsets, and the
+    output is assembled in a single pass with one join, so the cost is
+    O(len(text) + k log k) for k citations.
 
     Args:
         text (str): The original text string.
         citations_list (list): A list of dictionaries, where each dictionary
-                               contains 'start_index', 'end_index', and
-                               'segment_string' (the marker to insert).
-                               Indices are assumed to be for the original text.
+                               contains 'start_index', 'end_index' (UTF-8 byte
+                               offsets into the original text) and 'segments'
+                               (the links to insert as markers).
 
     Returns:
         str: The text with citation markers inserted.
     """
-    # Sort citations by end_index in descending order.
-    # If end_index is the same, secondary sort by start_index descending.
-    # This ensures that insertions at the end of the string don't affect
-    # the indices of earlier parts of the string that still need to be processed.
-    sorted_citations = sorted(
-        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
-    )
+    if not citations_list:
+        return text
 
-    modified_text = text
-    for citation_info in sorted_citations:
-        # These indices refer to positions in the *original* text,
-        # but since we iterate from the end, they remain valid for insertion
-        # relative to the parts of the string already processed.
-        end_idx = citation_info["end_index"]
-        marker_to_insert = ""
-        for segment in citation_info["segments"]:
-            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
-        # Insert the citation marker at the original end_idx position
-        modified_text = (
-            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+    end_offsets = [citation_info["end_index"] for citation_info in citations_list]
+    if text.isascii():
+        char_offsets = {offset: min(max(offset, 0), len(text)) for offset in end_offsets}
+    else:
+        char_offsets = _byte_to_char_offsets(text, end_offsets)
+
+    # Order markers by position. Markers sharing an end index keep the order the old
+    # back-to-front insertion produced: ascending start index, later citations first.
+    insertions = sorted(
+        (
+            char_offsets[citation_info["end_index"]],
+            citation_info["start_index"],
+            -position,
+            "".join(
+                f" [{segment['label']}]({segment['short_url']})"
+                for segment in citation_info["segments"]
+            ),
         )
+        for position, citation_info in enumerate(citations_list)
+    )
 
-    return modified_text
+    parts = []
+    previous_end = 0
+    for end_idx, _, _, marker_to_insert in insertions:
+        parts.append(text[previous_end:end_idx])
+        parts.append(marker_to_insert)
+        previous_end = end_idx
+    parts.append(text[previous_end:])
+    return "".join(parts)
 
 
 def get_citations(response, resolved_urls_map):
-    """
-    Extracts and formats citation information from a Gemini model's response.
+    """Extract and format citation information from a Gemini model's response.
 
     This function processes the grounding metadata provided in the response to
     construct a list of citation objects. Each citation object includes the
@@ -93,10 +169,10 @@ def get_citations(response, resolved_urls_map):
     Returns:
         list: A list of dictionaries, where each dictionary represents a citation
               and has the following keys:
-              - "start_index" (int): The starting character index of the cited
+              - "start_index" (int): The starting UTF-8 byte offset of the cited
                                      segment in the original text. Defaults to 0
                                      if not specified.
-              - "end_index" (int): The character index immediately after the
+              - "end_index" (int): The UTF-8 byte offset immediately after the
                                    end of the cited segment (exclusive).
               - "segments" (list[str]): A list of individual markdown-formatted
                                         links for each grounding chunk.
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from datetime import datetime
 from agent import graph
@@ -142,11 +143,12 @@ print(f"初始输入: {initial_state['messages'][0]['content']}")
 print(f"最大研究循环次数: {initial_state['max_research_loops']}")
 print(f"初始搜索查询数量: {initial_state['initial_search_query_count']}")
 
-step_counter = 0
+async def run_agent():
+    """使用 astream 异步执行图，并打印每个步骤"""
+    step_counter = 0
 
-# 使用 stream 方法来跟踪每个步骤
-try:
-    for step in graph.stream(initial_state):
+    # 使用 astream 方法来跟踪每个步骤（图中的节点都是异步的）
+    async for step in graph.astream(initial_state):
         step_counter += 1
         
         # 获取当前步骤的节点名称和数据
@@ -165,6 +167,11 @@ try:
         else:
             log_step(f"📝 执行节点: {node_name}", node_data, step_counter)
 
+    return step_counter
+
+
+try:
+    step_counter = asyncio.run(run_agent())
     print(f"\n🎉 智能体流程执行完成！总共执行了 {step_counter} 个步骤。")
 
 except Exception as e:
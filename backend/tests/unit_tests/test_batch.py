@@ -0,0 +1,115 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agent.batch import RESULTS_FILE, BatchRunner, completed_ids
+
+RECORDS = [{"id": f"t{i}", "topic": f"topic {i}"} for i in range(3)]
+
+
+class FakeGraph:
+    """Graph stand-in with a checkpoint snapshot per thread and recorded invocations."""
+
+    def __init__(self, snapshots=None):
+        self.snapshots = snapshots or {}
+        self.invocations = []
+
+    async def aget_state(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        return self.snapshots.get(thread_id, SimpleNamespace(values={}, next=()))
+
+    async def ainvoke(self, state_input, config, **kwargs):
+        thread_id = config["configurable"].get("thread_id")
+        self.invocations.append((thread_id, state_input))
+        state = {
+            "html_filename": f"{config['configurable']['output_dir']}/report.html",
+            "search_query": ["q"],
+        }
+        if thread_id is not None:
+            self.snapshots[thread_id] = SimpleNamespace(values=state, next=())
+        return state
+
+
+def _write_results(output_dir, lines):
+    output_dir.mkdir(exist_ok=True)
+    (output_dir / RESULTS_FILE).write_text("".join(lines), encoding="utf-8")
+
+
+def test_completed_ids_only_counts_finished_lines(tmp_path):
+    _write_results(
+        tmp_path,
+        [
+            json.dumps({"id": "t0", "status": "ok"}) + "\n",
+            json.dumps({"id": "t1", "status": "error"}) + "\n",
+            '{"id": "t2", "sta',
+        ],
+    )
+    assert completed_ids(str(tmp_path)) == {"t0"}
+
+
+def test_finished_topics_are_skipped(tmp_path):
+    _write_results(tmp_path, [json.dumps({"id": "t1", "status": "ok"}) + "\n"])
+    graph = FakeGraph()
+    runner = BatchRunner(str(tmp_path), concurrency=2, checkpoint=False, graph=graph)
+    summary = asyncio.run(runner.run(iter(RECORDS + RECORDS[:1])))
+
+    assert (summary["ok"], summary["error"], summary["skipped"]) == (2, 0, 2)
+    assert len(graph.invocations) == 2
+    lines = (tmp_path / RESULTS_FILE).read_text(encoding="utf-8").splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == ["t0", "t1", "t2"]
+    assert completed_ids(str(tmp_path)) == {"t0", "t1", "t2"}
+
+
+def _thread_id(runner, record):
+    return runner._config(record)["configurable"]["thread_id"]
+
+
+def test_checkpointed_topics_resume_or_reuse_their_state(tmp_path):
+    graph = FakeGraph()
+    runner = BatchRunner(str(tmp_path), checkpoint=True, graph=graph)
+    t0, t1, t2 = (_thread_id(runner, record) for record in RECORDS)
+    # interrupted half way: continues from the checkpoint
+    graph.snapshots[t0] = SimpleNamespace(values={"search_query": ["q"]}, next=("reflection",))
+    # finished before its result line was written: nothing runs again
+    graph.snapshots[t1] = SimpleNamespace(
+        values={"html_filename": "done.html", "search_query": ["q"]}, next=()
+    )
+    results = {
+        record["id"]: asyncio.run(runner.run_topic(record)) for record in RECORDS
+    }
+
+    inputs = dict(graph.invocations)
+    assert inputs[t0] is None
+    assert t1 not in inputs
+    assert inputs[t2]["messages"][0].content == "topic 2"
+    assert results["t1"]["html_filename"] == "done.html"
+    assert all(result["status"] == "ok" for result in results.values())
+    assert (tmp_path / "t1" / "metrics.json").exists()
+
+
+def test_rerun_into_a_new_output_dir_runs_the_topics_again(tmp_path):
+    graph = FakeGraph()
+    first = BatchRunner(str(tmp_path / "first"), checkpoint=True, graph=graph)
+    asyncio.run(first.run(iter(RECORDS)))
+    assert len(graph.invocations) == 3
+
+    second = BatchRunner(str(tmp_path / "second"), checkpoint=True, graph=graph)
+    summary = asyncio.run(second.run(iter(RECORDS)))
+    assert (summary["ok"], summary["skipped"]) == (3, 0)
+    assert len(graph.invocations) == 6
+    assert all(state_input is not None for _, state_input in graph.invocations[3:])
+    metrics = json.loads((tmp_path / "second" / "t0" / "metrics.json").read_text("utf-8"))
+    assert metrics["html_filename"].startswith(str(tmp_path / "second" / "t0"))
+
+
+def test_thread_ids_depend_on_the_topic_settings(tmp_path):
+    runner = BatchRunner(str(tmp_path), checkpoint=True, graph=FakeGraph())
+    record = RECORDS[0]
+    assert _thread_id(runner, record) == _thread_id(BatchRunner(str(tmp_path)), record)
+    assert _thread_id(runner, record).startswith("batch:t0:")
+    assert _thread_id(runner, record) != _thread_id(
+        runner, {**record, "configurable": {"max_research_loops": 1}}
+    )
+    assert _thread_id(runner, record) != _thread_id(
+        BatchRunner(str(tmp_path), configurable={"reasoning_model": "gpt-4o"}), record
+    )
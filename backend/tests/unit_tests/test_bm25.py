@@ -0,0 +1,73 @@
+import pytest
+
+from agent.bm25 import BM25Index, ResearchIndex, split_chunks, tokenize
+
+
+def test_tokenize_splits_cjk_into_bigrams_and_drops_urls():
+    assert tokenize("Apple 伯克希尔 [a](https://x.example/AAPL) 股") == [
+        "apple",
+        "伯克",
+        "克希",
+        "希尔",
+        "a",
+        "股",
+    ]
+    # full-width forms are folded by NFKC
+    assert tokenize("ＡＰＰＬＥ") == ["apple"]
+
+
+def test_search_ranks_the_most_relevant_document_first():
+    index = BM25Index()
+    index.add("Berkshire trimmed its Apple stake in the second quarter.")
+    index.add("Apple Apple Apple: Berkshire's Apple stake is its largest holding.")
+    index.add("Occidental Petroleum shares rose after the filing.")
+
+    results = index.search("Apple stake", k=5)
+    assert [doc_id for doc_id, _ in results] == [1, 0]
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("Occidental", k=1)[0][0] == 2
+    assert index.search("Chubb") == []
+    assert BM25Index().search("Apple") == []
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = BM25Index()
+    for text in ("Berkshire cash", "Berkshire Apple", "Berkshire Chubb", "Berkshire Chubb"):
+        index.add(text)
+    (best, _), *_ = index.search("Berkshire Apple", k=4)
+    assert best == 1
+
+
+def test_chinese_queries_match_by_bigrams_without_segmentation():
+    index = BM25Index()
+    index.add("伯克希尔哈撒韦在第二季度减持了苹果公司的股票。")
+    index.add("西方石油公司的股价在财报发布后上涨。")
+    index.add("Berkshire trimmed its Apple stake.")
+
+    assert index.search("苹果股票", k=1)[0][0] == 0
+    assert index.search("西方石油股价", k=1)[0][0] == 1
+    # no bigram in common: "苹果" and "果汁" share only a character
+    assert index.search("果汁", k=3) == []
+
+
+def test_split_chunks_cuts_long_paragraphs_at_sentences():
+    text = "First paragraph.\n\n" + " ".join(f"Sentence {i} is here." for i in range(40))
+    chunks = split_chunks(text, max_tokens=20)
+    assert chunks[0] == "First paragraph."
+    assert len(chunks) > 2
+    assert " ".join(chunks[1:]) == text.split("\n\n")[1]
+
+
+def test_research_index_only_indexes_new_summaries():
+    index = ResearchIndex()
+    summaries = ["Berkshire trimmed Apple.", "Occidental shares rose."]
+    assert index.sync(summaries) == 2
+    assert index.sync(summaries) == 0
+    summaries.append("伯克希尔增持了西方石油。")
+    assert index.sync(summaries) == 1
+    assert index.retrieve(["西方石油", "Apple"], k=1) == [
+        "Berkshire trimmed Apple.",
+        "伯克希尔增持了西方石油。",
+    ]
+    with pytest.raises(ValueError):
+        index.sync(summaries[:1])
@@ -0,0 +1,54 @@
+from agent.budget import MIN_REPORT_OUTPUT_TOKENS, check_budget, report_max_tokens
+from agent.configuration import Configuration
+
+MODEL = "claude-sonnet-4-20250514"
+
+
+def _metrics(input_tokens, output_tokens, cost_usd=0.0):
+    return {
+        "models": {
+            MODEL: {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost_usd": cost_usd,
+            }
+        }
+    }
+
+
+def test_report_cap_follows_the_token_budget():
+    configurable = Configuration(research_token_budget=100_000, answer_model=MODEL)
+    # 100k - 60k spent - 10k prompt leaves 30k, rounded down to a whole 1024
+    capped = report_max_tokens(configurable, 64_000, _metrics(50_000, 10_000), None, 10_000)
+    assert capped == 29 * 1024
+    # (100k - 60k - 4 x 5k prompts) / 4 sections = 5k each, rounded down
+    per_section = report_max_tokens(
+        configurable, 8_000, _metrics(50_000, 10_000), None, 5_000, calls=4
+    )
+    assert per_section == 4 * 1024
+
+
+def test_report_cap_follows_the_cost_budget_and_keeps_a_floor():
+    configurable = Configuration(research_cost_budget_usd=1.0, answer_model=MODEL)
+    assert report_max_tokens(configurable, 64_000, _metrics(0, 0, 0.1), None, 1_000) < 64_000
+    spent = _metrics(0, 0, 5.0)
+    assert report_max_tokens(configurable, 64_000, spent, None, 1_000) == MIN_REPORT_OUTPUT_TOKENS
+    unbudgeted = Configuration(answer_model=MODEL)
+    assert report_max_tokens(unbudgeted, 64_000, spent, None, 1_000) == 64_000
+
+
+def test_earlier_runs_of_the_thread_do_not_count():
+    configurable = Configuration(research_token_budget=100_000, answer_model=MODEL)
+    baseline = {"tokens": 60_000, "cost_usd": 0.0}
+    assert report_max_tokens(configurable, 8_000, _metrics(50_000, 10_000), baseline, 0) == 8_000
+
+
+def test_sections_mode_reserves_a_call_per_section():
+    summaries = ["word " * 4_000] * 5
+    metrics = _metrics(40_000, 2_000)
+    single = Configuration(research_token_budget=200_000, answer_model=MODEL)
+    sections = Configuration(
+        research_token_budget=200_000, answer_model=MODEL, report_mode="sections"
+    )
+    assert check_budget(single, None, metrics, None, 1, summaries)["stop_reason"] is None
+    assert check_budget(sections, None, metrics, None, 1, summaries)["stop_reason"] == "tokens"
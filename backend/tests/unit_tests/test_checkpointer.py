@@ -0,0 +1,193 @@
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from agent import checkpointer as checkpointer_module
+from agent.checkpointer import SQLiteCheckpointer, resume_research, run_research
+from agent.sources import merge_sources
+
+LONG = ["summary %d " % i + "research text " * 200 for i in range(3)]
+
+
+class FanOutState(TypedDict, total=False):
+    topic: str
+    results: Annotated[list, operator.add]
+    sources: Annotated[list, merge_sources]
+
+
+def _plan(state):
+    return {"sources": [{"value": "https://a.example", "label": LONG[0]}]}
+
+
+def _fan_out(state):
+    return [Send("research", {"topic": text}) for text in LONG]
+
+
+def _research(state):
+    return {
+        "results": [state["topic"]],
+        "sources": [{"value": f"https://{len(state['topic'])}.example", "label": state["topic"]}],
+    }
+
+
+def _graph(checkpointer):
+    builder = StateGraph(FanOutState)
+    builder.add_node("plan", _plan)
+    builder.add_node("research", _research)
+    builder.add_edge(START, "plan")
+    builder.add_conditional_edges("plan", _fan_out, ["research"])
+    builder.add_edge("research", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _stored_bytes(checkpointer):
+    rows = checkpointer._conn.execute(
+        "SELECT blob FROM checkpoint_blobs WHERE blob IS NOT NULL "
+        "UNION ALL SELECT blob FROM checkpoint_writes"
+    ).fetchall()
+    return b"".join(row[0] for row in rows)
+
+
+def test_long_texts_round_trip_out_of_line(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = _graph(checkpointer)
+    config = {"configurable": {"thread_id": "t1"}}
+    state = asyncio.run(graph.ainvoke({"topic": "t"}, config, durability="sync"))
+
+    restored = graph.get_state(config).values
+    assert sorted(restored["results"]) == sorted(LONG)
+    assert restored["sources"] == list(state["sources"])
+    # every long text is stored once, however many Send packets, writes and channel
+    # versions (the SourceList of sources included) hold it
+    assert checkpointer.stats()["texts"] == len(LONG)
+    assert b"research text research text" not in _stored_bytes(checkpointer)
+
+
+def test_send_packets_in_pending_writes_round_trip(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = _graph(checkpointer)
+    config = {"configurable": {"thread_id": "t2"}}
+    asyncio.run(graph.ainvoke({"topic": "t"}, config, durability="sync"))
+
+    # the fan-out's Send packets are writes of the plan task, against the checkpoint it
+    # ran from
+    plan_step = next(
+        snapshot for snapshot in graph.get_state_history(config) if snapshot.next == ("plan",)
+    )
+    pending = checkpointer.get_tuple(plan_step.config).pending_writes
+    sends = [value for _, _, value in pending if isinstance(value, Send)]
+    assert sorted(send.arg["topic"] for send in sends) == sorted(LONG)
+
+
+def test_delete_thread_removes_texts_no_other_thread_uses(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = _graph(checkpointer)
+    for thread_id in ("t3", "t4"):
+        config = {"configurable": {"thread_id": thread_id}}
+        asyncio.run(graph.ainvoke({"topic": "t"}, config, durability="sync"))
+
+    # both threads hold the same texts, so deleting one keeps them
+    checkpointer.delete_thread("t3")
+    assert checkpointer.stats()["texts"] == len(LONG)
+    restored = graph.get_state({"configurable": {"thread_id": "t4"}}).values
+    assert sorted(restored["results"]) == sorted(LONG)
+
+    checkpointer.delete_thread("t4")
+    assert checkpointer.stats() == {
+        "checkpoints": 0,
+        "channel_bytes": 0,
+        "write_bytes": 0,
+        "texts": 0,
+        "text_bytes": 0,
+    }
+
+
+def test_prune_keeps_the_latest_checkpoint_and_its_texts(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = _graph(checkpointer)
+    config = {"configurable": {"thread_id": "t5"}}
+    asyncio.run(graph.ainvoke({"topic": "t"}, config, durability="sync"))
+    # a text only an earlier checkpoint's channel values hold
+    stale = {"topic": "stale " + "research text " * 200}
+    graph.update_state(config, stale)
+    graph.update_state(config, {"topic": "t"})
+    assert checkpointer.stats()["texts"] == len(LONG) + 1
+
+    checkpointer.prune(["t5"])
+    assert checkpointer.stats()["checkpoints"] == 1
+    assert checkpointer.stats()["texts"] == len(LONG)
+    restored = graph.get_state(config).values
+    assert sorted(restored["results"]) == sorted(LONG)
+    assert restored["topic"] == "t"
+
+    checkpointer.prune(["t5"], strategy="delete")
+    assert checkpointer.stats()["texts"] == 0
+
+
+def test_refs_are_backfilled_for_files_written_before_tracking(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    checkpointer = SQLiteCheckpointer(path)
+    graph = _graph(checkpointer)
+    for thread_id in ("t6", "t7"):
+        config = {"configurable": {"thread_id": thread_id}}
+        asyncio.run(graph.ainvoke({"topic": "t"}, config, durability="sync"))
+    checkpointer._conn.execute("DELETE FROM checkpoint_text_refs")
+
+    reopened = SQLiteCheckpointer(path)
+    reopened.delete_thread("t6")
+    assert reopened.stats()["texts"] == len(LONG)
+
+
+class ResumeState(TypedDict, total=False):
+    messages: list
+    seen: Annotated[list, operator.add]
+
+
+def _resumable_graph(checkpointer, failures):
+    def first(state, config):
+        return {"seen": ["first:" + config["configurable"].get("report_mode", "default")]}
+
+    def second(state, config):
+        if failures:
+            failures.pop()
+            raise RuntimeError("worker died")
+        return {"seen": ["second:" + config["configurable"].get("report_mode", "default")]}
+
+    builder = StateGraph(ResumeState)
+    builder.add_node("first", first)
+    builder.add_node("second", second)
+    builder.add_edge(START, "first")
+    builder.add_edge("first", "second")
+    builder.add_edge("second", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def test_resume_reapplies_the_runs_configurable(tmp_path, monkeypatch):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(
+        checkpointer_module, "_durable_graph", _resumable_graph(checkpointer, [True, True])
+    )
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_research("topic", "t6", {"report_mode": "sections"}))
+    with pytest.raises(RuntimeError):
+        asyncio.run(resume_research("t6"))
+
+    # the failed resume kept the settings on its own checkpoints
+    state = asyncio.run(resume_research("t6"))
+    assert state["seen"] == ["first:sections", "second:sections"]
+
+
+def test_resume_overrides_take_precedence(tmp_path, monkeypatch):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(
+        checkpointer_module, "_durable_graph", _resumable_graph(checkpointer, [True])
+    )
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_research("topic", "t7", {"report_mode": "sections"}))
+
+    state = asyncio.run(resume_research("t7", {"report_mode": "single"}))
+    assert state["seen"] == ["first:sections", "second:single"]
@@ -0,0 +1,213 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agent import circuit_breaker as circuit_breaker_module
+from agent import graph as graph_module
+from agent.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitStore,
+    circuit_breaker_stats,
+    get_circuit_breaker,
+)
+from agent.configuration import Configuration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker_module.time, "time", clock.time)
+    return clock
+
+
+def _breaker(store=None):
+    return CircuitBreaker(
+        "search:test", failure_rate=0.5, min_calls=4, window_seconds=60, open_seconds=30,
+        store=store,
+    )
+
+
+def _fail_until_open(breaker, clock):
+    for ok in (True, False, True, False):
+        clock.now += 1
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+
+def test_failure_rate_opens_then_probe_closes(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    # below min_calls the rate is not judged
+    assert breaker.state == CLOSED
+
+    breaker = _breaker()
+    _fail_until_open(breaker, clock)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 2
+
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_failed_probe_reopens_and_lost_probe_is_replaced(clock):
+    breaker = _breaker()
+    _fail_until_open(breaker, clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    assert breaker.allow()
+    # the probe never reports back; after open_seconds another caller probes
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+
+
+def test_workers_share_state_through_the_store(clock, tmp_path):
+    path = str(tmp_path / "circuits.sqlite")
+    worker_a = _breaker(CircuitStore(path))
+    worker_b = _breaker(CircuitStore(path))
+
+    _fail_until_open(worker_a, clock)
+    assert worker_b.state == OPEN
+    assert not worker_b.allow()
+
+    # both workers race for the half-open probe; the compare-and-set lets one win
+    clock.now += 30
+    assert worker_a.allow()
+    assert not worker_b.allow()
+    assert worker_b.state == HALF_OPEN
+
+    clock.now += 1
+    worker_a.record_success()
+    assert worker_b.state == CLOSED
+    assert worker_b.allow()
+
+
+def test_compare_and_set_rejects_a_stale_expectation(tmp_path):
+    store = CircuitStore(str(tmp_path / "circuits.sqlite"))
+    assert store.load("fallback:test") == (CLOSED, 0)
+    assert store.compare_and_set("fallback:test", (CLOSED, 0), (OPEN, 5.0))
+    assert not store.compare_and_set("fallback:test", (CLOSED, 0), (OPEN, 6.0))
+    assert store.load("fallback:test") == (OPEN, 5.0)
+
+
+def test_release_probe_lets_the_next_caller_probe(clock, tmp_path):
+    path = str(tmp_path / "circuits.sqlite")
+    worker_a = _breaker(CircuitStore(path))
+    worker_b = _breaker(CircuitStore(path))
+    _fail_until_open(worker_a, clock)
+    clock.now += 30
+    assert worker_a.allow()
+    assert not worker_b.allow()
+
+    # the probe hit a rate limit: no outcome, but the probe is free again at once
+    worker_a.release_probe()
+    assert worker_a.state == HALF_OPEN
+    assert worker_b.allow()
+    assert not worker_a.allow()
+    worker_b.record_success()
+    assert worker_a.state == CLOSED
+    # a closed circuit has no probe to release
+    worker_a.release_probe()
+    assert worker_a.state == CLOSED
+
+
+def test_registry_builds_a_breaker_per_setting(tmp_path):
+    config = Configuration(enable_circuit_breaker=True, circuit_min_calls=4)
+    breaker = get_circuit_breaker("search:registry-test", config)
+    assert get_circuit_breaker("search:registry-test", config) is breaker
+    assert get_circuit_breaker(
+        "search:registry-test", Configuration(enable_circuit_breaker=False)
+    ) is None
+
+    stricter = get_circuit_breaker(
+        "search:registry-test",
+        Configuration(enable_circuit_breaker=True, circuit_min_calls=2, circuit_open_seconds=5),
+    )
+    assert stricter is not breaker
+    assert (stricter.min_calls, stricter.open_seconds) == (2, 5)
+    assert breaker.min_calls == 4
+
+    shared = get_circuit_breaker(
+        "search:registry-test",
+        Configuration(
+            enable_circuit_breaker=True,
+            circuit_min_calls=4,
+            circuit_state_path=str(tmp_path / "circuits.sqlite"),
+        ),
+    )
+    assert shared is not breaker and shared.store is not None
+    stats = circuit_breaker_stats()
+    assert sum(name.startswith("search:registry-test") for name in stats) == 3
+
+
+def test_rate_limited_probe_is_released_by_web_research(clock, monkeypatch):
+    config = {
+        "configurable": {
+            "search_model": "probe-test-model",
+            "enable_circuit_breaker": True,
+            "circuit_min_calls": 4,
+            "enable_search_cache": False,
+            "enable_search_hedging": False,
+            # a scheduler of its own, so the 429 cooldown does not reach other tests
+            "search_max_in_flight": 13,
+        }
+    }
+    breaker = get_circuit_breaker(
+        "search:probe-test-model", Configuration.from_runnable_config(config)
+    )
+    _fail_until_open(breaker, clock)
+    clock.now += 30
+
+    async def rate_limited(**kwargs):
+        raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+    async def fallback(state, configurable):
+        return {"web_research_result": ["fallback"]}
+
+    models = SimpleNamespace(generate_content=rate_limited)
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    monkeypatch.setattr(graph_module, "get_genai_client", lambda: client)
+    monkeypatch.setattr(graph_module, "_fallback_research", fallback)
+
+    result = asyncio.run(graph_module.web_research({"search_query": "q", "id": 0}, config))
+    assert result["web_research_result"] == ["fallback"]
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,52 @@
+from agent.utils import _byte_to_char_offsets, insert_citation_markers
+
+
+def _byte_offset(text, char_offset):
+    return len(text[:char_offset].encode("utf-8"))
+
+
+def _citation(text, start, end, *labels):
+    """Citation over text[start:end], with Gemini's UTF-8 byte offsets."""
+    return {
+        "start_index": _byte_offset(text, start),
+        "end_index": _byte_offset(text, end),
+        "segments": [{"label": label, "short_url": f"s/{label}"} for label in labels],
+    }
+
+
+def test_markers_land_after_multibyte_segments():
+    text = "伯克希尔减持苹果。Cash hit a record 💰. 增持西方石油。"
+    first = text.index("。") + 1
+    second = text.index("💰") + 2
+    citations = [
+        _citation(text, second - 1, second, "c"),
+        _citation(text, 0, first, "a", "b"),
+        _citation(text, second + 1, len(text), "d"),
+    ]
+    assert insert_citation_markers(text, citations) == (
+        "伯克希尔减持苹果。 [a](s/a) [b](s/b)"
+        "Cash hit a record 💰. [c](s/c)"
+        " 增持西方石油。 [d](s/d)"
+    )
+
+
+def test_markers_sharing_an_end_keep_their_order():
+    text = "股票 📈 rose"
+    end = text.index("📈") + 1
+    citations = [_citation(text, 0, end, "late"), _citation(text, 3, end, "early")]
+    # ascending start index, then later citations first
+    assert insert_citation_markers(text, citations) == "股票 📈 [late](s/late) [early](s/early) rose"
+
+
+def test_byte_offsets_inside_a_character_snap_to_its_end():
+    text = "a苹b"
+    # 苹 is bytes 1..3, so offsets 2 and 3 both fall inside it
+    assert _byte_to_char_offsets(text, [0, 1, 2, 3, 4, 5, 99]) == {
+        0: 0,
+        1: 1,
+        2: 2,
+        3: 2,
+        4: 2,
+        5: 3,
+        99: 3,
+    }
@@ -0,0 +1,56 @@
+import json
+
+from agent.context_packing import pack_summaries
+from agent.utils import estimate_tokens
+
+TOPIC = "Berkshire Hathaway Apple stake"
+
+
+def test_summaries_within_budget_are_returned_unchanged():
+    summaries = ["Berkshire trimmed its Apple stake.", "Cash reached a record."]
+    packed, report = pack_summaries(summaries, TOPIC, token_budget=1000)
+    assert packed is summaries
+    assert report["compression"] == 1.0
+    assert report["kept_summaries"] == 2
+
+
+def test_packing_stays_within_the_token_budget():
+    relevant = "Berkshire Hathaway sold part of its Apple stake. " * 10
+    unrelated = "The weather in Omaha was mild this spring. " * 10
+    also_relevant = "Apple remains Berkshire Hathaway's largest stake. " * 10
+    summaries = [unrelated, relevant, also_relevant]
+    budget = estimate_tokens(relevant) + estimate_tokens(also_relevant)
+
+    for token_budget in (budget, budget - 1, estimate_tokens(relevant), 10):
+        packed, report = pack_summaries(summaries, TOPIC, token_budget)
+        assert sum(estimate_tokens(s) for s in packed) <= token_budget
+        assert report["kept_tokens"] <= token_budget
+        assert report["kept_tokens"] + report["dropped_tokens"] == report["input_tokens"]
+
+    packed, report = pack_summaries(summaries, TOPIC, budget)
+    # the most relevant summaries win, in their original order
+    assert packed == [relevant, also_relevant]
+    assert report["over_budget_dropped"] == 1
+    assert report["compression"] > 1.0
+
+    packed, report = pack_summaries(summaries, TOPIC, 10)
+    assert packed == []
+    # nothing kept: 0.0 rather than infinity, which strict JSON parsers reject
+    assert report["compression"] == 0.0
+    json.loads(json.dumps(report, allow_nan=False))
+
+
+def test_repeated_facts_are_dropped_ignoring_citations():
+    first = (
+        "Berkshire sold Apple shares [a](https://a.example/1). "
+        "伯克希尔增持了西方石油。现金储备创新高。"
+    )
+    repeat = (
+        "Berkshire sold Apple shares [b](https://b.example/2). "
+        "伯克希尔增持了西方石油。现金储备创新高。"
+    )
+    new = "Berkshire Hathaway bought Chubb shares."
+    packed, report = pack_summaries([first, repeat, new], TOPIC, token_budget=60)
+    assert packed == [first, new]
+    assert report["duplicates_dropped"] == 1
+    assert report["over_budget_dropped"] == 0
@@ -0,0 +1,47 @@
+from agent.dedup import deduplicate_queries, jaccard_similarity, query_shingles
+
+
+def _similarity(a, b):
+    return jaccard_similarity(query_shingles(a), query_shingles(b))
+
+
+def test_reworded_queries_are_dropped_and_distinct_ones_kept():
+    kept, dropped = deduplicate_queries(
+        [
+            "Berkshire Hathaway Q2 2025 13F changes",
+            "berkshire hathaway 13F changes, Q2 2025",
+            "Occidental Petroleum stake size",
+        ],
+        ["Apple share sales by Berkshire"],
+        threshold=0.8,
+    )
+    assert kept == ["Berkshire Hathaway Q2 2025 13F changes", "Occidental Petroleum stake size"]
+    assert dropped == ["berkshire hathaway 13F changes, Q2 2025"]
+
+
+def test_cjk_queries_compare_by_character_bigrams():
+    history = ["伯克希尔哈撒韦第二季度持仓变化"]
+    near = "伯克希尔哈撒韦第二季度的持仓变化"
+    distinct = "西方石油公司的股价走势"
+    assert _similarity(near, history[0]) >= 0.8
+    assert _similarity(distinct, history[0]) < 0.2
+
+    kept, dropped = deduplicate_queries([near, distinct], history, threshold=0.8)
+    assert kept == [distinct]
+    assert dropped == [near]
+
+
+def test_threshold_is_inclusive():
+    history = ["Berkshire Hathaway cash reserves"]
+    candidate = "Berkshire Hathaway cash reserve levels"
+    similarity = _similarity(candidate, history[0])
+    assert 0 < similarity < 1
+
+    assert deduplicate_queries([candidate], history, similarity) == ([], [candidate])
+    assert deduplicate_queries([candidate], history, similarity + 1e-9) == ([candidate], [])
+
+
+def test_duplicates_within_one_batch_are_dropped():
+    kept, dropped = deduplicate_queries(["苹果 股票 减持", "减持 苹果 股票"], [], threshold=0.8)
+    assert kept == ["苹果 股票 减持"]
+    assert dropped == ["减持 苹果 股票"]
@@ -0,0 +1,25 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from agent.app import create_frontend_router
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html>app</html>")
+    (tmp_path / "assets" / "index-1a2b.js").write_text("console.log('app')")
+    return TestClient(create_frontend_router(str(tmp_path)))
+
+
+def test_client_routes_fall_back_to_index(client):
+    for path in ("/", "/chat", "/chat/42"):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.text == "<html>app</html>"
+
+
+def test_missing_files_are_not_found(client):
+    assert client.get("/assets/index-1a2b.js").status_code == 200
+    for path in ("/assets/index-old.js", "/assets/style.css", "/assets/logo", "/favicon.ico"):
+        assert client.get(path).status_code == 404
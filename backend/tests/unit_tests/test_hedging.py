@@ -0,0 +1,54 @@
+import asyncio
+
+from agent.hedging import Hedger
+
+
+def _call(seconds):
+    async def call():
+        await asyncio.sleep(seconds)
+        return seconds
+
+    return call
+
+
+def _slow_then_fast(slow, fast):
+    """A call whose first request is slow and whose hedge is fast."""
+    requests = []
+
+    async def call():
+        requests.append(None)
+        await asyncio.sleep(slow if len(requests) == 1 else fast)
+        return len(requests)
+
+    return call
+
+
+def test_hedge_cap_is_not_banked_from_earlier_calls():
+    hedger = Hedger(percentile=50, max_ratio=0.1, min_samples=5, burst=2.0)
+
+    async def run():
+        for _ in range(100):
+            await hedger.run(_call(0.001))
+        for _ in range(20):
+            await hedger.run(_slow_then_fast(0.05, 0.001))
+
+    asyncio.run(run())
+    # 100 quiet calls must not pay for 12 back-to-back hedges: burst + 10% of the 20
+    assert hedger.hedged <= 2 + 2
+    assert hedger.hedges_skipped >= 20 - 4
+
+
+def test_losing_primary_is_recorded_as_censored_latency():
+    hedger = Hedger(percentile=50, max_ratio=1.0, min_samples=5, window=10)
+
+    async def run():
+        for _ in range(10):
+            await hedger.run(_call(0.01))
+        return await hedger.run(_slow_then_fast(1.0, 0.001))
+
+    assert asyncio.run(run()) == 2
+    assert hedger.hedges_won == 1
+    # after the hedge's own 1 ms sample comes the cancelled primary's: it ran for at
+    # least the hedge delay, the median of the 10 ms calls
+    *_, hedge_sample, primary_sample = hedger.latencies._samples
+    assert hedge_sample < 0.01 <= primary_sample
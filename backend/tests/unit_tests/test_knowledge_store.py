@@ -0,0 +1,82 @@
+from agent import knowledge_store as knowledge_store_module
+from agent.knowledge_store import KnowledgeStore
+
+DATE = "October 18, 2026"
+SOURCES = [{"label": "a.com", "short_url": "s/1", "value": "https://a.example/1"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+def _store(tmp_path, monkeypatch, max_age_seconds=3600, max_entries=100):
+    clock = FakeClock()
+    monkeypatch.setattr(knowledge_store_module.time, "time", clock.time)
+    path = str(tmp_path / "knowledge.sqlite")
+    return KnowledgeStore(path, max_age_seconds, max_entries), clock
+
+
+def test_saved_results_round_trip_for_reworded_queries(tmp_path, monkeypatch):
+    store, _ = _store(tmp_path, monkeypatch)
+    store.save("Berkshire Hathaway Apple stake 2025", DATE, "Berkshire trimmed Apple.", SOURCES)
+
+    found = store.lookup("2025 Apple stake of Berkshire Hathaway", threshold=0.5)
+    assert found["query"] == "Berkshire Hathaway Apple stake 2025"
+    assert found["prompt_date"] == DATE
+    assert found["summary"] == "Berkshire trimmed Apple."
+    assert found["sources"] == SOURCES
+    assert 0.5 <= found["similarity"] <= 1.0
+
+    assert store.lookup("Occidental Petroleum dividend", threshold=0.5) is None
+    assert store.lookup("", threshold=0.5) is None
+    assert store.stats() == {"hits": 1, "misses": 2, "size": 1, "hit_rate": 1 / 3}
+
+
+def test_chinese_queries_match_through_the_fts_index(tmp_path, monkeypatch):
+    store, _ = _store(tmp_path, monkeypatch)
+    sources = [{"label": "新浪", "short_url": "s/2", "value": "https://sina.example/2"}]
+    store.save("伯克希尔哈撒韦第二季度持仓变化", DATE, "伯克希尔减持了苹果。", sources)
+
+    found = store.lookup("伯克希尔哈撒韦第二季度的持仓变化", threshold=0.8)
+    assert found["summary"] == "伯克希尔减持了苹果。"
+    assert found["sources"] == sources
+    assert store.lookup("西方石油公司的股价走势", threshold=0.8) is None
+
+
+def test_the_most_similar_then_newest_result_wins(tmp_path, monkeypatch):
+    store, clock = _store(tmp_path, monkeypatch)
+    store.save("Berkshire Apple stake", DATE, "old", SOURCES)
+    clock.now += 10
+    store.save("Berkshire Apple stake", DATE, "new", SOURCES)
+    store.save("Berkshire Apple stake sales in 2025 filings", DATE, "loose", SOURCES)
+
+    assert store.lookup("apple stake, Berkshire", threshold=0.3)["summary"] == "new"
+
+
+def test_stale_and_overflowing_entries_are_not_returned(tmp_path, monkeypatch):
+    store, clock = _store(tmp_path, monkeypatch, max_age_seconds=60, max_entries=2)
+    store.save("Berkshire Apple stake", DATE, "apple", SOURCES)
+    clock.now += 61
+    assert store.lookup("Berkshire Apple stake", threshold=0.8) is None
+
+    for query in ("Occidental Petroleum stake", "Chubb insurance stake"):
+        clock.now += 1
+        store.save(query, DATE, query, SOURCES)
+    assert store.stats()["size"] == 2
+    # the evicted row is gone from the FTS index too
+    (fts_rows,) = store._conn.execute("SELECT COUNT(*) FROM knowledge_fts").fetchone()
+    assert fts_rows == 2
+    assert store.lookup("Chubb insurance stake", threshold=0.8)["summary"] == (
+        "Chubb insurance stake"
+    )
+
+
+def test_entries_persist_across_store_instances(tmp_path, monkeypatch):
+    store, _ = _store(tmp_path, monkeypatch)
+    store.save("Berkshire cash reserves", DATE, "record cash", SOURCES)
+    reopened = KnowledgeStore(store.path, store.max_age_seconds, store.max_entries)
+    assert reopened.lookup("Berkshire cash reserves", threshold=0.8)["summary"] == "record cash"
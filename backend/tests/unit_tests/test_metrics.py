@@ -0,0 +1,31 @@
+import asyncio
+
+from agent.metrics import instrument_node, record_model_usage, render_metrics
+
+
+def _duration_counts(node):
+    prefix = f'agent_node_duration_seconds_count{{node="{node}",'
+    return {
+        line[len(prefix) : line.index("}")]: int(line.rsplit(" ", 1)[1])
+        for line in render_metrics().splitlines()
+        if line.startswith(prefix)
+    }
+
+
+def test_node_latency_is_labeled_with_the_models_it_called():
+    @instrument_node
+    async def metrics_test_node(state):
+        for model in state["models"]:
+            record_model_usage(model, usage={"input_tokens": 10, "output_tokens": 5})
+        return {}
+
+    asyncio.run(metrics_test_node({"models": ["model-b", "model-a", "model-b"]}))
+    asyncio.run(metrics_test_node({"models": []}))
+    update = asyncio.run(metrics_test_node({"models": ["model-a"]}))
+
+    assert _duration_counts("metrics_test_node") == {
+        'model="model-a+model-b"': 1,
+        'model="none"': 1,
+        'model="model-a"': 1,
+    }
+    assert update["run_metrics"]["models"]["model-a"]["calls"] == 1
@@ -0,0 +1,22 @@
+from agent.models import override_clients, resolve_model_override
+
+DEFAULT = "claude-sonnet-4-20250514"
+
+
+def test_override_needs_a_provider_with_credentials(monkeypatch):
+    monkeypatch.setattr("agent.models.load_environment", lambda: None)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert resolve_model_override("claude-opus-4-20250514", DEFAULT) == "claude-opus-4-20250514"
+    assert resolve_model_override("gpt-4o", DEFAULT) == DEFAULT
+    assert resolve_model_override("llama-3-70b", DEFAULT) == DEFAULT
+    assert resolve_model_override(None, DEFAULT) == DEFAULT
+    assert resolve_model_override("", DEFAULT) == DEFAULT
+
+
+def test_stand_in_clients_serve_any_known_provider(monkeypatch):
+    monkeypatch.setattr("agent.models.load_environment", lambda: None)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with override_clients(lambda model, **params: None):
+        assert resolve_model_override("gpt-4o", DEFAULT) == "gpt-4o"
+        assert resolve_model_override("llama-3-70b", DEFAULT) == DEFAULT
@@ -0,0 +1,105 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+from agent import graph as graph_module
+from agent.models import override_clients
+from agent.prompt_caching import MAX_CACHE_BREAKPOINTS, build_research_prompt
+
+CLAUDE = "claude-sonnet-4-20250514"
+
+SUMMARIES = [
+    f"Finding {i}: {topic} reported figures for the quarter, with sources [{i}]."
+    for i, topic in enumerate(["Apple", "Chubb", "Occidental", "BYD", "Kraft Heinz", "Amex"])
+]
+
+REFLECTION_JSON = '{"is_sufficient": true, "knowledge_gap": "", "follow_up_queries": []}'
+
+
+def _breakpoints(prompt):
+    return [i for i, block in enumerate(prompt[0].content) if "cache_control" in block]
+
+
+class RecordingChatModel:
+    """Chat model stand-in that records the tools every request would send."""
+
+    def __init__(self, requests):
+        self.requests = requests
+
+    def bind_tools(self, tools, **kwargs):
+        raise AssertionError("research prompts must not bind tools")
+
+    def with_structured_output(self, schema, **kwargs):
+        raise AssertionError(f"{schema.__name__} was requested through a tool call")
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        self.requests.append({"prompt": prompt, "tools": kwargs.get("tools")})
+        return AIMessage(content=f"```json\n{REFLECTION_JSON}\n```")
+
+    async def astream(self, prompt, config=None, **kwargs):
+        self.requests.append({"prompt": prompt, "tools": kwargs.get("tools")})
+        yield AIMessageChunk(content="<!DOCTYPE html><html><body>report</body></html>")
+
+
+def test_breakpoints_follow_cached_and_written_prefixes():
+    prompt = build_research_prompt(
+        CLAUDE, "topic", "today", SUMMARIES, "instructions", cached_count=2, cache_write=True
+    )
+    # block 0 is the preamble, so block i ends the prefix holding the first i summaries
+    assert _breakpoints(prompt) == [2, len(SUMMARIES)]
+    assert prompt[0].content[-1] == {"type": "text", "text": "instructions"}
+
+
+def test_report_breakpoint_reads_the_reflection_prefix():
+    reflection = build_research_prompt(CLAUDE, "topic", "today", SUMMARIES, "reflect")
+    report = build_research_prompt(
+        CLAUDE, "topic", "today", SUMMARIES, "report", cached_count=len(SUMMARIES),
+        cache_write=False,
+    )
+    assert _breakpoints(reflection) == _breakpoints(report) == [len(SUMMARIES)]
+    end = len(SUMMARIES) + 1
+    assert reflection[0].content[:end] == report[0].content[:end]
+
+
+def test_breakpoints_are_capped_and_claude_only():
+    prompt = build_research_prompt(
+        CLAUDE, "topic", "today", SUMMARIES, "instructions", cached_count=3
+    )
+    assert len(_breakpoints(prompt)) <= MAX_CACHE_BREAKPOINTS
+    plain = build_research_prompt("gpt-4o-mini", "topic", "today", SUMMARIES, "instructions")
+    assert isinstance(plain, str) and "cache_control" not in plain
+    assert build_research_prompt(CLAUDE, "topic", "today", [], "instructions", cache_write=True)
+
+
+def test_reflection_and_report_send_the_same_tools_prefix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(graph_module, "get_stream_writer", lambda: lambda event: None)
+    requests = []
+    config = {
+        "configurable": {
+            "reasoning_model": CLAUDE,
+            "answer_model": CLAUDE,
+            "enable_knowledge_store": False,
+        }
+    }
+    state = {
+        "messages": [HumanMessage(content="Berkshire Hathaway portfolio changes")],
+        "search_query": ["Berkshire Hathaway portfolio"],
+        "web_research_result": SUMMARIES,
+        "sources_gathered": [],
+    }
+
+    async def run():
+        update = await graph_module.reflection(state, config)
+        await graph_module.web_build({**state, **update}, config)
+
+    with override_clients(lambda model, **params: RecordingChatModel(requests)):
+        asyncio.run(run())
+
+    reflection, report = requests
+    # Anthropic's cached prefix is tools -> system -> messages: both calls must send the
+    # same (no) tools for the report to read the prefix reflection wrote
+    assert reflection["tools"] is None and report["tools"] is None
+    end = len(SUMMARIES) + 1
+    assert _breakpoints(report["prompt"]) == [len(SUMMARIES)]
+    assert reflection["prompt"][0].content[:end] == report["prompt"][0].content[:end]
@@ -0,0 +1,100 @@
+import asyncio
+import os
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langgraph.graph import END, START, StateGraph
+
+from agent import graph as graph_module
+from agent.configuration import Configuration
+from agent.models import override_clients
+from agent.prompt_caching import prompt_text
+from agent.state import OverallState
+
+SUMMARIES = [
+    f"Finding {i}: {topic} reported figures for the quarter, with sources [{i}]."
+    for i, topic in enumerate(["Apple", "Chubb", "Occidental", "BYD"])
+]
+
+OUTLINE_JSON = (
+    '{"title": "Portfolio", "sections": ['
+    '{"heading": "Overview", "focus": "the changes"}, '
+    '{"heading": "Outlook", "focus": "what comes next"}]}'
+)
+
+
+class SectionChatModel:
+    """Chat model stand-in answering the outline and streaming a fragment per section."""
+
+    def __init__(self, requests):
+        self.requests = requests
+
+    def with_structured_output(self, schema, **kwargs):
+        raise AssertionError(f"{schema.__name__} was requested through a tool call")
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        self.requests.append(prompt_text(prompt))
+        return AIMessage(content=OUTLINE_JSON)
+
+    async def astream(self, prompt, config=None, **kwargs):
+        self.requests.append(prompt_text(prompt))
+        yield AIMessageChunk(content="<section><h2>Part</h2><p>text</p></section>")
+
+
+def _report_graph():
+    builder = StateGraph(OverallState, config_schema=Configuration)
+    builder.add_node("plan_report", graph_module.plan_report)
+    builder.add_node("write_section", graph_module.write_section)
+    builder.add_node("assemble_report", graph_module.assemble_report)
+    builder.add_edge(START, "plan_report")
+    builder.add_conditional_edges(
+        "plan_report", graph_module.continue_to_sections, ["write_section"]
+    )
+    builder.add_edge("write_section", "assemble_report")
+    builder.add_edge("assemble_report", END)
+    return builder.compile()
+
+
+def test_sections_are_written_from_the_packed_summaries(tmp_path):
+    requests = []
+    config = {"configurable": {"output_dir": str(tmp_path), "report_mode": "sections"}}
+    state = {
+        "messages": [HumanMessage(content="Berkshire Hathaway portfolio changes")],
+        "search_query": ["Berkshire Hathaway portfolio"],
+        "web_research_result": SUMMARIES,
+        "sources_gathered": [],
+    }
+    with override_clients(lambda model, **params: SectionChatModel(requests)):
+        result = asyncio.run(_report_graph().ainvoke(state, config))
+
+    assert result["report_summaries"] == SUMMARIES
+    # one outline call, then one call per section, each over every summary
+    assert len(requests) == 3
+    for prompt in requests:
+        assert all(summary in prompt for summary in SUMMARIES)
+    assert len(result["report_sections"]) == 2
+    assert os.path.exists(result["html_filename"])
+
+
+def test_section_payloads_carry_the_summaries_and_spend():
+    outline = {
+        "title": "Portfolio",
+        "research_topic": "topic",
+        "sections": [
+            {"heading": "Overview", "focus": "the changes"},
+            {"heading": "Outlook", "focus": "what comes next"},
+        ],
+    }
+    sends = graph_module.continue_to_sections(
+        {
+            "report_outline": outline,
+            "report_summaries": SUMMARIES[:2],
+            "run_metrics": {"tokens": {"input": 10}},
+            "run_spend_baseline": {"tokens": 0},
+        }
+    )
+    assert [send.node for send in sends] == ["write_section", "write_section"]
+    assert [send.arg["index"] for send in sends] == [0, 1]
+    for send in sends:
+        assert send.arg["summaries"] == SUMMARIES[:2]
+        assert send.arg["run_metrics"] == {"tokens": {"input": 10}}
+        assert send.arg["run_spend_baseline"] == {"tokens": 0}
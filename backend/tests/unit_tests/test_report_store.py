@@ -0,0 +1,74 @@
+import gzip
+import os
+
+from agent import http_cache, report_store
+from agent.report_store import get_report_store
+
+
+def _open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_stores_hold_no_connections_between_operations(tmp_path):
+    store = get_report_store(str(tmp_path / "warm-up"))
+    store.writer("warm up").finish()
+    before = _open_fds()
+    for i in range(40):
+        store = get_report_store(str(tmp_path / f"topic-{i}"))
+        writer = store.writer(f"topic {i}")
+        writer.write("<html>report</html>")
+        record = writer.finish()
+        assert store.get(record["name"])["topic"] == f"topic {i}"
+    assert _open_fds() <= before
+    assert len(report_store._stores) <= report_store.MAX_CACHED_STORES
+
+
+def test_identical_reports_share_one_file(tmp_path):
+    store = get_report_store(str(tmp_path))
+    names = set()
+    for _ in range(2):
+        writer = store.writer("same topic")
+        writer.write("<html>same</html>")
+        names.add(writer.finish()["name"])
+    assert len(names) == 1
+    assert [record["name"] for record in store.list()] == list(names)
+
+
+def test_variants_are_compressed_from_the_file_in_chunks(tmp_path, monkeypatch):
+    read_sizes = []
+    real_open = open
+
+    class RecordingFile:
+        def __init__(self, f):
+            self.f = f
+
+        def read(self, size=-1):
+            read_sizes.append(size)
+            return self.f.read(size)
+
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return self.f.__exit__(*exc)
+
+    def recording_open(path, mode="r", *args, **kwargs):
+        f = real_open(path, mode, *args, **kwargs)
+        return RecordingFile(f) if mode == "rb" else f
+
+    store = get_report_store(str(tmp_path))
+    writer = store.writer("large topic")
+    document = "".join(f"<p>paragraph {i} of the report</p>\n" for i in range(20_000))
+    writer.write(document)
+    monkeypatch.setattr(http_cache, "open", recording_open, raising=False)
+    record = writer.finish()
+
+    assert record["bytes"] == len(document.encode("utf-8"))
+    assert "gzip" in record["encodings"]
+    with real_open(store.path(record["name"], "gzip"), "rb") as f:
+        assert gzip.decompress(f.read()).decode("utf-8") == document
+    # every read of the report is bounded, none loads it whole
+    assert read_sizes and all(0 < size <= 1 << 16 for size in read_sizes)
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from agent import scheduler as scheduler_module
+from agent.scheduler import SearchScheduler, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock that only moves when a test (or a scheduler sleep) moves it."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        clock.now += delay
+        await real_sleep(0)
+
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", fake_sleep)
+    return clock
+
+
+def test_token_bucket_reservations_queue_at_the_refill_rate(clock):
+    bucket = TokenBucket(rate_per_second=2.0, capacity=2.0)
+    assert [bucket.reserve(1) for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    clock.now += 1.0
+    assert bucket.reserve(1) == 0.5
+    # a request larger than the bucket is capped at its capacity
+    clock.now += 10.0
+    assert bucket.reserve(10) == 0.0
+
+
+def test_token_bucket_try_take_and_adjust(clock):
+    bucket = TokenBucket(rate_per_second=1.0, capacity=3.0)
+    assert bucket.try_take(2)
+    assert not bucket.try_take(2)
+    bucket.adjust(-1)
+    assert bucket.try_take(2)
+    bucket.adjust(5)
+    clock.now += 4.0
+    assert not bucket.try_take(1)
+    clock.now += 2.0
+    assert bucket.try_take(1)
+
+
+def test_waiters_are_admitted_by_priority_then_arrival(clock):
+    scheduler = SearchScheduler(requests_per_second=1000, tokens_per_minute=10**9, max_in_flight=1)
+    order = []
+
+    async def call(name, priority, hold):
+        async with scheduler.slot(priority=priority):
+            order.append(name)
+            await hold.wait()
+
+    async def run():
+        hold = asyncio.Event()
+        first = asyncio.create_task(call("first", 9, hold))
+        await asyncio.sleep(0)
+        others = [
+            asyncio.create_task(call(name, priority, hold))
+            for name, priority in [("p5", 5), ("p1a", 1), ("p3", 3), ("p1b", 1)]
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 4
+        hold.set()
+        await asyncio.gather(first, *others)
+
+    asyncio.run(run())
+    assert order == ["first", "p1a", "p1b", "p3", "p5"]
+
+
+def test_in_flight_calls_never_exceed_the_cap(clock):
+    scheduler = SearchScheduler(requests_per_second=1000, tokens_per_minute=10**9, max_in_flight=3)
+    in_flight, peak = 0, 0
+
+    async def call(i):
+        nonlocal in_flight, peak
+        async with scheduler.slot(priority=i):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            for _ in range(3):
+                await asyncio.sleep(0)
+            in_flight -= 1
+
+    async def run():
+        await asyncio.gather(*(call(i) for i in range(20)))
+
+    asyncio.run(run())
+    assert peak == 3
+    assert scheduler.stats() == {"in_flight": 0, "queued": 0, "admitted": 20, "rate_limited": 0}
+
+
+def test_rate_limits_start_a_shared_growing_cooldown(clock):
+    scheduler = SearchScheduler(requests_per_second=1000, tokens_per_minute=10**9, max_in_flight=8)
+    assert [scheduler.note_rate_limited() for _ in range(3)] == [1.0, 2.0, 4.0]
+
+    async def run():
+        started = clock.now
+        async with scheduler.slot():
+            return clock.now - started
+
+    # every caller waits out the cooldown, however many branches hit the 429
+    assert asyncio.run(run()) == pytest.approx(4.0)
+    # a success resets the streak; the cooldown is capped
+    scheduler.record_usage(100, 100)
+    assert scheduler.note_rate_limited() == 1.0
+    for _ in range(10):
+        cooldown = scheduler.note_rate_limited()
+    assert cooldown == scheduler_module._MAX_COOLDOWN_SECONDS
+    assert scheduler.stats()["rate_limited"] == 14
+
+
+def test_try_reserve_only_uses_spare_budget(clock):
+    scheduler = SearchScheduler(requests_per_second=2, tokens_per_minute=600, max_in_flight=1)
+    assert scheduler.try_reserve(tokens=500)
+    # the tokens/min bucket is short: the request token is refunded
+    assert not scheduler.try_reserve(tokens=500)
+    assert scheduler.try_reserve(tokens=100)
+    # the requests/sec bucket is empty now
+    assert not scheduler.try_reserve(tokens=0)
+    clock.now += 0.5
+    assert scheduler.try_reserve(tokens=0)
+
+    clock.now += 10
+    scheduler.note_rate_limited()
+    assert not scheduler.try_reserve(tokens=0)
+    clock.now += 1.0
+    assert scheduler.try_reserve(tokens=0)
+    assert scheduler.admitted == 4
@@ -0,0 +1,119 @@
+from google.genai import types
+
+from agent import search_cache as search_cache_module
+from agent.search_cache import SearchCache
+from agent.utils import get_citations, insert_citation_markers, resolve_urls
+
+MODEL = "gemini-2.0-flash"
+DATE = "October 18, 2026"
+TEXT = "Berkshire trimmed Apple. 伯克希尔增持了西方石油。"
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def _response(text=TEXT):
+    boundary = len(text.split(" 伯")[0].encode("utf-8"))
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)]),
+                grounding_metadata=types.GroundingMetadata(
+                    grounding_chunks=[
+                        types.GroundingChunk(
+                            web=types.GroundingChunkWeb(uri="https://a.example/1", title="a.com")
+                        ),
+                        types.GroundingChunk(
+                            web=types.GroundingChunkWeb(uri="https://b.example/2", title="b.com")
+                        ),
+                    ],
+                    grounding_supports=[
+                        types.GroundingSupport(
+                            segment=types.Segment(start_index=0, end_index=boundary),
+                            grounding_chunk_indices=[0],
+                        ),
+                        types.GroundingSupport(
+                            segment=types.Segment(
+                                start_index=boundary + 1, end_index=len(text.encode("utf-8"))
+                            ),
+                            grounding_chunk_indices=[0, 1],
+                        ),
+                    ],
+                ),
+            )
+        ]
+    )
+
+
+def _cache(tmp_path, monkeypatch, ttl_seconds=60, max_entries=100):
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache_module.time, "time", clock.time)
+    return SearchCache(str(tmp_path / "search.sqlite"), ttl_seconds, max_entries), clock
+
+
+def _cited(response):
+    urls = resolve_urls(response.candidates[0].grounding_metadata.grounding_chunks)
+    return insert_citation_markers(response.text, get_citations(response, urls))
+
+
+def test_hits_and_misses_are_counted_with_normalized_keys(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    assert cache.get("Berkshire Apple stake", MODEL, DATE) is None
+    cache.put("Berkshire Apple stake", MODEL, DATE, _response())
+    assert cache.get("apple STAKE, berkshire?", MODEL, DATE) is not None
+    assert cache.get("Berkshire Apple stake", "other-model", DATE) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "size": 1,
+        "hit_rate": 1 / 3,
+    }
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.put("query", MODEL, DATE, _response())
+    clock.now += 60
+    assert cache.get("query", MODEL, DATE) is not None
+    clock.now += 1
+    assert cache.get("query", MODEL, DATE) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, max_entries=2)
+    for query in ("first", "second"):
+        cache.put(query, MODEL, DATE, _response())
+        clock.now += 1
+    # reading "first" makes "second" the least recently used
+    assert cache.get("first", MODEL, DATE) is not None
+    clock.now += 1
+    cache.put("third", MODEL, DATE, _response())
+
+    assert cache.get("second", MODEL, DATE) is None
+    assert cache.get("first", MODEL, DATE) is not None
+    assert cache.get("third", MODEL, DATE) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_cached_response_keeps_the_grounding_metadata(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    original = _response()
+    cache.put("query", MODEL, DATE, original)
+    cached = cache.get("query", MODEL, DATE)
+
+    assert cached.text == original.text
+    assert (
+        cached.candidates[0].grounding_metadata.model_dump()
+        == original.candidates[0].grounding_metadata.model_dump()
+    )
+    # citations, byte offsets included, are rebuilt exactly as from the live response
+    assert _cited(cached) == _cited(original)
+    assert _cited(cached).count("](") == 3
@@ -0,0 +1,33 @@
+import pickle
+
+from agent.sources import SourceList, merge_sources
+
+
+def _sources(*urls):
+    return [{"label": url, "short_url": f"short:{url}", "value": url} for url in urls]
+
+
+def test_merge_keeps_one_entry_per_url_in_arrival_order():
+    merged = merge_sources([], _sources("a", "b", "a"))
+    merged = merge_sources(merged, _sources("c", "b", "d"))
+    assert [source["value"] for source in merged] == ["a", "b", "c", "d"]
+    assert merged.index == {"a": 0, "b": 1, "c": 2, "d": 3}
+
+
+def test_merge_returns_a_new_list_and_leaves_its_inputs_alone():
+    merged = merge_sources([], _sources(*map(str, range(1000))))
+    again = merge_sources(merged, _sources("new", "1"))
+    assert again is not merged and again.index is not merged.index
+    assert len(merged) == 1000 and "new" not in merged.index
+    assert len(again) == 1001 and again.index["new"] == 1000
+    # merging the same update into the earlier value again gives the same result
+    assert merge_sources(merged, _sources("new", "1")) == again
+
+
+def test_index_is_rebuilt_after_a_checkpoint_round_trip():
+    merged = merge_sources([], _sources("a", "b"))
+    restored = list(pickle.loads(pickle.dumps(list(merged))))
+    assert not isinstance(restored, SourceList)
+    merged = merge_sources(restored, _sources("b", "c"))
+    assert isinstance(merged, SourceList)
+    assert [source["value"] for source in merged] == ["a", "b", "c"]
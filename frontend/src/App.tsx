@@ -36,6 +36,13 @@ export default function App() {
           title: "Generating Search Queries",
           data: event.generate_query.query_list.join(", "),
         };
+      } else if (event.knowledge_lookup?.search_query?.length) {
+        processedEvent = {
+          title: "Reusing Earlier Research",
+          data: `Answered from earlier runs: ${event.knowledge_lookup.search_query.join(
+            ", "
+          )}`,
+        };
       } else if (event.web_research) {
         const sources = event.web_research.sources_gathered || [];
         const numSources = sources.length;
@@ -72,6 +79,27 @@ export default function App() {
         ]);
       }
     },
+    onCustomEvent: (event: any) => {
+      // web_build streams the HTML report (or the sections report mode finishes one
+      // section at a time); keep a single, updating timeline entry
+      if (!["html_chunk", "html_done", "section_done"].includes(event?.event)) return;
+      const processedEvent: ProcessedEvent = {
+        title: "Building HTML Report",
+        data:
+          event.event === "html_done"
+            ? `Saved ${event.bytes_written} bytes to ${event.html_filename}.`
+            : event.event === "section_done"
+            ? `Wrote section "${event.heading}" (${event.bytes} bytes).`
+            : `Streaming report... ${event.bytes_written} bytes written.`,
+      };
+      setProcessedEventsTimeline((prevEvents) => {
+        const last = prevEvents[prevEvents.length - 1];
+        if (last && last.title === processedEvent.title) {
+          return [...prevEvents.slice(0, -1), processedEvent];
+        }
+        return [...prevEvents, processedEvent];
+      });
+    },
   });
 
   useEffect(() => {